@@ -0,0 +1,565 @@
+# Copyright 2008-2013 Alex Zvoleff
+#
+# This file is part of the chitwanabm agent-based model.
+#
+# chitwanabm is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# chitwanabm is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# chitwanabm.  If not, see <http://www.gnu.org/licenses/>.
+#
+# See the README.rst file for author contact information.
+
+"""
+Contains columnar (struct-of-arrays) storage for agent attributes. The
+attributes of person agents that are used by the demographic submodels are
+stored in NumPy arrays (one element per agent) in a PersonTable, while the
+Person class itself is a thin view onto one row of that table. This allows the
+submodels to screen and evaluate the entire population with array operations
+rather than by visiting each agent in turn. Neighborhood state (land use, NFOs,
+EVI and forest distances) is stored in the same way in a NeighborhoodTable.
+"""
+
+from __future__ import division
+
+import logging
+from array import array
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Codes used for categorical agent attributes. Agents store and compare these
+# attributes as codes, and the submodel coefficient tables are indexed by code.
+# Labels are only used when reading the input data and writing results (see
+# get_label). A code of -1 in any of the table columns means the attribute is
+# undefined.
+SEX_CODES = {'male': 0,
+             'female': 1}
+ETHNICITY_CODES = {'HighHindu': 0,
+                   'HillTibeto': 1,
+                   'LowHindu': 2,
+                   'Newar': 3,
+                   'TeraiTibeto': 4}
+SCHOOL_STATUS_CODES = {'undetermined': 0,
+                       'inschool': 1,
+                       'outofschool': 2}
+FOREST_TYPE_CODES = {'BZ': 0,
+                     'CNP': 1}
+
+# Ethnicity codes for the ethnicity numbers used in the CVFS data. The "Other"
+# ethnicity (6) is dropped from the model.
+CVFS_ETHNICITY_CODES = {1: ETHNICITY_CODES['HighHindu'],
+                        2: ETHNICITY_CODES['HillTibeto'],
+                        3: ETHNICITY_CODES['LowHindu'],
+                        4: ETHNICITY_CODES['Newar'],
+                        5: ETHNICITY_CODES['TeraiTibeto']}
+
+def _invert(codes):
+    labels = {-1: None}
+    for label, code in codes.items():
+        labels[code] = label
+    return labels
+
+SEX_LABELS = _invert(SEX_CODES)
+ETHNICITY_LABELS = _invert(ETHNICITY_CODES)
+SCHOOL_STATUS_LABELS = _invert(SCHOOL_STATUS_CODES)
+FOREST_TYPE_LABELS = _invert(FOREST_TYPE_CODES)
+
+def get_label(labels, code):
+    """
+    Returns the label for a categorical code (or None if the code is None), 
+    for use when writing results.
+    """
+    if code is None:
+        return None
+    return labels[code]
+
+class AgentTable(object):
+    """
+    Base class for tables storing agent attributes as NumPy columns. Each agent
+    is assigned a row in the table when it is created, and keeps that row for
+    the remainder of the model run (rows are never reused). Subclasses define
+    the columns in _column_types as a list of (name, dtype, fill_value)
+    tuples.
+
+    Columns are accessed as attributes of the table (for example,
+    ``table.agemonths``), and are over-allocated so that adding a row usually
+    does not require copying the table. Use ``table.num_rows()`` (or the
+    ``column`` method) to limit operations to the rows that are in use.
+    """
+    _column_types = []
+
+    def __init__(self, capacity=1024):
+        self._capacity = capacity
+        self._num_rows = 0
+        # _agents stores the agent instance that is a view on each row.
+        self._agents = []
+        for name, dtype, fill_value in self._column_types:
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+
+    def _grow(self, min_capacity):
+        new_capacity = self._capacity
+        while new_capacity < min_capacity:
+            new_capacity *= 2
+        logger.debug("Growing %s from %s to %s rows"%(self.__class__.__name__, 
+            self._capacity, new_capacity))
+        for name, dtype, fill_value in self._column_types:
+            new_column = np.empty(new_capacity, dtype=dtype)
+            new_column[:self._num_rows] = getattr(self, name)[:self._num_rows]
+            setattr(self, name, new_column)
+        self._capacity = new_capacity
+
+    def add_rows(self, agents):
+        """
+        Allocates a new row (filled with the default values for each column)
+        for each agent in agents, and returns the row numbers as an array.
+        Elements of agents can be None if the agents are not yet created (see
+        set_agent).
+        """
+        start = self._num_rows
+        stop = start + len(agents)
+        if stop > self._capacity:
+            self._grow(stop)
+        for name, dtype, fill_value in self._column_types:
+            getattr(self, name)[start:stop] = fill_value
+        self._agents.extend(agents)
+        self._num_rows = stop
+        return np.arange(start, stop)
+
+    def add_row(self, agent):
+        "Allocates a new row for a single agent and returns the row number."
+        return int(self.add_rows([agent])[0])
+
+    def num_rows(self):
+        return self._num_rows
+
+    def column(self, name):
+        "Returns a view of the in-use rows of a column."
+        return getattr(self, name)[:self._num_rows]
+
+    def set_agent(self, row, agent):
+        """
+        Sets the agent instance that is a view on a row (for rows allocated 
+        with add_rows before their agents were created).
+        """
+        self._agents[row] = agent
+
+    def release_agent(self, row):
+        """
+        Drops the table's reference to the agent instance that is a view on a 
+        row, so that the instance can be freed once nothing else refers to it. 
+        The row itself (and its column values) is kept, as rows are never 
+        reused. get_agent returns None for released rows.
+        """
+        self._agents[row] = None
+
+    def get_agent(self, row):
+        "Returns the agent instance that is a view on a given row."
+        return self._agents[row]
+
+    def get_agents(self, rows):
+        "Returns a list of the agent instances that are views on rows."
+        agents = self._agents
+        return [agents[row] for row in rows]
+
+# Columns of the PersonTable that store the parental and childhood context of 
+# each person (see PersonTable).
+PERSON_CONTEXT_COLUMNS = [('parents_contracep_ever', 'b1', False),
+                          ('mother_work', 'b1', False),
+                          ('father_work', 'b1', False),
+                          ('mother_years_schooling', 'i2', 0),
+                          ('father_years_schooling', 'i2', 0),
+                          ('mother_num_children', 'i2', 0),
+                          ('child_school_lt_1hr_ft', 'b1', False),
+                          ('child_health_lt_1hr_ft', 'b1', False),
+                          ('child_bus_lt_1hr_ft', 'b1', False),
+                          ('child_market_lt_1hr_ft', 'b1', False),
+                          ('child_employer_lt_1hr_ft', 'b1', False)]
+
+class PersonTable(AgentTable):
+    """
+    Stores person agent attributes as NumPy columns (see AgentTable). The
+    columns are:
+
+        ID: the person's ID number
+        agemonths: age in months
+        sex: sex code (see SEX_CODES)
+        ethnicity: ethnicity code (see ETHNICITY_CODES)
+        household: index of the person's (current or, if away, last) household
+        neighborhood: index of the neighborhood of that household
+        spouse: row of the person's spouse (-1 if unmarried)
+        mother, father: rows of the person's parents (-1 if unknown)
+        marriage_time: time of marriage (NaN if unmarried)
+        schooling: years of schooling
+        school_status: school status code (see SCHOOL_STATUS_CODES)
+        away: whether the person is away on a migration
+        alive: whether the person is alive
+        active: whether the person is resident in, or stored (as a returning
+            migrant) by, a region. Only active persons take part in the
+            submodels. Persons who die or leave the model permanently are
+            made inactive when they are added to the PersonArchive.
+        num_children: number of children
+        des_num_children: desired number of children (NaN if undefined)
+        first_birth_timing: first birth timing in months
+        last_birth_time: time of last birth (NaN if undefined)
+        birth_interval: birth interval in months (NaN for men)
+        work: whether the person works
+        initial_agent: whether the person was used to initialize the model
+        in_migrant: whether the person in-migrated during the model run
+
+    The parental and childhood context of each person (used by the first 
+    birth timing submodel) is also stored in the table. The parents' 
+    attributes are only set for initial agents and in-migrants - for persons 
+    born during the model run they are read from the person's parents (see 
+    Person.get_mother_work, etc.). The context columns are:
+
+        parents_contracep_ever: whether the person's parents ever used 
+            contraception
+        mother_work, father_work: whether the person's parents worked
+        mother_years_schooling, father_years_schooling: years of schooling of 
+            the person's parents
+        mother_num_children: number of children of the person's mother
+        child_<NFO>_lt_1hr_ft: whether the person lived within an hour's walk 
+            of each NFO type as a child (school, health, bus, market and 
+            employer)
+    """
+    _column_types = [('ID', 'i4', -1),
+                     ('agemonths', 'f8', np.nan),
+                     ('sex', 'i1', -1),
+                     ('ethnicity', 'i1', -1),
+                     ('household', 'i4', -1),
+                     ('neighborhood', 'i4', -1),
+                     ('spouse', 'i4', -1),
+                     ('mother', 'i4', -1),
+                     ('father', 'i4', -1),
+                     ('marriage_time', 'f8', np.nan),
+                     ('schooling', 'f8', 0),
+                     ('school_status', 'i1', -1),
+                     ('away', 'b1', False),
+                     ('alive', 'b1', True),
+                     ('active', 'b1', False),
+                     ('num_children', 'i4', 0),
+                     ('des_num_children', 'f8', np.nan),
+                     ('first_birth_timing', 'f8', np.nan),
+                     ('last_birth_time', 'f8', np.nan),
+                     ('birth_interval', 'f8', np.nan),
+                     ('work', 'b1', False),
+                     ('initial_agent', 'b1', False),
+                     ('in_migrant', 'b1', False)] + \
+                    PERSON_CONTEXT_COLUMNS
+
+    def active_rows(self):
+        "Returns the rows of all active (resident or migrant) persons."
+        return np.flatnonzero(self.column('active'))
+
+    def resident_rows(self):
+        "Returns the rows of all active persons that are not away."
+        return np.flatnonzero(self.column('active') & ~self.column('away'))
+
+class HouseholdTable(AgentTable):
+    """
+    Stores the ID of each household (see AgentTable), so that the household 
+    indices stored in the household column of the PersonTable can be mapped 
+    to household IDs for many persons at once. The row of each household is 
+    its index (Household._index). The household instances are not kept in 
+    the table, so that households can be freed once they are removed from 
+    the model. The columns are:
+
+        ID: the household's ID number
+    """
+    _column_types = [('ID', 'i4', -1)]
+
+# The neighborhood facilities and organizations (NFOs) that are tracked for 
+# each neighborhood, as minimum foot travel times (in minutes).
+NFO_TYPES = ['school_min_ft', 'health_min_ft', 'bus_min_ft', 'market_min_ft', 
+             'employer_min_ft']
+
+# The land use area columns of the NeighborhoodTable.
+LAND_USE_COLUMNS = ['land_agveg', 'land_nonagveg', 'land_privbldg', 
+                    'land_pubbldg', 'land_other', 'land_total']
+
+# Number of years of EVI history stored for each neighborhood.
+EVI_HISTORY_DEPTH = 2
+
+class NeighborhoodTable(AgentTable):
+    """
+    Stores neighborhood agent attributes as NumPy columns (see AgentTable). 
+    The row of each neighborhood is also its index (Neighborhood._index), as 
+    stored in the neighborhood column of the PersonTable. The columns are:
+
+        ID: the neighborhood's ID number
+        region_ID: the ID number of the neighborhood's region (-1 until the 
+            neighborhood is added to a region)
+        elec_available: whether the neighborhood has electricity
+        land_agveg, land_nonagveg, land_privbldg, land_pubbldg, land_other:
+            land use areas (in square meters)
+        land_total: total neighborhood area (in square meters)
+        distnara: distance from Narayanghat
+        elevation_above_river: elevation above the nearest river
+        num_groups: number of community groups
+        avg_yrs_services_lt15: average number of years the neighborhood had 
+            services within a 15 minute walk
+        forest_dist_BZ_km, forest_dist_CNP_km: distances to the buffer zone 
+            and to Chitwan National Park
+        forest_closest_km: distance to the closest forest
+        forest_closest_type: type code of the closest forest (see 
+            FOREST_TYPE_CODES)
+        EVI: EVI for the current year
+        EVI_t0: EVI at the start of the model
+        EVI_anom_mean, EVI_anom_sd: mean and standard deviation of the EVI 
+            anomaly of the neighborhood from the valley mean
+        EVI_history: the EVI of the last EVI_HISTORY_DEPTH years (a 2-D 
+            column, with the oldest year first; see push_EVI)
+        EVI_2yr_mean: mean EVI of the last two years
+        <NFO type>: minimum foot travel time to each NFO type (see NFO_TYPES)
+        <NFO type>_change_rate: rate of change of each foot travel time
+    """
+    _column_types = [('ID', 'i4', -1),
+                     ('region_ID', 'i4', -1),
+                     ('elec_available', 'b1', False),
+                     ('land_agveg', 'f8', np.nan),
+                     ('land_nonagveg', 'f8', np.nan),
+                     ('land_privbldg', 'f8', np.nan),
+                     ('land_pubbldg', 'f8', np.nan),
+                     ('land_other', 'f8', np.nan),
+                     ('land_total', 'f8', np.nan),
+                     ('distnara', 'f8', np.nan),
+                     ('elevation_above_river', 'f8', np.nan),
+                     ('num_groups', 'f8', np.nan),
+                     ('avg_yrs_services_lt15', 'f8', np.nan),
+                     ('forest_dist_BZ_km', 'f8', np.nan),
+                     ('forest_dist_CNP_km', 'f8', np.nan),
+                     ('forest_closest_km', 'f8', np.nan),
+                     ('forest_closest_type', 'i1', -1),
+                     ('EVI', 'f8', np.nan),
+                     ('EVI_t0', 'f8', np.nan),
+                     ('EVI_anom_mean', 'f8', np.nan),
+                     ('EVI_anom_sd', 'f8', np.nan),
+                     ('EVI_history', ('f8', EVI_HISTORY_DEPTH), np.nan),
+                     ('EVI_2yr_mean', 'f8', np.nan)] + \
+                    [(NFO_type, 'f8', np.nan) for NFO_type in NFO_TYPES] + \
+                    [(NFO_type + '_change_rate', 'f8', np.nan) for NFO_type in NFO_TYPES]
+
+    def __init__(self, capacity=256):
+        AgentTable.__init__(self, capacity)
+
+    def push_EVI(self, rows, EVI):
+        """
+        Adds a year of EVI values (an array with one element per row in rows) 
+        to the EVI history of the given rows, dropping the oldest year, and 
+        updates the two year mean EVI.
+        """
+        history = self.EVI_history
+        history[rows, :-1] = history[rows, 1:]
+        history[rows, -1] = EVI
+        self.EVI_2yr_mean[rows] = np.mean(history[rows, -2:], axis=1)
+
+    def set_EVI_history(self, row, EVI_values):
+        """
+        Sets the EVI history of a row from a sequence of EVI values (oldest 
+        first). Only the last EVI_HISTORY_DEPTH values are kept.
+        """
+        EVI_values = list(EVI_values)[-EVI_HISTORY_DEPTH:]
+        self.EVI_history[row] = np.nan
+        if len(EVI_values) > 0:
+            self.EVI_history[row, -len(EVI_values):] = EVI_values
+            self.EVI_2yr_mean[row] = np.mean(EVI_values[-2:])
+
+# Codes used to record why a person was added to the PersonArchive.
+ARCHIVE_REASON_CODES = {'death': 0,
+                        'outmigration': 1,
+                        'migration': 2}
+ARCHIVE_REASON_LABELS = _invert(ARCHIVE_REASON_CODES)
+
+class PersonArchive(object):
+    """
+    Records the persons that can no longer affect the model: persons who have
+    died, persons who permanently out-migrated (with their household, or after
+    a divorce while away), and persons who left on a permanent LL or LD
+    migration. Archived persons are made inactive in the PersonTable, so they
+    are excluded from the array-based submodels, and they are no longer held
+    by the households or agent stores that are iterated over during a
+    timestep.
+
+    The archive stores one compact record per person (their row in the
+    PersonTable, the reason they were archived, and the timestep) and is kept
+    for debugging and for output. A person's attributes remain available from
+    their row in the PersonTable, but the table's reference to the Person
+    instance is released (see release), so that the instance is freed once no
+    other agent refers to it. The instance is kept while the person is still
+    married to an active person, as the spouse can still refer to them (for
+    example in a divorce). Note that Person instances are also kept while
+    they are the parent of a person who is still in the model, and that the
+    numeric columns of archived rows are not reclaimed.
+    """
+    def __init__(self, table):
+        self._table = table
+        self._rows = array('l')
+        self._reasons = array('b')
+        self._timesteps = array('l')
+        # _positions maps rows in the PersonTable to positions in the archive.
+        self._positions = {}
+
+    def add(self, person, reason, timestep):
+        """
+        Archives a person, making them inactive in the person table. If the
+        person is already in the archive, their record is updated.
+        """
+        row = person._row
+        table = self._table
+        table.active[row] = False
+        if row in self._positions:
+            position = self._positions[row]
+            self._reasons[position] = ARCHIVE_REASON_CODES[reason]
+            self._timesteps[position] = timestep
+        else:
+            self._positions[row] = len(self._rows)
+            self._rows.append(row)
+            self._reasons.append(ARCHIVE_REASON_CODES[reason])
+            self._timesteps.append(timestep)
+        self.release(row)
+        # If the person's spouse was archived earlier, the spouse's instance 
+        # was kept because this person was still active.
+        spouse_row = table.spouse[row]
+        if spouse_row >= 0 and not table.active[spouse_row]:
+            self.release(spouse_row)
+
+    def release(self, row):
+        """
+        Releases the Person instance of an archived row from the person table, 
+        unless the person is still married to an active person. Must be called 
+        again when the marriage of an archived person ends.
+        """
+        table = self._table
+        if not row in self._positions or table.active[row]:
+            return
+        spouse_row = table.spouse[row]
+        if spouse_row >= 0 and table.active[spouse_row]:
+            return
+        table.release_agent(row)
+
+    def in_archive(self, person):
+        return person._row in self._positions
+
+    def get_reason(self, person):
+        "Returns the reason a person was archived (or None if not archived)."
+        if not person._row in self._positions:
+            return None
+        return ARCHIVE_REASON_LABELS[self._reasons[self._positions[person._row]]]
+
+    def get_rows(self, reason=None):
+        """
+        Returns the rows in the person table of the archived persons, 
+        optionally limited to those archived for a given reason.
+        """
+        rows = np.array(self._rows, dtype=int)
+        if reason == None:
+            return rows
+        reasons = np.array(self._reasons, dtype=int)
+        return rows[reasons == ARCHIVE_REASON_CODES[reason]]
+
+    def get_persons(self, reason=None):
+        """
+        Returns a list of the archived Person instances that have not been 
+        released (see release).
+        """
+        return [person for person in self._table.get_agents(self.get_rows(reason)) 
+                if person != None]
+
+    def num_persons(self, reason=None):
+        return len(self.get_rows(reason))
+
+def column_property(column, doc=None):
+    """
+    Returns a property that reads and writes an attribute of an agent from its
+    row in a table. Float columns use NaN to represent None.
+    """
+    def fget(self):
+        value = getattr(self._table, column).item(self._row)
+        if value != value:
+            # NaN is used to store None
+            return None
+        return value
+    def fset(self, value):
+        if value is None:
+            value = np.nan
+        getattr(self._table, column)[self._row] = value
+    return property(fget, fset, doc=doc)
+
+class ColumnDictView(object):
+    """
+    A dictionary-like view of several columns of a single row of a table, 
+    keyed by name. Used to keep the dictionary interface of attributes (like 
+    Neighborhood.NFOs) that are stored in a table.
+    """
+    def __init__(self, table, row, columns):
+        self._table = table
+        self._row = row
+        # columns maps each key to the name of a column in the table
+        self._columns = columns
+
+    def __getitem__(self, key):
+        value = getattr(self._table, self._columns[key]).item(self._row)
+        if value != value:
+            # NaN is used to store None
+            return None
+        return value
+
+    def __setitem__(self, key, value):
+        if value is None:
+            value = np.nan
+        getattr(self._table, self._columns[key])[self._row] = value
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def keys(self):
+        return self._columns.keys()
+
+    def items(self):
+        return [(key, self[key]) for key in self._columns]
+
+def column_dict_property(columns, doc=None):
+    """
+    Returns a property that reads and writes a dictionary-like attribute of an 
+    agent (see ColumnDictView), where columns maps each key to the name of a 
+    column in the table. Assigning a dictionary to the property sets the 
+    values of the keys it contains.
+    """
+    def fget(self):
+        return ColumnDictView(self._table, self._row, columns)
+    def fset(self, values):
+        view = ColumnDictView(self._table, self._row, columns)
+        for key, value in values.items():
+            view[key] = value
+    return property(fget, fset, doc=doc)
+
+def code_column_property(column, doc=None):
+    """
+    Returns a property that reads and writes a categorical attribute of an agent
+    as its integer code (see SEX_CODES, ETHNICITY_CODES, etc.). A code of -1 is
+    used to represent None.
+    """
+    def fget(self):
+        code = getattr(self._table, column).item(self._row)
+        if code == -1:
+            return None
+        return code
+    def fset(self, code):
+        if code is None:
+            code = -1
+        getattr(self._table, column)[self._row] = code
+    return property(fget, fset, doc=doc)
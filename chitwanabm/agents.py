@@ -31,63 +31,263 @@ import logging
 import numpy as np
 
 from pyabm import IDGenerator, boolean_choice
-from pyabm.statistics import draw_from_prob_dist
 from pyabm.agents import Agent, Agent_set, Agent_Store
 
 from chitwanabm import rc_params
-from chitwanabm.statistics import calc_probability_death, \
+from chitwanabm.results import person_events, PERSON_RECORD_DTYPE
+from chitwanabm.agent_tables import PersonTable, PersonArchive, \
+        HouseholdTable, NeighborhoodTable, column_property, \
+        code_column_property, column_dict_property, get_label, SEX_CODES, \
+        SEX_LABELS, SCHOOL_STATUS_CODES, FOREST_TYPE_LABELS, NFO_TYPES, \
+        LAND_USE_COLUMNS
+from chitwanabm.statistics import calc_probability_death_vector, \
         calc_first_birth_time, calc_birth_interval, calc_hh_area, \
         calc_des_num_children, calc_first_birth_prob_zvoleff, \
+        calc_first_birth_neighborhood_term_zvoleff, \
+        calc_LD_migration_neighborhood_term_zvoleff, \
         calc_migration_length, calc_education_level, calc_spouse_age_diff, \
-        choose_spouse, calc_num_inmigrant_households, \
+        match_spouses, calc_num_inmigrant_households, \
         calc_inmigrant_household_ethnicity, calc_inmigrant_household_size, \
+        get_sampler, \
         calc_probability_HH_outmigration, calc_probability_divorce, \
-        calc_fuelwood_usage_probability, calc_TLU_livestock, \
-        calc_total_possessions
+        calc_fuelwood_usage_probability, calc_fuelwood_usage_probability_vector, \
+        calc_TLU_livestock, \
+        calc_total_possessions, PERMANENT_MIGRATION_TIMESTEP
 
 logger = logging.getLogger(__name__)
-person_event_logger = logging.getLogger('person_events')
 
 rcParams = rc_params.get_params()
 
-def log_event_record(message, person, modeltime, **kwargs):
-    extra = {'modeltime' : modeltime,
-             'personinfo' : ",".join(person.get_info())}
-    person_event_logger.info(message, extra=extra, **kwargs)
+# The neighborhood-level parts of the linear predictors of the submodels do not 
+# vary between the persons in a neighborhood, so they are calculated once for 
+# all neighborhoods and cached by each region until the neighborhood state they 
+# depend on changes (see Region.get_neighborhood_term). NEIGHBORHOOD_TERMS maps 
+# the name of each term to a tuple of the function that calculates it, and the 
+# columns of the neighborhood table that are passed (in order) to the function.
+NEIGHBORHOOD_TERMS = {}
+
+NEIGHBORHOOD_TERMS['first_birth'] = (calc_first_birth_neighborhood_term_zvoleff, 
+        ['land_total', 'land_agveg', 'distnara', 'elec_available', 
+         'avg_yrs_services_lt15'])
+NEIGHBORHOOD_TERMS['LD_migration'] = (calc_LD_migration_neighborhood_term_zvoleff, 
+        ['market_min_ft'])
 
 if rcParams['submodel.parameterization.marriage'] == 'simple':
-    from chitwanabm.statistics import calc_probability_marriage_simple as calc_probability_marriage
+    from chitwanabm.statistics import calc_probability_marriage_simple_vector
 elif rcParams['submodel.parameterization.marriage'] == 'zvoleff':
-    from chitwanabm.statistics import calc_probability_marriage_zvoleff as calc_probability_marriage
+    from chitwanabm.statistics import calc_probability_marriage_zvoleff_vector, \
+            calc_marriage_neighborhood_term_zvoleff
+    NEIGHBORHOOD_TERMS['marriage'] = (calc_marriage_neighborhood_term_zvoleff, 
+            ['land_agveg', 'land_total', 'school_min_ft', 'health_min_ft', 
+             'bus_min_ft', 'market_min_ft', 'employer_min_ft'])
 else:
     raise Exception("Unknown option for marriage parameterization: '%s'"%rcParams['submodel.parameterization.marriage'])
 
 if rcParams['submodel.parameterization.LL_migration'] == 'zvoleff':
-    from chitwanabm.statistics import calc_probability_LL_migration_zvoleff as calc_probability_LL_migration
+    from chitwanabm.statistics import calc_probability_LL_migration_zvoleff_vector as calc_probability_LL_migration_vector, \
+            calc_LL_migration_neighborhood_term_zvoleff as calc_LL_migration_neighborhood_term, \
+            calc_LL_migration_household_term_zvoleff as calc_LL_migration_household_term
+    NEIGHBORHOOD_TERMS['LL_migration'] = (calc_LL_migration_neighborhood_term, 
+            ['EVI_t0', 'EVI_2yr_mean', 'elevation_above_river', 'school_min_ft', 
+             'market_min_ft', 'employer_min_ft', 'num_groups'])
 else:
     raise Exception("Unknown option for migration parameterization: '%s'"%rcParams['submodel.parameterization.LL_migration'])
 
 if rcParams['submodel.parameterization.LD_migration'] == 'simple':
-    from chitwanabm.statistics import calc_probability_LD_migration_simple as calc_probability_LD_migration
+    from chitwanabm.statistics import calc_probability_LD_migration_simple_vector as calc_probability_LD_migration_vector
 elif rcParams['submodel.parameterization.LD_migration'] == 'zvoleff':
-    from chitwanabm.statistics import calc_probability_LD_migration_zvoleff as calc_probability_LD_migration
+    from chitwanabm.statistics import calc_probability_LD_migration_zvoleff_vector as calc_probability_LD_migration_vector
 else:
     raise Exception("Unknown option for migration parameterization: '%s'"%rcParams['submodel.parameterization.LD_migration'])
 
 if rcParams['submodel.parameterization.fuelwood_usage'] == 'simple':
-    from chitwanabm.statistics import calc_daily_fuelwood_usage_simple as calc_daily_fuelwood_usage
+    from chitwanabm.statistics import calc_daily_fuelwood_usage_simple as calc_daily_fuelwood_usage, \
+            calc_daily_fuelwood_usage_simple_vector as calc_daily_fuelwood_usage_vector
 elif rcParams['submodel.parameterization.fuelwood_usage'] == 'migrationfeedback':
-    from chitwanabm.statistics import calc_daily_fuelwood_usage_migration_feedback as calc_daily_fuelwood_usage
+    from chitwanabm.statistics import calc_daily_fuelwood_usage_migration_feedback as calc_daily_fuelwood_usage, \
+            calc_daily_fuelwood_usage_migration_feedback_vector as calc_daily_fuelwood_usage_vector
 else:
     raise Exception("Unknown option for fuelwood usage: '%s'"%rcParams['submodel.parameterization.fuelwood_usage'])
 
+class MigrantStore(Agent_Store):
+    """
+    Stores person agents who are away on a migration, and returns them to their 
+    households when their migration ends. Migrants are kept in a calendar queue 
+    (a dictionary of lists keyed by the timestep of their return), so releasing 
+    the migrants returning in a timestep only requires visiting those 
+    migrants. Permanent migrants (those with a return timestep of 
+    PERMANENT_MIGRATION_TIMESTEP) will never be released, so they are not 
+    stored (see Person.make_individual_LL_migration).
+    """
+    def __init__(self):
+        # self._releases is the calendar queue: a dictionary, keyed by 
+        # timestep, of lists of the agents returning in that timestep.
+        self._releases = {}
+        self._parent_dict = {}
+
+    def add_agent(self, agent, release_time):
+        """
+        Adds a new agent to the agent store. Also remove the agent from it's 
+        parent Agent_set instance.
+        """
+        if release_time in self._releases:
+            self._releases[release_time].append(agent)
+        else:
+            self._releases[release_time] = [agent]
+        self._parent_dict[agent] = agent.get_parent_agent()
+        # Store a reference to the agent store with the class instance that is 
+        # being stored, for easy retrieval later
+        agent._store_list += (self,)
+        agent.get_parent_agent().remove_agent(agent)
+
+    def release_agents(self, time):
+        """
+        Returns the agents whose migrations end at time to their households.  
+        Returns a dictionary of the number of agents released, keyed by 
+        neighborhood ID, and a list of the released agents.
+        """
+        released_agents = []
+        released_agents_dict = {}
+        for agent in self._releases.pop(time, []):
+            parent_agent = self._parent_dict.pop(agent)
+            parent_agent.add_agent(agent)
+            agent._store_list = tuple(store for store in agent._store_list 
+                    if store is not self)
+            neighborhood = parent_agent.get_parent_agent()
+            if not neighborhood.get_ID() in released_agents_dict:
+                released_agents_dict[neighborhood.get_ID()] = 0
+            released_agents_dict[neighborhood.get_ID()] += 1
+            released_agents.append(agent)
+        return released_agents_dict, released_agents
+
+    def in_store(self, agent):
+        return agent in self._parent_dict
+
+    def remove_agent(self, agent):
+        """
+        Remove an agent from the store without releasing it to its original 
+        location (useful for handling agents who die while away from home).
+        """
+        self._releases[agent._return_timestep].remove(agent)
+        if self._releases[agent._return_timestep] == []:
+            self._releases.pop(agent._return_timestep)
+        self._parent_dict.pop(agent)
+        agent._store_list = tuple(store for store in agent._store_list 
+                if store is not self)
+
+    def iter_agents(self):
+        """
+        Returns an iterator over the agents in the store, in order of their 
+        return timestep.
+        """
+        for release_time in sorted(self._releases.keys()):
+            for agent in self._releases[release_time]:
+                yield agent
+
+    def num_agents(self):
+        return len(self._parent_dict)
+
+    def __str__(self):
+        return 'MigrantStore(%s queued)'%self.num_agents()
+
+def parent_property(column):
+    """
+    Returns a property for a parent (the mother or father) of a person. The 
+    parent Person instance is kept in a slot of the person, and the row of the 
+    parent is stored in the given column of the person table (-1 if the 
+    parent is unknown), so that the parents' attributes can be read for many 
+    persons at once (see World.get_person_records).
+    """
+    slot = '_%s_agent'%column
+    def fget(self):
+        return getattr(self, slot)
+    def fset(self, parent):
+        setattr(self, slot, parent)
+        # While the initial agents are assembled (see 
+        # initialize.assemble_persons) parents are given by ID until all the 
+        # Person instances have been created.
+        if isinstance(parent, Person):
+            getattr(self._table, column)[self._row] = parent._row
+        else:
+            getattr(self._table, column)[self._row] = -1
+    return property(fget, fset)
+
 class Person(Agent):
-    "Represents a single person agent"
-    def __init__(self, world, birthdate, ID=None, mother=None, father=None,
-            age=None, sex=None, initial_agent=False, ethnicity=None, 
-            in_migrant=False):
+    """
+    Represents a single person agent. The attributes used by the demographic 
+    submodels are stored in the person table of the world (see 
+    agent_tables.PersonTable), so a Person instance is a view onto its row in 
+    that table.
+
+    Person uses __slots__ to limit the memory used by each instance. The 
+    parental and childhood context of each person is stored in the person 
+    table rather than on the instance. pyabm's Agent class does not use 
+    __slots__, so instances still have a __dict__, but the attributes set by 
+    Agent.__init__ are also given slots (or are table columns), so the 
+    __dict__ is never created.
+    """
+    __slots__ = ['_world', '_parent_agent', '_table', '_row', 
+            '_counted_neighborhood', '_birthdate', '_deathdate', '_father_agent', '_mother_agent', '_children', 
+            '_final_schooling_level', '_birth_household_ID', 
+            '_birth_neighborhood_ID', '_store_list', '_last_household', 
+            '_last_migration_type', '_last_migration_time', 
+            '_last_migration_months', '_perm_away', '_return_timestep', 
+            '_ever_divorced', '_ever_widowed', '_last_divorce_check']
+
+    _ID = column_property('ID')
+    _initial_agent = column_property('initial_agent')
+    _in_migrant = column_property('in_migrant')
+    _mother = parent_property('mother')
+    _father = parent_property('father')
+    _work = column_property('work')
+    _agemonths = column_property('agemonths')
+    # Sex, ethnicity and school status are stored as codes (see 
+    # agent_tables.SEX_CODES, etc.)
+    _sex = code_column_property('sex')
+    _ethnicity = code_column_property('ethnicity')
+    _marriage_time = column_property('marriage_time')
+    _schooling = column_property('schooling')
+    _school_status = code_column_property('school_status')
+    _away = column_property('away')
+    _alive = column_property('alive')
+    _number_of_children = column_property('num_children')
+    _des_num_children = column_property('des_num_children')
+    _first_birth_timing = column_property('first_birth_timing')
+    _last_birth_time = column_property('last_birth_time')
+    _birth_interval = column_property('birth_interval')
+    _parents_contracep_ever = column_property('parents_contracep_ever')
+    _mother_work = column_property('mother_work')
+    _father_work = column_property('father_work')
+    _mother_years_schooling = column_property('mother_years_schooling')
+    _father_years_schooling = column_property('father_years_schooling')
+    _mother_num_children = column_property('mother_num_children')
+    _child_school_lt_1hr_ft = column_property('child_school_lt_1hr_ft')
+    _child_health_lt_1hr_ft = column_property('child_health_lt_1hr_ft')
+    _child_bus_lt_1hr_ft = column_property('child_bus_lt_1hr_ft')
+    _child_market_lt_1hr_ft = column_property('child_market_lt_1hr_ft')
+    _child_employer_lt_1hr_ft = column_property('child_employer_lt_1hr_ft')
+
+    def __init__(self, world, birthdate, row, ID=None, mother=None, 
+            father=None, initial_agent=False, in_migrant=False):
+        """
+        Persons should be created with World.new_person or World.new_persons, 
+        which allocate the person's row in the person table, fill in the 
+        columns of the row (age, sex, ethnicity, etc.), and draw the random 
+        initial attributes of the person.
+        """
+        # The ID and initial agent flag (set by Agent.__init__) are stored in 
+        # the person table, so the row must be set first.
+        self._table = world._person_table
+        self._row = row
+        self._table.set_agent(row, self)
+
         Agent.__init__(self, world, ID, initial_agent)
 
+        # _counted_neighborhood is the neighborhood whose population and 
+        # marriage counters include this person (the neighborhood of their 
+        # household, while they are resident), or None.
+        self._counted_neighborhood = None
+
         # birthdate is the timestep of the birth of the agent. It is used to 
         # calculate the age of the agent. Agents have a birthdate of 0 if they 
         # were BORN in the first timestep of the model.  If they were used to 
@@ -97,7 +297,6 @@ class Person(Agent):
         # deathdate is used for tracking agent deaths in the results, mainly 
         # for debugging.
         self._deathdate = None
-        self._alive = True
 
         # self._initial_agent is set to "True" for agents that were used to 
         # initialize the model.
@@ -105,14 +304,6 @@ class Person(Agent):
 
         self._in_migrant = in_migrant
 
-        # self._agemonths is used as a convenience to avoid the need to calculate the 
-        # agent's age from self._birthdate each time it is needed. It is         
-        # important to remember though that all agent's ages must be 
-        # incremented with each model timestep, and are expressed in months.
-        # The age starts at 0 (it is zero for the entire first timestep of the 
-        # model).
-        self._agemonths = age
-
         # Also need to store information on the agent's parents. For agents 
         # used to initialize the model both parent fields are set to "None"
         if father == None:
@@ -125,92 +316,26 @@ class Person(Agent):
         else:
             self._mother = mother
 
-        if sex==None:
-            # Person agents are randomly assigned a sex
-            if boolean_choice():
-                self._sex = 'female'
-            else:
-                self._sex = 'male'
-        elif sex in ['male', 'female']:
-            self._sex = sex
-        else:
-            raise ValueError("%s is not a valid gender"%(sex))
-
-        # The agent's ethnicity in the CVFS data as 1: High Caste Hindu, 2: 
-        # Hill Tibetoburmese, 3: Low Caste Hindu, 4: Newar, 5: Terai 
-        # Tibetoburmese, 6: Other. Other is dropped from the model for 
-        # consistency of published works. Here ethnicity is converted to a 
-        # textual representation for clarity (see the preprocessing code).
-        self._ethnicity = ethnicity
-
-        # If not defined at birth, self._des_num_children will be defined (for 
-        # women) at marriage in the "marry" function.
-        self._des_num_children = None
-
-        if self._sex == "female":
-            # For initial agents, birth interval is set in initialize.py.
-            self._birth_interval = calc_birth_interval()
-            self._last_birth_time = None
-        
-        # Note that first birth timing is assigned to men, just to make 
-        # outputting results easier, so that we don't have to check if a value 
-        # is assigned.
-        self._first_birth_timing = calc_first_birth_time(self)
-
         self._spouse = None
 
         self._children = []
-        self._number_of_children = 0
-
-        self._marriage_time = None
 
-        self._schooling = 0
         self._final_schooling_level = None
-        if self._agemonths > 12*22:
-            self._school_status = "outofschool"
-        else:
-            self._school_status = "undetermined"
-
-        if self._sex == "female":
-            self._work = boolean_choice(.205) # T1 indiv interview
-        else:
-            self._work = boolean_choice(.450) # T1 indiv interview
-
-        self._parents_contracep_ever = boolean_choice(.53) # Ghimire, Axinn (2010)
-
-        if in_migrant:
-            # These values are set in the give_birth method of mother agents 
-            # for agents born within the model run, and in initialize.py for 
-            # agents that initialize the model.
-            if (self._agemonths / 12.) > rcParams['education.start_school_age_years']:
-                self._schooling = np.random.randint(1, 15)
-                #TODO: Fix this to also allow in-school status
-                self._school_status == "outofschool"
-            self._mother_work = boolean_choice()
-            self._father_work = boolean_choice()
-            #TODO: fix this value elsewhere according to empirical probability
-            self._mother_years_schooling = np.random.randint(1, 15)
-            self._father_years_schooling = np.random.randint(1, 15)
-            #self._mother_years_schooling = calc_education_level(initial=True)
-            #self._father_years_schooling = calc_education_level(initial=True)
-            self._mother_num_children = np.random.randint(1, 6)
-            self._child_school_lt_1hr_ft = boolean_choice()
-            self._child_health_lt_1hr_ft = boolean_choice()
-            self._child_bus_lt_1hr_ft = boolean_choice()
-            self._child_market_lt_1hr_ft = boolean_choice()
-            self._child_employer_lt_1hr_ft = boolean_choice()
-            if self._sex == "female":
-                self._des_num_children = calc_des_num_children()
 
         # These values are set in the give_birth method of mother agents
         self._birth_household_ID = None
         self._birth_neighborhood_ID = None
 
         # _store_list tracks any agent_store instances this person is a member 
-        # of (for LL or LD migration for example).
-        self._store_list = []
-        self._last_migration = {'type':None, 'time':None, 'duration_months':None}
-        self._away = False
+        # of (for LL or LD migration for example). It is a tuple, so that 
+        # persons who are not in any store can share the empty tuple.
+        self._store_list = ()
+        # _last_household is the household of the person when they were last 
+        # added to a household (see Household.add_agent).
+        self._last_household = None
+        self._last_migration_type = None
+        self._last_migration_time = None
+        self._last_migration_months = None
         self._perm_away = False
         self._return_timestep = None
 
@@ -219,43 +344,40 @@ class Person(Agent):
 
         self._last_divorce_check = -9999
 
-    def get_info(self):
-        "Returns basic info about this person for use in logging."
-        if self._spouse != None:
-            spouse = self._spouse.get_ID()
-        else:
-            spouse = None
-        if self._mother != None:
-            mother = self._mother.get_ID()
-        else: 
-            mother = None
-        if self._father != None:
-            father = self._father.get_ID()
-        else: 
-            father = None
-        if self.is_away():
-            household = self._last_household.get_ID()
-            neighborhood = self._last_household.get_parent_agent().get_ID()
-            region = self._last_household.get_parent_agent().get_parent_agent().get_ID()
+    def _get_spouse(self):
+        spouse_row = self._table.spouse.item(self._row)
+        if spouse_row < 0:
+            return None
+        return self._table.get_agent(spouse_row)
+
+    def _set_spouse(self, spouse):
+        neighborhood = self._counted_neighborhood
+        if neighborhood != None:
+            # Keep the marriage counters of the neighborhood up to date.
+            neighborhood._uncount_spouse(self)
+        if spouse == None:
+            self._table.spouse[self._row] = -1
+            if not self._table.active[self._row]:
+                # An archived person is kept in the person table while they are 
+                # married to an active person (see PersonArchive.release).
+                self._world._person_archive.release(self._row)
         else:
-            household = self.get_parent_agent().get_ID()
-            neighborhood = self.get_parent_agent().get_parent_agent().get_ID()
-            region = self.get_parent_agent().get_parent_agent().get_parent_agent().get_ID()
- 
-        return (str(self.get_ID()), str(household), str(neighborhood), 
-                str(region), str(self.get_sex()),
-                str(self.get_age_years()), str(self.get_ethnicity()), 
-                str(mother), str(father), str(spouse), 
-                str(self._marriage_time), str(self._schooling), 
-                str(self._number_of_children),
-                str(self._alive), str(self.is_away()), 
-                str(self.is_initial_agent()), str(self.is_in_migrant()),
-                str(self.get_mother_num_children()),
-                str(self.get_mother_years_schooling()),
-                str(self.get_mother_work()),
-                str(self.get_father_years_schooling()),
-                str(self.get_father_work()),
-                str(self._parents_contracep_ever))
+            self._table.spouse[self._row] = spouse._row
+        if neighborhood != None:
+            neighborhood._count_spouse(self)
+
+    # The spouse is stored in the person table as the row of the spouse.
+    _spouse = property(_get_spouse, _set_spouse)
+
+    def get_event_record(self):
+        """
+        Returns the attributes of this person that are recorded with each 
+        person event, in the order of the fields of 
+        results.PERSON_RECORD_DTYPE. The record is read from the columns of 
+        the person table, in the same way as the records of 
+        World.get_person_records. Undefined IDs are returned as -1.
+        """
+        return tuple(self._world.get_person_records([self._row])[0])
 
     def get_mother(self):
         return self._mother
@@ -291,7 +413,7 @@ class Person(Agent):
         return self._away
 
     def is_in_school(self):
-        if self._school_status == "inschool": return True
+        if self._school_status == SCHOOL_STATUS_CODES['inschool']: return True
         else: return False
 
     def get_mother_years_schooling(self):
@@ -344,20 +466,28 @@ class Person(Agent):
         return self._in_migrant
 
     def make_individual_LL_migration(self, time, timestep, region, BURN_IN=False):
-        log_event_record("LL_migration", self, timestep)
+        person_events.record("LL_migration", self, timestep)
         household = self.get_parent_agent()
         household._lastmigrant_time = time
-        household._members_away.append(self)
 
         months_away = calc_migration_length(self, BURN_IN)
-        # The add_agent function of the agent_store class also handles removing 
-        # the agent from its parent (the household), and adding the agent_store 
-        # to the person's store_list
         self._return_timestep = timestep + months_away
-        region._agent_stores['person']['LL_migr'].add_agent(self, self._return_timestep)
-        self._last_migration['type'] = 'LL'
-        self._last_migration['time'] = time
-        self._last_migration['duration_months'] = months_away
+        if self._return_timestep >= PERMANENT_MIGRATION_TIMESTEP:
+            # Permanent migrants will never return, so rather than being kept 
+            # as away members of their household they are removed from it (the 
+            # household is destroyed if this leaves it empty) and archived.
+            household.remove_agent(self)
+            self._perm_away = True
+            self._world._person_archive.add(self, 'migration', timestep)
+        else:
+            household._members_away.append(self)
+            # The add_agent function of the agent_store class also handles 
+            # removing the agent from its parent (the household), and adding 
+            # the agent_store to the person's store_list
+            region._agent_stores['person']['LL_migr'].add_agent(self, self._return_timestep)
+        self._last_migration_type = 'LL'
+        self._last_migration_time = time
+        self._last_migration_months = months_away
         self._away = True
 
     def return_from_LL_migration(self):
@@ -369,20 +499,28 @@ class Person(Agent):
         self._away = False
 
     def make_individual_LD_migration(self, time, timestep, region, BURN_IN=False):
-        log_event_record("LD_migration", self, timestep)
+        person_events.record("LD_migration", self, timestep)
         household = self.get_parent_agent()
         household._lastmigrant_time = time
-        household._members_away.append(self)
 
         months_away = calc_migration_length(self, BURN_IN)
-        # The add_agent function of the agent_store class also handles removing 
-        # the agent from its parent (the household), and adding the agent_store 
-        # to the person's store_list
         self._return_timestep = timestep + months_away
-        region._agent_stores['person']['LD_migr'].add_agent(self, self._return_timestep)
-        self._last_migration['type'] = 'LD'
-        self._last_migration['time'] = time
-        self._last_migration['duration_months'] = months_away
+        if self._return_timestep >= PERMANENT_MIGRATION_TIMESTEP:
+            # Permanent migrants will never return, so rather than being kept 
+            # as away members of their household they are removed from it (the 
+            # household is destroyed if this leaves it empty) and archived.
+            household.remove_agent(self)
+            self._perm_away = True
+            self._world._person_archive.add(self, 'migration', timestep)
+        else:
+            household._members_away.append(self)
+            # The add_agent function of the agent_store class also handles 
+            # removing the agent from its parent (the household), and adding 
+            # the agent_store to the person's store_list
+            region._agent_stores['person']['LD_migr'].add_agent(self, self._return_timestep)
+        self._last_migration_type = 'LD'
+        self._last_migration_time = time
+        self._last_migration_months = months_away
         self._away = True
 
     def return_from_LD_migration(self):
@@ -394,7 +532,7 @@ class Person(Agent):
         self._away = False
 
     def kill(self, time, timestep):
-        log_event_record("Death", self, timestep)
+        person_events.record("Death", self, timestep)
         self._alive = False
         self._deathdate = time
         if self.is_married():
@@ -414,17 +552,26 @@ class Person(Agent):
             household.remove_agent(self)
         # Remove agents from their agent store if they die while in an 
         # agent_store
-        if self._store_list != []:
+        if self._store_list != ():
             for store in self._store_list:
                 logger.debug("Away out-migrant %s died"%self.get_ID())
                 store.remove_agent(self)
+        # Archive the person last, as archiving releases the Person instances 
+        # of the person (and of their spouse, if archived earlier) from the 
+        # person table (see PersonArchive.release).
+        self._world._person_archive.add(self, 'death', timestep)
 
     def make_permanent_outmigration(self, timestep):
         """
         Permanently removes an agent from a model. Will also work on people who 
         are not currently present in Chitwan Valley, and are resident only in 
-        agent stores.
+        agent stores. Persons who are already archived (permanent LL or LD 
+        migrants) have already been removed from the model, so nothing is done 
+        for them.
         """
+        if self._world._person_archive.in_archive(self):
+            logger.debug("Person %s already permanently out-migrated"%self.get_ID())
+            return
         if not self.is_away():
             # People who are away don't need to be removed from a household.
             logger.debug("Person %s permanently out-migrated (while NOT away)"%self.get_ID())
@@ -440,9 +587,10 @@ class Person(Agent):
         self._perm_away = True
         # Remove agents from any agent store if they are in them while in an 
         # agent_store
-        if self._store_list != []:
+        if self._store_list != ():
             for store in self._store_list:
                 store.remove_agent(self)
+        self._world._person_archive.add(self, 'outmigration', timestep)
 
     def marry(self, spouse, time):
         "Marries this agent to another Person instance."
@@ -454,7 +602,7 @@ class Person(Agent):
         spouse._spouse = self
         # Also assign first birth timing and desired number of children to the 
         # female (if not already defined, which it will be for initial agents).
-        if self.get_sex() == "female":
+        if self.get_sex() == SEX_CODES['female']:
             female = self
         else:
             female = spouse
@@ -490,7 +638,7 @@ class Person(Agent):
         # size.  Note that des_num_children=-1 means no preference ("god's 
         # will").
         num_children = self.get_num_children()
-        if (not (self.get_sex() == 'female')) or (not self.is_married()) or \
+        if (not (self.get_sex() == SEX_CODES['female'])) or (not self.is_married()) or \
                 ((num_children > self._des_num_children) and (self._des_num_children != -1)) or \
                 (self._agemonths > (rcParams['birth.max_age.years'] * 12)) or \
                 (self._agemonths < (rcParams['birth.min_age.years'] * 12)):
@@ -510,32 +658,39 @@ class Person(Agent):
                 if (np.random.rand() < calc_first_birth_prob_ghimireaxinn2010(self, time)) & ((time - self._marriage_time) >= 9/12.):
                     first_birth_flag = True
             elif rcParams['submodel.parameterization.firstbirth'] == 'zvoleff':
-                if (np.random.rand() < calc_first_birth_prob_zvoleff(self, time)) & ((time - self._marriage_time) >= 9/12.):
+                neighborhood = self.get_parent_agent().get_parent_agent()
+                neighborhood_term = neighborhood.get_parent_agent().get_neighborhood_term('first_birth')[neighborhood._index]
+                if (np.random.rand() < calc_first_birth_prob_zvoleff(self, time, neighborhood_term)) & ((time - self._marriage_time) >= 9/12.):
                     first_birth_flag = True
             else:
                 raise Exception("Unknown option for first birth timing parameterization: '%s'"%rcParams['submodel.parameterization.firstbirth'])
             if first_birth_flag == True:
                 logger.debug("First birth to agent %s (age %.2f, marriage time %.2f)"%(self.get_ID(), self.get_age_years(), self._marriage_time))
-                log_event_record("First birth", self, timestep)
+                person_events.record("First birth", self, timestep)
                 return True
             else: return False
         else:
             # Handle births to mothers who have already given birth in the 
             # past:
             if (time > (self._last_birth_time + self._birth_interval/12.)):
-                log_event_record("Subsequent birth", self, timestep)
+                person_events.record("Subsequent birth", self, timestep)
                 return True
             else: return False
 
-    def give_birth(self, time, timestep, father, simulate=False):
-        "Agent gives birth. New agent inherits characterists of parents."
-        assert self.get_sex() == 'female', "Men can't give birth"
+    def give_birth(self, time, timestep, father, simulate=False, baby=None):
+        """
+        Agent gives birth. New agent inherits characterists of parents. baby 
+        can be given if the new person agent was already created (see 
+        Region.births).
+        """
+        assert self.get_sex() == SEX_CODES['female'], "Men can't give birth"
         assert self.get_spouse().get_ID() == father.get_ID(), "All births must be in marriages"
         assert self.get_ID() != father.get_ID(), "No immaculate conception (agent: %s)"%(self.get_ID())
         if simulate:
             baby = None
         else:
-            baby = self._world.new_person(birthdate=time, age=0, mother=self, father=father, ethnicity=self.get_ethnicity())
+            if baby == None:
+                baby = self._world.new_person(birthdate=time, age=0, mother=self, father=father, ethnicity=self.get_ethnicity())
 
             neighborhood = self.get_parent_agent().get_parent_agent()
         
@@ -555,7 +710,7 @@ class Person(Agent):
 
             logger.debug('New birth to %s, (age %.2f, %s total children, %s desired, next birth %.2f)'%(self.get_ID(), self.get_age_years(), self._number_of_children, self._des_num_children, self._birth_interval))
 
-            log_event_record("Birth", self, timestep)
+            person_events.record("Birth", self, timestep)
 
         self._last_birth_time = time
 
@@ -575,24 +730,46 @@ class Person(Agent):
         return "Person(PID: %s. Household: %s. Neighborhood: %s)" %(self.get_ID(), self.get_parent_agent().get_ID(), self.get_parent_agent().get_parent_agent().get_ID())
 
 class Household(Agent_set):
-    "Represents a single household agent"
+    """
+    Represents a single household agent. Household uses __slots__ to limit the 
+    memory used by each instance. As for Person, the attributes set by pyabm's 
+    Agent_set.__init__ are given slots, so the instance __dict__ is never 
+    created.
+    """
+    __slots__ = ['_world', '_ID', '_initial_agent', '_parent_agent', 
+            '_members', '_index', '_lastmigrant_time', '_members_away', 
+            '_hh_area', '_composition', '_any_non_wood_fuel', '_own_house_plot', 
+            '_own_land', '_rented_out_land', '_any_farming', '_TLU_livestock', 
+            '_total_possessions', '_own_any_bari', '_own_any_khet', 
+            '_own_household_plot', '_own_any_land']
+
     def __init__(self, world, ID=None, initial_agent=False):
+        """
+        Households should be created with World.new_household or 
+        World.new_households, which draw the random initial attributes of the 
+        household (land and fuel use, farming, livestock and possessions).
+        """
         Agent_set.__init__(self, world, ID, initial_agent)
-        self._any_non_wood_fuel = boolean_choice(.93) # From DS0002$BAE15
-        self._own_house_plot = boolean_choice(.829)  # From DS0002$BAA43
-        self._own_land = boolean_choice(.61) # From Axinn, Ghimire (2007)
-        self._rented_out_land = boolean_choice(.11) # From Axinn, Ghimire (2007)
+        # _index is the (dense) index of this household, used to refer to the 
+        # household in the person table. It is also the row of the household 
+        # in the household table, where its ID is stored.
+        self._index = world._household_table.add_row(None)
+        world._household_table.ID[self._index] = self.get_ID()
         self._lastmigrant_time = None
 
-        self._any_farming = boolean_choice(.8319) # 1996 CVFS
-        self._TLU_livestock = calc_TLU_livestock(self._any_farming)
-        self._total_possessions = calc_total_possessions()
-
         # The _members_away list tracks household members that area away 
         # (returning migrants).
         self._members_away = []
         self._hh_area = 0 # Area of house plot in square meters
 
+        # The household head and number of female members are cached (see 
+        # get_composition) as they are needed by the fuelwood submodels each 
+        # timestep. The cache is invalidated whenever a person is added to or 
+        # removed from the household (due to birth, death, marriage, divorce 
+        # or migration). As all members age at the same rate, aging cannot 
+        # change the household head.
+        self._composition = None
+
     def get_info(self):
         "Returns basic info about this household for use in logging."
         return (str(self.get_ID()), str(self._any_non_wood_fuel), 
@@ -617,15 +794,44 @@ class Household(Agent_set):
         "Returns all household members (including away migrants)."
         return self.get_agents() + self.get_away_members()
     
+    def get_composition(self):
+        """
+        Returns a dictionary summarizing the composition of the household, with 
+        keys:
+            head: the household head (the oldest member, or None if the 
+                household has no members present)
+            head_ethnicity: the ethnicity code of the household head
+            size: the number of members present
+            num_female: the number of female members present
+            num_away: the number of members away on migrations
+        """
+        if self._composition == None:
+            max_age = -1
+            hh_head = None
+            num_female = 0
+            for person in self.get_agents():
+                if person.get_age_months() > max_age:
+                    max_age = person.get_age_months()
+                    hh_head = person
+                if person.get_sex() == SEX_CODES['female']:
+                    num_female += 1
+            if hh_head == None:
+                head_ethnicity = None
+            else:
+                head_ethnicity = hh_head.get_ethnicity()
+            self._composition = {'head': hh_head, 
+                                 'head_ethnicity': head_ethnicity,
+                                 'size': self.num_members(),
+                                 'num_female': num_female}
+        # The number of members away is not cached as it is available directly 
+        # from the _members_away list.
+        self._composition['num_away'] = self.num_away_members()
+        return self._composition
+
     def get_hh_head(self):
-        max_age = -1
         if self.num_members() == 0:
             raise Exception("No household head for household %s. Household has no members"%self.get_ID())
-        for person in self.get_agents():
-            if person.get_age_months() > max_age:
-                max_age = person.get_age_months()
-                hh_head = person
-        return hh_head
+        return self.get_composition()['head']
 
     def own_house_plot(self):
         "Boolean for whether household owns the plot of land on which it resides"
@@ -658,7 +864,10 @@ class Household(Agent_set):
         this household empty. It it would leave it empty, then destroy this 
         household after removing the agent.
         """
+        if person._counted_neighborhood != None:
+            person._counted_neighborhood._uncount_person(person)
         Agent_set.remove_agent(self, person)
+        self._composition = None
         self.destroy_if_empty()
 
     def add_agent(self, person):
@@ -667,7 +876,35 @@ class Household(Agent_set):
         Agent_set so that we can also set the _last_household attribute on the new household member.
         """
         Agent_set.add_agent(self, person)
+        self._composition = None
         person._last_household = self
+        table = person._table
+        table.household[person._row] = self._index
+        neighborhood = self.get_parent_agent()
+        if neighborhood == None:
+            table.neighborhood[person._row] = -1
+        else:
+            table.neighborhood[person._row] = neighborhood._index
+            neighborhood._count_person(person)
+        table.active[person._row] = True
+
+    def update_member_locations(self):
+        """
+        Updates the household and neighborhood indices stored in the person 
+        table for all members of this household (including those who are away), 
+        and adds the resident members to the neighborhood counters.  Needs to 
+        be called when this household is added to a neighborhood.
+        """
+        neighborhood = self.get_parent_agent()
+        for person in self.iter_agents():
+            neighborhood._count_person(person)
+        members = self.get_all_HH_members()
+        if members == []:
+            return
+        table = members[0]._table
+        rows = [person._row for person in members]
+        table.household[rows] = self._index
+        table.neighborhood[rows] = self.get_parent_agent()._index
 
     def destroy_if_empty(self):
         """
@@ -682,6 +919,7 @@ class Household(Agent_set):
             neighborhood = self.get_parent_agent()
             neighborhood._land_agveg += self._hh_area
             neighborhood._land_privbldg -= self._hh_area
+            neighborhood.get_parent_agent().invalidate_neighborhood_terms(LAND_USE_COLUMNS)
             neighborhood.remove_agent(self)
             logger.debug("Household %s left empty - household removed from model"%self.get_ID())
 
@@ -697,41 +935,110 @@ class Household(Agent_set):
                 self.get_ID(), neighborhood.get_ID(), hhsize))
 
     def mean_gender(self):
-        gender_total = 0
-        for member in self.get_agents():
-            if member.get_sex() == 'female':
-                gender_total += 1
-        return gender_total / self.num_members()
+        composition = self.get_composition()
+        return composition['num_female'] / composition['size']
 
     def __str__(self):
         return "Household(HID: %s. %s person(s))"%(self.get_ID(), self.num_members())
 
 class Neighborhood(Agent_set):
-    "Represents a single neighborhood agent"
+    """
+    Represents a single neighborhood agent. The neighborhood state (land use, 
+    NFOs, EVI and forest distances) is stored in the neighborhood table of the 
+    world (see agent_tables.NeighborhoodTable), so that regions can model and 
+    output it with array operations.
+    """
+    _elec_available = column_property('elec_available')
+    _land_agveg = column_property('land_agveg')
+    _land_nonagveg = column_property('land_nonagveg')
+    _land_privbldg = column_property('land_privbldg')
+    _land_pubbldg = column_property('land_pubbldg')
+    _land_other = column_property('land_other')
+    _land_total = column_property('land_total')
+    _distnara = column_property('distnara')
+    _elevation_above_river = column_property('elevation_above_river')
+    _num_groups = column_property('num_groups')
+    _avg_yrs_services_lt15 = column_property('avg_yrs_services_lt15')
+    _forest_dist_BZ_km = column_property('forest_dist_BZ_km')
+    _forest_dist_CNP_km = column_property('forest_dist_CNP_km')
+    _forest_closest_km = column_property('forest_closest_km')
+    # The closest forest type is stored as a code (see 
+    # agent_tables.FOREST_TYPE_CODES)
+    _forest_closest_type = code_column_property('forest_closest_type')
+    _EVI = column_property('EVI')
+    _EVI_t0 = column_property('EVI_t0')
+    _EVI_anom_mean = column_property('EVI_anom_mean')
+    _EVI_anom_sd = column_property('EVI_anom_sd')
+    _EVI_2yr_mean = column_property('EVI_2yr_mean')
+    NFOs = column_dict_property(dict([(NFO_type, NFO_type) for NFO_type in NFO_TYPES]))
+    NFOs_change_rate = column_dict_property(dict([(NFO_type, NFO_type + '_change_rate') 
+        for NFO_type in NFO_TYPES]))
+
     def __init__(self, world, ID=None, initial_agent=False):
         Agent_set.__init__(self, world, ID, initial_agent)
-        self._elec_available = None
-        self._land_agveg = None
-        self._land_nonagveg = None
-        self._land_privbldg = None
-        self._land_pubbldg = None
-        self._land_other = None
-        self._distnara = None
+        # _index is the (dense) index of this neighborhood, used to refer to 
+        # the neighborhood in the person table. It is also the row of the 
+        # neighborhood in the neighborhood table, where the land use, NFO, EVI 
+        # and forest distance attributes are stored (these are undefined until 
+        # they are set in initialize.py).
+        self._table = world._neighborhood_table
+        self._row = self._table.add_row(self)
+        self._index = self._row
+        self._table.ID[self._row] = self.get_ID()
         self._x = None # x coordinate in UTM45N
         self._y = None # y coordinate in UTM45N
         self._elev = None # Elevation of neighborhood from SRTM DEM
-        self.NFOs = {}
-        self.NFOs['school_min_ft'] = None
-        self.NFOs['health_min_ft'] = None
-        self.NFOs['bus_min_ft'] = None
-        self.NFOs['market_min_ft'] = None
-        self.NFOs['employer_min_ft'] = None
-        self.NFOs_change_rate = {}
-        self.NFOs_change_rate['school_min_ft'] = None
-        self.NFOs_change_rate['health_min_ft'] = None
-        self.NFOs_change_rate['bus_min_ft'] = None
-        self.NFOs_change_rate['market_min_ft'] = None
-        self.NFOs_change_rate['employer_min_ft'] = None
+
+        # Counters of the number of persons resident in the neighborhood, the 
+        # number of those who are married, and the number of couples where 
+        # both spouses are resident in the neighborhood. These are updated as 
+        # persons are added to or removed from the neighborhood (see 
+        # _count_person) and as they marry, divorce, or are widowed (see 
+        # Person._set_spouse).
+        self._num_psn = 0
+        self._num_married = 0
+        self._num_resident_couples = 0
+
+    def _get_EVI_ts(self):
+        return [value for value in self._table.EVI_history[self._row] if value == value]
+
+    def _set_EVI_ts(self, EVI_values):
+        self._table.set_EVI_history(self._row, EVI_values)
+
+    # The EVI time series of the neighborhood is stored in a fixed-depth 
+    # buffer in the neighborhood table, so only the last EVI_HISTORY_DEPTH 
+    # years are available (see NeighborhoodTable.push_EVI).
+    _EVI_ts = property(_get_EVI_ts, _set_EVI_ts)
+
+    def _count_person(self, person):
+        "Adds a person that is now resident in the neighborhood to the counters."
+        assert person._counted_neighborhood == None, "Person %s is already counted in neighborhood %s"%(person.get_ID(), person._counted_neighborhood.get_ID())
+        person._counted_neighborhood = self
+        self._num_psn += 1
+        self._count_spouse(person)
+
+    def _uncount_person(self, person):
+        "Removes a person that is leaving the neighborhood from the counters."
+        assert person._counted_neighborhood == self, "Person %s is not counted in neighborhood %s"%(person.get_ID(), self.get_ID())
+        self._uncount_spouse(person)
+        self._num_psn -= 1
+        person._counted_neighborhood = None
+
+    def _count_spouse(self, person):
+        spouse = person._spouse
+        if spouse == None:
+            return
+        self._num_married += 1
+        if spouse._counted_neighborhood == self and spouse._spouse == person:
+            self._num_resident_couples += 1
+
+    def _uncount_spouse(self, person):
+        spouse = person._spouse
+        if spouse == None:
+            return
+        self._num_married -= 1
+        if spouse._counted_neighborhood == self and spouse._spouse == person:
+            self._num_resident_couples -= 1
 
     def get_info(self):
         "Returns basic info about this neighborhood for use in logging."
@@ -742,7 +1049,8 @@ class Neighborhood(Agent_set):
                 str(self.NFOs['health_min_ft']), str(self.NFOs['bus_min_ft']), 
                 str(self.NFOs['market_min_ft']), str(self.NFOs['employer_min_ft']),
                 str(self._forest_dist_BZ_km), str(self._forest_dist_CNP_km),
-                str(self._forest_closest_km), str(self._forest_closest_type))
+                str(self._forest_closest_km), 
+                str(get_label(FOREST_TYPE_LABELS, self._forest_closest_type)))
 
     def add_agent(self, agent, initializing=False):
         """
@@ -753,6 +1061,7 @@ class Neighborhood(Agent_set):
         # addition/subtraction while initializing the model with the CVFS data.
         if initializing==True:
             Agent_set.add_agent(self, agent)
+            agent.update_member_locations()
         else:
             hh_area = calc_hh_area()
             if self._land_agveg - hh_area < 0:
@@ -761,16 +1070,29 @@ class Neighborhood(Agent_set):
                 else:
                     self._land_nonagveg -= hh_area
                     self._land_privbldg += hh_area
+                    self.get_parent_agent().invalidate_neighborhood_terms(LAND_USE_COLUMNS)
                     Agent_set.add_agent(self, agent)
+                    agent.update_member_locations()
                     return True
             else:
                 self._land_agveg -= hh_area
                 self._land_privbldg += hh_area
+                self.get_parent_agent().invalidate_neighborhood_terms(LAND_USE_COLUMNS)
                 Agent_set.add_agent(self, agent)
+                agent.update_member_locations()
                 return True
             # Should never get to this line:
             return False
 
+    def remove_agent(self, agent):
+        """
+        Subclass the Agent_set.remove_agent function in order to remove any 
+        resident members of the household from the neighborhood counters.
+        """
+        for person in agent.iter_agents():
+            self._uncount_person(person)
+        Agent_set.remove_agent(self, agent)
+
     def is_initial_agent(self):
         return self._initial_agent
 
@@ -780,21 +1102,14 @@ class Neighborhood(Agent_set):
 
     def get_num_psn(self):
         "Returns the number of people in the neighborhood."
-        num_psn = 0
-        for household in self.iter_agents():
-            num_psn += household.num_members()
-        return num_psn
+        return self._num_psn
 
     def get_num_marriages(self):
-        "Returns the total number of marriages in this neighborhood."
-        num_marr = 0
-        spouses = []
-        for household in self.iter_agents():
-            for person in household.iter_agents():
-                if person.is_married() and (person.get_spouse() not in spouses):
-                    num_marr += 1
-                    spouses.append(person)
-        return num_marr
+        """
+        Returns the total number of marriages in this neighborhood (marriages 
+        where at least one spouse is resident in the neighborhood).
+        """
+        return self._num_married - self._num_resident_couples
 
     def get_hh_sizes(self):
         hh_sizes = {}
@@ -825,17 +1140,17 @@ class Region(Agent_set):
         # stores local-local migrants while LD_migr_agent_store stores 
         # local-distant migrants.
         self._agent_stores['person'] = {}
-        self._agent_stores['person']['LL_migr'] = Agent_Store()
-        self._agent_stores['person']['LD_migr'] = Agent_Store()
-
-        # The cemetery stores agents who have died and been removed for the 
-        # model. It isn't accessed while the model is running - it is used for 
-        # debugging only.
-        self._cemetery = {}
+        self._agent_stores['person']['LL_migr'] = MigrantStore()
+        self._agent_stores['person']['LD_migr'] = MigrantStore()
 
         self._Valley_Mean_EVI =  rcParams['submodel.EVI_growth.1997_Valley_Mean']
         self._Valley_Mean_EVI_1997 =  rcParams['submodel.EVI_growth.1997_Valley_Mean']
 
+        # _neighborhood_terms caches the neighborhood-level parts of the 
+        # linear predictors of the submodels, keyed by name (see 
+        # get_neighborhood_term).
+        self._neighborhood_terms = {}
+
     def __str__(self):
         return "Region(RID: %s, %s neighborhood(s), %s household(s), %s person(s))"%(self.get_ID(), \
                 len(self._members), self.num_households(), self.num_persons())
@@ -843,6 +1158,14 @@ class Region(Agent_set):
     def is_initial_agent(self):
         return self._initial_agent
 
+    def add_agent(self, neighborhood):
+        """
+        Subclass the Agent_set.add_agent function in order to record the 
+        region of the neighborhood in the neighborhood table.
+        """
+        Agent_set.add_agent(self, neighborhood)
+        neighborhood._table.region_ID[neighborhood._row] = self.get_ID()
+
     def iter_households(self):
         "Returns an iterator over all the households in the region"
         for neighborhood in self.iter_agents():
@@ -871,19 +1194,131 @@ class Region(Agent_set):
         """"
         Returns an iterator over all the persons in the region, including those 
         within agent store class instances. Necessary for doing things that 
-        apply to all agents regardless of their status, like incrementing ages.
+        apply to all agents regardless of their status, like incrementing ages.  
+        Permanent migrants (who are removed from their households and archived, 
+        see World._person_archive) are not included.
         """
         for household in self.iter_households():
             for person in household.iter_agents():
                 yield person
         for agent_store in self.iter_person_agent_stores():
-            for person in agent_store._stored_agents:
+            for person in agent_store.iter_agents():
                 yield person
 
     def iter_person_agent_stores(self):
         for agent_store_name in self._agent_stores['person'].keys():
             yield self._agent_stores['person'][agent_store_name]
 
+    def get_person_rows(self, include_away=True):
+        """
+        Returns the rows in the person table of all the persons in the region.  
+        If include_away is False, only the persons resident in Chitwan are 
+        returned (equivalent to iter_persons). Otherwise persons away on 
+        migrations (within agent_store class instances) are also included 
+        (equivalent to iter_all_persons).
+        """
+        table = self._world._person_table
+        if include_away:
+            rows = table.active_rows()
+        else:
+            rows = table.resident_rows()
+        # Make a mask indicating which neighborhood indices are in this 
+        # region. The mask has an extra (False) element at the end so that 
+        # persons without a neighborhood (index -1) are excluded.
+        nbh_indices = [neighborhood._index for neighborhood in self.iter_agents()]
+        in_region = np.zeros(max(nbh_indices + [-1]) + 2, dtype=bool)
+        in_region[nbh_indices] = True
+        nbh_indices = table.neighborhood[rows]
+        nbh_indices[nbh_indices >= len(in_region)] = -1
+        return rows[in_region[nbh_indices]]
+
+    def get_household_values(self, get_value, dtype=float):
+        """
+        Returns an array of a household-level value for all the households in 
+        the region, indexed by household index (Household._index) so that it 
+        can be indexed with the household column of the person table. 
+        get_value is a function that returns the value for a given household.
+        """
+        households = self.get_households()
+        values = np.zeros(max([household._index for household in households] + [-1]) + 1, dtype=dtype)
+        for household in households:
+            values[household._index] = get_value(household)
+        return values
+
+    def get_neighborhood_indices(self):
+        """
+        Returns an array of the indices (Neighborhood._index, which is also the 
+        row in the neighborhood table) of the neighborhoods in the region, in 
+        the same order as get_agents.
+        """
+        return np.array([neighborhood._index for neighborhood in self.iter_agents()], dtype=int)
+
+    def get_neighborhood_IDs(self):
+        "Returns a list of the IDs of the neighborhoods in the region."
+        return [neighborhood.get_ID() for neighborhood in self.iter_agents()]
+
+    def get_neighborhood_column(self, name):
+        """
+        Returns a column of the neighborhood state matrix (the neighborhood 
+        table of the world), without copying it. The column is indexed by 
+        neighborhood index, so can be indexed with the neighborhood column of 
+        the person table, or with the result of get_neighborhood_indices.
+        """
+        return self._world._neighborhood_table.column(name)
+
+    def get_neighborhood_term(self, name):
+        """
+        Returns the neighborhood-level part of the linear predictor of a 
+        submodel (see NEIGHBORHOOD_TERMS) as an array indexed by neighborhood 
+        index. The term is calculated the first time it is requested, and then 
+        cached until any of the neighborhood columns it is calculated from 
+        change (see invalidate_neighborhood_terms).
+        """
+        if not name in self._neighborhood_terms:
+            function, columns = NEIGHBORHOOD_TERMS[name]
+            self._neighborhood_terms[name] = function(*[self.get_neighborhood_column(column) 
+                for column in columns])
+        return self._neighborhood_terms[name]
+
+    def invalidate_neighborhood_terms(self, columns=None):
+        """
+        Removes the cached neighborhood terms (see get_neighborhood_term) that 
+        are calculated from any of the given neighborhood table columns, or all 
+        of the cached terms if columns is None. Must be called whenever the 
+        neighborhood table is changed while the model is running.
+        """
+        if columns == None:
+            self._neighborhood_terms = {}
+            return
+        for name in self._neighborhood_terms.keys():
+            if not set(columns).isdisjoint(NEIGHBORHOOD_TERMS[name][1]):
+                del self._neighborhood_terms[name]
+
+    def get_neighborhood_column_dict(self, name, labels=None):
+        """
+        Returns a dictionary, keyed by neighborhood ID, of the values of a 
+        column of the neighborhood state matrix. If labels is given, it is used 
+        to convert coded values to labels.
+        """
+        values = self.get_neighborhood_column(name)[self.get_neighborhood_indices()].tolist()
+        if labels != None:
+            values = [labels[value] for value in values]
+        return dict(zip(self.get_neighborhood_IDs(), values))
+
+    def get_neighborhood_values(self, get_value, dtype=float):
+        """
+        Returns an array of a neighborhood-level value for all the 
+        neighborhoods in the region, indexed by neighborhood index 
+        (Neighborhood._index) so that it can be indexed with the neighborhood 
+        column of the person table.  get_value is a function that returns the 
+        value for a given neighborhood.
+        """
+        neighborhoods = self.get_agents()
+        values = np.zeros(max([NBH._index for NBH in neighborhoods] + [-1]) + 1, dtype=dtype)
+        for neighborhood in neighborhoods:
+            values[neighborhood._index] = get_value(neighborhood)
+        return values
+
     def agricultural_productivity(self):
         """
         Models change in agricultural productivity using results from Chapter 2 
@@ -892,7 +1327,6 @@ class Region(Agent_set):
         growth) as calculated from MODIS data in TIMESAT.
         """
         logger.debug("Running agricultural productivity model")
-        EVIs = {}
         if rcParams['submodel.EVI_growth.model'] == 'slope':
             self._Valley_Mean_EVI = self._Valley_Mean_EVI + \
                     rcParams['submodel.EVI_growth.model.slope.param']
@@ -901,16 +1335,56 @@ class Region(Agent_set):
                     rcParams['submodel.EVI_growth.model.stddev.param']*np.random.randn()
         else:
             raise Exception('unrecognized EVI growth submodel "%s"'%rcParams['submodel.EVI_growth.model'])
-        for neighborhood in self.iter_agents():
-            neighborhood._EVI = self._Valley_Mean_EVI + neighborhood._EVI_anom_mean + \
-                np.random.randn()*neighborhood._EVI_anom_sd
-            if neighborhood._EVI < rcParams['submodel.EVI_growth.min_EVI']:
-                neighborhood._EVI = rcParams['submodel.EVI_growth.min_EVI']
-                logger.debug("EVI reset to minimum for %s"%neighborhood.get_ID())
-            neighborhood._EVI_ts.append(neighborhood._EVI)
-            EVIs[neighborhood.get_ID()] = neighborhood._EVI
+        table = self._world._neighborhood_table
+        rows = self.get_neighborhood_indices()
+        EVI = self._Valley_Mean_EVI + table.EVI_anom_mean[rows] + \
+                np.random.randn(len(rows))*table.EVI_anom_sd[rows]
+        below_min = EVI < rcParams['submodel.EVI_growth.min_EVI']
+        if np.any(below_min):
+            EVI[below_min] = rcParams['submodel.EVI_growth.min_EVI']
+            logger.debug("EVI reset to minimum for %s"%np.array(self.get_neighborhood_IDs())[below_min])
+        table.EVI[rows] = EVI
+        table.push_EVI(rows, EVI)
+        self.invalidate_neighborhood_terms(['EVI', 'EVI_history', 'EVI_2yr_mean'])
+        EVIs = self.get_neighborhood_column_dict('EVI')
         return EVIs
 
+    def get_at_risk_of_birth(self, time):
+        """
+        Screens the resident population for women who could give birth this 
+        timestep: married women within the birth age range who have not 
+        exceeded their desired family size, and who are not within their birth 
+        interval (for subsequent births) or more than six years past their 
+        marriage (for first births).  Returns the rows of these women in the 
+        person table. The remaining checks (first birth timing) are made by 
+        Person.is_eligible_for_birth.
+        """
+        table = self._world._person_table
+        rows = self.get_person_rows(include_away=False)
+        rows = rows[(table.sex[rows] == SEX_CODES['female']) &
+                    (table.spouse[rows] >= 0) &
+                    (table.agemonths[rows] <= rcParams['birth.max_age.years'] * 12) &
+                    (table.agemonths[rows] >= rcParams['birth.min_age.years'] * 12)]
+        # Note that des_num_children=-1 means no preference ("god's will"). 
+        # Women whose desired number of children is undefined (NaN) are 
+        # excluded, matching is_eligible_for_birth (where any number of 
+        # children compares as greater than a desired number of None). The 
+        # birth timing comparisons below are False for an undefined (NaN) 
+        # marriage or last birth time.
+        old_settings = np.seterr(invalid='ignore')
+        num_children = table.num_children[rows]
+        des_num_children = table.des_num_children[rows]
+        rows = rows[~np.isnan(des_num_children) & 
+                    ~((num_children > des_num_children) & (des_num_children != -1))]
+        num_children = table.num_children[rows]
+        first_birth = (num_children == 0) & \
+                ((time - table.marriage_time[rows]) < 6.)
+        next_birth_time = table.last_birth_time[rows] + \
+                table.birth_interval[rows] / 12.
+        subsequent_birth = (num_children > 0) & (time > next_birth_time)
+        np.seterr(**old_settings)
+        return rows[first_birth | subsequent_birth]
+
     def births(self, time, timestep, simulate=False):
         """
         Runs through the population and agents give birth probabilistically 
@@ -922,30 +1396,43 @@ class Region(Agent_set):
         """
         logger.debug("Processing births")
         births = {}
-        for household in self.iter_households():
+        # Only women who are at risk of giving birth this timestep need to be 
+        # checked for eligibility.
+        table = self._world._person_table
+        mothers = [person for person in table.get_agents(self.get_at_risk_of_birth(time)) 
+                if person.is_eligible_for_birth(time, timestep)]
+        # The fathers are assumed to be the spouses of the persons giving 
+        # birth.
+        fathers = [mother.get_spouse() for mother in mothers]
+        if simulate:
+            babies = [None] * len(mothers)
+        else:
+            # Create all of the new persons at once.
+            babies = self._world.new_persons([time] * len(mothers), 
+                    [0] * len(mothers), 
+                    ethnicities=[mother.get_ethnicity() for mother in mothers], 
+                    mothers=mothers, fathers=fathers)
+        for person, father, baby in zip(mothers, fathers, babies):
+            household = person.get_parent_agent()
             neighborhood = household.get_parent_agent()
-            for person in household.iter_agents():
-                if person.is_eligible_for_birth(time, timestep):
-                    # Agent gives birth. First find the father (assumed to be 
-                    # the spouse of the person giving birth).
-                    father = person.get_spouse()
-                    # Now have the mother give birth, and add the 
-                    # new person to the mother's household.
-                    baby = person.give_birth(time, timestep, father=father, 
-                            simulate=simulate)
-                    if not simulate:
-                        household.add_agent(baby)
-                        if rcParams['feedback.birth.nonagveg']:
-                            if (neighborhood._land_nonagveg - rcParams['feedback.birth.nonagveg.area']) >= 0:
-                                neighborhood._land_nonagveg -= rcParams['feedback.birth.nonagveg.area']
-                                neighborhood._land_other += rcParams['feedback.birth.nonagveg.area']
-                    # Track the total number of births for each timestep by 
-                    # neighborhood.
-                    if not neighborhood.get_ID() in births:
-                        births[neighborhood.get_ID()] = 0
-                    births[neighborhood.get_ID()] += 1
+            # Now have the mother give birth, and add the new person to the 
+            # mother's household.
+            baby = person.give_birth(time, timestep, father=father, 
+                    simulate=simulate, baby=baby)
+            if not simulate:
+                household.add_agent(baby)
+                if rcParams['feedback.birth.nonagveg']:
+                    if (neighborhood._land_nonagveg - rcParams['feedback.birth.nonagveg.area']) >= 0:
+                        neighborhood._land_nonagveg -= rcParams['feedback.birth.nonagveg.area']
+                        neighborhood._land_other += rcParams['feedback.birth.nonagveg.area']
+                        self.invalidate_neighborhood_terms(LAND_USE_COLUMNS)
+            # Track the total number of births for each timestep by 
+            # neighborhood.
+            if not neighborhood.get_ID() in births:
+                births[neighborhood.get_ID()] = 0
+            births[neighborhood.get_ID()] += 1
         return births
-                        
+
     def deaths(self, time, timestep):
         """
         Runs through the population and kills agents probabilistically based on 
@@ -953,21 +1440,57 @@ class Region(Agent_set):
         """
         logger.debug("Processing deaths")
         deaths = {}
-        for person in self.iter_all_persons():
-            if np.random.rand() < calc_probability_death(person):
-                if not person.is_away():
-                    # People who in Chitwan need to have their deaths tracked 
-                    # as coming from a Chitwan neighborhood.
-                    neighborhood = person.get_parent_agent().get_parent_agent()
-                    if not neighborhood.get_ID() in deaths:
-                        deaths[neighborhood.get_ID()] = 0
-                    deaths[neighborhood.get_ID()] += 1
-                person.kill(time, timestep)
-                # Add the agent to the cemetery, for later access during 
-                # debugging.
-                self._cemetery[self.get_ID()] = self
+        # Find all the dying agents in one pass over the person table (using a 
+        # single draw of random numbers for the whole population), and then 
+        # kill them.
+        table = self._world._person_table
+        rows = self.get_person_rows()
+        death_probs = calc_probability_death_vector(table.agemonths[rows], 
+                table.sex[rows])
+        dying_rows = rows[np.random.rand(len(rows)) < death_probs]
+        for person in table.get_agents(dying_rows):
+            if not person.is_away():
+                # People who in Chitwan need to have their deaths tracked 
+                # as coming from a Chitwan neighborhood.
+                neighborhood = person.get_parent_agent().get_parent_agent()
+                if not neighborhood.get_ID() in deaths:
+                    deaths[neighborhood.get_ID()] = 0
+                deaths[neighborhood.get_ID()] += 1
+            person.kill(time, timestep)
         return deaths
                         
+    def get_eligible_for_marriage(self, time):
+        """
+        Screens the resident population for unmarried persons of marriageable 
+        age, and draws which of them are eligible to marry this timestep using 
+        the marriage model chosen in rcParams. The model is evaluated for all 
+        the screened persons at once. Returns two arrays, of the rows in the 
+        person table of the eligible males and of the eligible females.
+        """
+        table = self._world._person_table
+        rows = self.get_person_rows(include_away=False)
+        age_years = table.agemonths[rows] / 12.
+        rows = rows[(table.spouse[rows] == -1) & \
+                (age_years >= rcParams['marriage.minimum_age_years']) & \
+                (age_years <= rcParams['marriage.maximum_age_years'])]
+        if rcParams['submodel.parameterization.marriage'] == 'zvoleff':
+            # The neighborhood and month terms are the same for all persons 
+            # in a neighborhood, so the neighborhood term is calculated once 
+            # per neighborhood (and the month term once in total).
+            neighborhood_term = self.get_neighborhood_term('marriage')
+            marriage_probs = calc_probability_marriage_zvoleff_vector(
+                    table.agemonths[rows], table.sex[rows], table.ethnicity[rows],
+                    table.schooling[rows],
+                    table.school_status[rows] == SCHOOL_STATUS_CODES['inschool'],
+                    neighborhood_term[table.neighborhood[rows]], time)
+        else:
+            marriage_probs = calc_probability_marriage_simple_vector(
+                    table.agemonths[rows], table.sex[rows])
+        rows = rows[np.random.rand(len(rows)) < marriage_probs]
+        male_rows = rows[table.sex[rows] == SEX_CODES['male']]
+        female_rows = rows[table.sex[rows] == SEX_CODES['female']]
+        return male_rows, female_rows
+
     def marriages(self, time, timestep):
         """
         Runs through the population and marries agents probabilistically based 
@@ -975,70 +1498,52 @@ class Region(Agent_set):
         """
         logger.debug("Processing marriages")
         # First find the eligible agents
-        minimum_age = rcParams['marriage.minimum_age_years']
-        maximum_age = rcParams['marriage.maximum_age_years']
-        eligible_males = []
-        eligible_females = []
-        for household in self.iter_households():
-            for person in household.iter_agents():
-                if (not person.is_married()) and \
-                        (person.get_age_years() >= minimum_age) and \
-                        (person.get_age_years() <= maximum_age) and \
-                        (np.random.rand() < calc_probability_marriage(person, time)):
-                    # Agent is eligible to marry.
-                    if person.get_sex() == "female": eligible_females.append(person)
-                    if person.get_sex() == "male": eligible_males.append(person)
+        table = self._world._person_table
+        male_rows, female_rows = self.get_eligible_for_marriage(time)
+        eligible_males = table.get_agents(male_rows)
+        eligible_females = table.get_agents(female_rows)
         logger.debug('%s resident males and %s resident females eligible for marriage'%(len(eligible_males), len(eligible_females)))
-        eligible_persons = eligible_males + eligible_females
-
-        couples = []
-        for person in eligible_persons:
-            # The 'choose_spouse' function in statistics.py chooses a spouse
-            # based on the probability of a person man marrying each other 
-            # person of opposite sex in the eligible_persons list, with the 
-            # probability dependent on the age difference between the person 
-            # and each potential spouse in the list.
-            if len(eligible_persons) == 0: break
-            spouse = choose_spouse(person, eligible_persons)
-            if spouse == None:
-                # In this case there are no eligible spouses for this person 
-                # (because all the other persons are of a different ethnicity).
-                continue
-            eligible_persons.remove(spouse)
-            eligible_persons.remove(person)
-            if person.get_sex() == "male": couples.append((person, spouse))
-            else: couples.append((spouse, person))
+        # The 'match_spouses' function in statistics.py pairs the eligible 
+        # persons into couples, choosing spouses based on the probability of a 
+        # man marrying a woman of the same ethnicity, with the probability 
+        # dependent on the age difference between them.
+        couples, eligible_persons = match_spouses(eligible_males, eligible_females)
         logger.debug("%s resident couples formed, %s couples with in-migrants"%(len(couples), len(eligible_persons)))
 
-        # The remaining individuals marry in-migrants
-        for person in eligible_persons:
-            frac_year, years = np.modf(calc_spouse_age_diff(person))
-            months = np.round(frac_year * 12)
-            age_diff_months = years * 12 + months
-            if person.get_sex() == "female":
-                spouse_sex = "male"
-                spouse_age_months = person.get_age_months() + age_diff_months
+        # The remaining individuals marry in-migrants. Draw the age 
+        # differences for all of the couples at once.
+        age_diffs = calc_spouse_age_diff(size=len(eligible_persons))
+        frac_years, years = np.modf(age_diffs)
+        age_diffs_months = years * 12 + np.round(frac_years * 12)
+        spouse_sexes = []
+        spouse_ages_months = []
+        for person, age_diff_months in zip(eligible_persons, age_diffs_months):
+            if person.get_sex() == SEX_CODES['female']:
+                spouse_sexes.append(SEX_CODES['male'])
+                spouse_ages_months.append(person.get_age_months() + age_diff_months)
             else:
-                spouse_sex = "female"
-                spouse_age_months = person.get_age_months() - age_diff_months
-            if spouse_age_months < (rcParams['marriage.minimum_age_years'] * 12.):
-                spouse_age_months = (rcParams['marriage.minimum_age_years'] * 12.)
-            # Create the spouse:
-            spouse_birthdate = time - spouse_age_months / 12.
-            spouse = self._world.new_person(birthdate=spouse_birthdate, 
-                    age=spouse_age_months, sex=spouse_sex,
-                    ethnicity=person.get_ethnicity(), in_migrant=True)
-            logger.debug("New in migrant (%s) for marriage (%s, %.2f years old)"%(spouse.get_ID(), spouse.get_sex(), spouse.get_age_years()))
+                spouse_sexes.append(SEX_CODES['female'])
+                spouse_ages_months.append(person.get_age_months() - age_diff_months)
+        spouse_ages_months = np.maximum(spouse_ages_months, 
+                rcParams['marriage.minimum_age_years'] * 12.)
+        # Create the spouses:
+        spouse_birthdates = time - spouse_ages_months / 12.
+        spouses = self._world.new_persons(spouse_birthdates.tolist(), 
+                spouse_ages_months, sexes=spouse_sexes, 
+                ethnicities=[person.get_ethnicity() for person in eligible_persons], 
+                in_migrant=True)
+        for person, spouse in zip(eligible_persons, spouses):
+            logger.debug("New in migrant (%s) for marriage (%s, %.2f years old)"%(spouse.get_ID(), SEX_LABELS[spouse.get_sex()], spouse.get_age_years()))
             # Ensure that the man is first in the couples tuple
-            if person.get_sex() == "female": couples.append((spouse, person))
+            if person.get_sex() == SEX_CODES['female']: couples.append((spouse, person))
             else: couples.append((person, spouse))
 
         marriages = {}
         # Now marry the agents
         for male, female in couples:
             logger.debug("New marriage to %s (%.2f years old, %s) and %s (%.2f years old, %s)"%(
-                male.get_ID(), male.get_age_years(), male.get_sex(), 
-                female.get_ID(), female.get_age_years(), female.get_sex()))
+                male.get_ID(), male.get_age_years(), SEX_LABELS[male.get_sex()], 
+                female.get_ID(), female.get_age_years(), SEX_LABELS[female.get_sex()]))
             # First marry the agents.
             male.marry(female, time)
             female._first_birth_timing = calc_first_birth_time(self)
@@ -1098,8 +1603,8 @@ class Region(Agent_set):
             if not neighborhood.get_ID() in marriages:
                 marriages[neighborhood.get_ID()] = 0
             marriages[neighborhood.get_ID()] += 1
-            log_event_record("Marriage", male, timestep)
-            log_event_record("Marriage", female, timestep)
+            person_events.record("Marriage", male, timestep)
+            person_events.record("Marriage", female, timestep)
         return marriages
 
     def divorces(self, time_float, timestep):
@@ -1118,7 +1623,7 @@ class Region(Agent_set):
                 person._last_divorce_check = timestep
                 continue
             person._last_divorce_check = timestep
-            if person.get_sex() == "female":
+            if person.get_sex() == SEX_CODES['female']:
                 woman = person
                 man = woman.get_spouse()
             else:
@@ -1127,14 +1632,19 @@ class Region(Agent_set):
             # Figure out which neighborhood to credit the divorce to, even if 
             # one or both spouses are away for a migration. Doesn't matter 
             # which spouse is used to figure out the NID, so we will use the 
-            # man.
-            if man.is_away():
-                original_nbh = man._last_household.get_parent_agent()
+            # man, unless he is a permanent migrant (and so no longer has a 
+            # household in the model).
+            if self._world._person_archive.in_archive(man):
+                credited_spouse = woman
+            else:
+                credited_spouse = man
+            if credited_spouse.is_away():
+                original_nbh = credited_spouse._last_household.get_parent_agent()
             else:
-                original_nbh = man.get_parent_agent().get_parent_agent()
+                original_nbh = credited_spouse.get_parent_agent().get_parent_agent()
             logger.debug("Agent %s divorced agent %s (marriage time %.2f)"%(woman.get_ID(), man.get_ID(), person._marriage_time))
-            log_event_record("Divorce", man, timestep)
-            log_event_record("Divorce", woman, timestep)
+            person_events.record("Divorce", man, timestep)
+            person_events.record("Divorce", woman, timestep)
             # Make the woman move out and either:
             # 	- return to her parental home if it still exists
             # 	- establish a new household in a randomly selected              
@@ -1180,12 +1690,19 @@ class Region(Agent_set):
         return divorces
 
     def get_num_marriages(self):
-        "Returns the total number of marriages in this region."
-        num_spouses = 0
-        for person in self.iter_all_persons():
-            if person.is_married(): num_spouses += 1
-        # Number of marriages is equal to number of spouses / 2
-        return num_spouses / 2
+        """
+        Returns the total number of marriages in this region (marriages where 
+        at least one spouse is in the region - a spouse may have permanently 
+        left the region while still married).
+        """
+        table = self._world._person_table
+        rows = self.get_person_rows()
+        spouses = table.spouse[rows]
+        is_married = spouses >= 0
+        # Identify each marriage by the lower of the two spouse rows, so that 
+        # each marriage is counted once whether one or both spouses are in the 
+        # region.
+        return len(np.unique(np.minimum(rows[is_married], spouses[is_married])))
 
     def education(self, time):
         """
@@ -1196,17 +1713,21 @@ class Region(Agent_set):
         logger.debug("Processing education")
         timestep = rcParams['model.timestep']
         start_school_age = rcParams['education.start_school_age_years']
+        inschool = SCHOOL_STATUS_CODES['inschool']
+        outofschool = SCHOOL_STATUS_CODES['outofschool']
+        undetermined = SCHOOL_STATUS_CODES['undetermined']
         schooling = {}
         for person in self.iter_persons():
-            if person._school_status == "outofschool":
+            school_status = person._school_status
+            if school_status == outofschool:
                 pass
-            elif (person._school_status == "undetermined") & (person.get_age_years() >= start_school_age):
-                person._school_status = "inschool"
+            elif (school_status == undetermined) & (person.get_age_years() >= start_school_age):
+                person._school_status = inschool
                 person._final_schooling_level = calc_education_level(person)
                 person._schooling = timestep / 12.
-            elif person._school_status == "inschool":
+            elif school_status == inschool:
                 if person._schooling >= person._final_schooling_level:
-                    person._school_status = "outofschool"
+                    person._school_status = outofschool
                 else:
                     person._schooling += timestep / 12.
             neighborhood = person.get_parent_agent().get_parent_agent()
@@ -1222,17 +1743,28 @@ class Region(Agent_set):
         """
         logger.debug("Processing person-level LD out-migrations")
         n_LD_outmigr_indiv = {}
-        for household in self.iter_households():
-            for person in household.iter_agents():
-                if (person.get_age_years() < rcParams['migration_LD.minimum_age_years']) | \
-                        (person.get_age_years() > rcParams['migration_LD.maximum_age_years']):
-                    continue
-                elif np.random.rand() < calc_probability_LD_migration(person, time_float):
-                    person.make_individual_LD_migration(time_float, timestep, self, BURN_IN)
-                    neighborhood = household.get_parent_agent()
-                    if not neighborhood.get_ID() in n_LD_outmigr_indiv:
-                        n_LD_outmigr_indiv[neighborhood.get_ID()] = 0
-                    n_LD_outmigr_indiv[neighborhood.get_ID()] += 1
+        # Screen the resident population for persons of migration age, and 
+        # calculate the migration probabilities for all of them at once.
+        table = self._world._person_table
+        rows = self.get_person_rows(include_away=False)
+        age_years = table.agemonths[rows] / 12.
+        rows = rows[(age_years >= rcParams['migration_LD.minimum_age_years']) & \
+                (age_years <= rcParams['migration_LD.maximum_age_years'])]
+        own_land = self.get_household_values(lambda household: household._own_land)
+        log_market_min_ft = self.get_neighborhood_term('LD_migration')
+        migration_probs = calc_probability_LD_migration_vector(
+                table.agemonths[rows], table.sex[rows], table.ethnicity[rows],
+                table.schooling[rows],
+                table.school_status[rows] == SCHOOL_STATUS_CODES['inschool'],
+                own_land[table.household[rows]],
+                log_market_min_ft[table.neighborhood[rows]])
+        migrant_rows = rows[np.random.rand(len(rows)) < migration_probs]
+        for person in table.get_agents(migrant_rows):
+            neighborhood = person.get_parent_agent().get_parent_agent()
+            person.make_individual_LD_migration(time_float, timestep, self, BURN_IN)
+            if not neighborhood.get_ID() in n_LD_outmigr_indiv:
+                n_LD_outmigr_indiv[neighborhood.get_ID()] = 0
+            n_LD_outmigr_indiv[neighborhood.get_ID()] += 1
         # Now handle the returning migrants (based on the return times assigned 
         # to them when they initially out migrated)
         n_ret_LD_migr_indiv, released_LD_migr = self._agent_stores['person']['LD_migr'].release_agents(timestep)
@@ -1248,17 +1780,31 @@ class Region(Agent_set):
         """
         logger.debug("Processing person-level LL out-migrations")
         n_LL_outmigr_indiv = {}
-        for household in self.iter_households():
-            for person in household.iter_agents():
-                if (person.get_age_years() < rcParams['migration_LL.minimum_age_years']) | \
-                        (person.get_age_years() > rcParams['migration_LL.maximum_age_years']):
-                    continue
-                elif np.random.rand() < calc_probability_LL_migration(person, time_float):
-                    person.make_individual_LL_migration(time_float, timestep, self, BURN_IN)
-                    neighborhood = household.get_parent_agent()
-                    if not neighborhood.get_ID() in n_LL_outmigr_indiv:
-                        n_LL_outmigr_indiv[neighborhood.get_ID()] = 0
-                    n_LL_outmigr_indiv[neighborhood.get_ID()] += 1
+        table = self._world._person_table
+        rows = self.get_person_rows(include_away=False)
+        age_years = table.agemonths[rows] / 12.
+        rows = rows[(age_years >= rcParams['migration_LL.minimum_age_years']) & \
+                (age_years <= rcParams['migration_LL.maximum_age_years'])]
+        # The neighborhood and household terms of the migration model are 
+        # constant within each neighborhood and household, so calculate them 
+        # once (the neighborhood term is cached by the region between 
+        # timesteps), and then combine them with the person-level terms.
+        neighborhood_term = self.get_neighborhood_term('LL_migration')
+        household_term = calc_LL_migration_household_term(
+                self.get_household_values(lambda household: household._total_possessions),
+                self.get_household_values(lambda household: household._any_farming),
+                self.get_household_values(lambda household: household._TLU_livestock))
+        migration_probs = calc_probability_LL_migration_vector(
+                table.agemonths[rows], table.sex[rows], table.ethnicity[rows],
+                neighborhood_term[table.neighborhood[rows]],
+                household_term[table.household[rows]], time_float)
+        migrant_rows = rows[np.random.rand(len(rows)) < migration_probs]
+        for person in table.get_agents(migrant_rows):
+            neighborhood = person.get_parent_agent().get_parent_agent()
+            person.make_individual_LL_migration(time_float, timestep, self, BURN_IN)
+            if not neighborhood.get_ID() in n_LL_outmigr_indiv:
+                n_LL_outmigr_indiv[neighborhood.get_ID()] = 0
+            n_LL_outmigr_indiv[neighborhood.get_ID()] += 1
         # Now handle the returning migrants (based on the return times assigned 
         # to them when they initially out migrated)
         n_ret_LL_migr_indiv, released_LL_migr = self._agent_stores['person']['LL_migr'].release_agents(timestep)
@@ -1285,19 +1831,19 @@ class Region(Agent_set):
         # random, or based on an inverse distance or other weighting function.
         # Mask is a list of zeros and ones that can be used to mask out certain 
         # neighborhoods from the list.
+        rows = self.get_neighborhood_indices()
         if rand_NBH_type == 'inv_dist_forest_closest_km':
-            probs = [1 / NBH._forest_closest_km for NBH in self.get_agents()]
+            probs = 1 / self.get_neighborhood_column('forest_closest_km')[rows]
         elif rand_NBH_type == 'inv_dist_CNP_km':
-            probs = [1 / NBH._forest_dist_CNP_km for NBH in self.get_agents()]
+            probs = 1 / self.get_neighborhood_column('forest_dist_CNP_km')[rows]
         elif rand_NBH_type == 'inv_dist_BZ_km':
-            probs = [1 / NBH._forest_dist_BZ_km for NBH in self.get_agents()]
+            probs = 1 / self.get_neighborhood_column('forest_dist_BZ_km')[rows]
         elif rand_NBH_type == 'inv_dist_narayangar_km':
-            probs = [1 / NBH._distnara for NBH in self.get_agents()]
+            probs = 1 / self.get_neighborhood_column('distnara')[rows]
         elif rand_NBH_type == 'random':
-            probs = np.ones(len(self.get_agents()))
+            probs = np.ones(len(rows))
         else:
             raise Exception("Unknown option %s for 'rand_NBH_type' in get_rand_NBH"%rand_NBH_type)
-        probs = np.array(probs)
         probs[mask] = 0
         probs = probs.cumsum() / probs.sum()
         index = sum(np.random.rand() > probs)
@@ -1314,29 +1860,39 @@ class Region(Agent_set):
         n_inmigr_hh = {}
         num_in_migr_households = calc_num_inmigrant_households()
         household_list = self.get_households()
-        for n in xrange(num_in_migr_households):
-            # Randomly create a household of this size
-            hh_size = calc_inmigrant_household_size()
-            hh_ethnicity = calc_inmigrant_household_ethnicity()
+        hh_sizes = calc_inmigrant_household_size(size=num_in_migr_households)
+        hh_ethnicities = calc_inmigrant_household_ethnicity(size=num_in_migr_households)
+        # Randomly create households of these sizes, choosing an existing 
+        # household as a model for each new household.
+        model_members = []
+        for hh_size in hh_sizes:
             np.random.shuffle(household_list)
-            # Choose an existing household as a model
             for model_hh in household_list:
                 model_hh_size = model_hh.num_members() + model_hh.num_away_members()
                 if model_hh_size == hh_size:
                     break
-            # Create and populate the new household
-            new_household = self._world.new_household()
+            model_members.append(model_hh.get_all_HH_members())
+        # Create the new households, and the clones of the members of all of 
+        # the model households, at once.
+        new_households = self._world.new_households(num_in_migr_households)
+        clone_psns = [psn for members in model_members for psn in members]
+        clone_ethnicities = [hh_ethnicity for hh_ethnicity, members in 
+                zip(hh_ethnicities, model_members) for psn in members]
+        new_psns = iter(self._world.new_persons(
+                [psn._birthdate for psn in clone_psns], 
+                [psn.get_age_months() for psn in clone_psns], 
+                sexes=[psn.get_sex() for psn in clone_psns], 
+                ethnicities=clone_ethnicities, in_migrant=True))
+        for hh_size, members, new_household in zip(hh_sizes, model_members, 
+                new_households):
+            # Populate the new household
             clone_dict = {}
-            for psn in model_hh.get_all_HH_members():
-                new_psn = self._world.new_person(birthdate=psn._birthdate, 
-                                                    age=psn.get_age_months(), 
-                                                    sex=psn.get_sex(), 
-                                                    ethnicity=hh_ethnicity, 
-                                                    in_migrant=True)
+            for psn in members:
+                new_psn = next(new_psns)
                 clone_dict[psn.get_ID()] = new_psn.get_ID()
                 new_household.add_agent(new_psn)
             # Now setup the relationships within the new household.
-            for psn in model_hh.get_all_HH_members():
+            for psn in members:
                 clone = new_household.get_agent(clone_dict[psn.get_ID()])
                 if psn._mother != None and (psn._mother.get_ID() in clone_dict.keys()):
                     clone_mother_ID = clone_dict[psn._mother.get_ID()]
@@ -1346,7 +1902,7 @@ class Region(Agent_set):
                     clone_father_ID = clone_dict[psn._father.get_ID()]
                     clone._father = new_household.get_agent(clone_father_ID)
 
-                if (psn.get_sex() == "female") and (psn._last_birth_time != None):
+                if (psn.get_sex() == SEX_CODES['female']) and (psn._last_birth_time != None):
                     clone._last_birth_time = psn._last_birth_time
 
                 if psn._spouse != None and (psn._spouse.get_ID() in clone_dict.keys()):
@@ -1392,28 +1948,27 @@ class Region(Agent_set):
         the units of the input rc parameters.
         """
         logger.debug("Incrementing ages")
-        for person in self.iter_all_persons():
-            timestep = rcParams['model.timestep']
-            person._agemonths += timestep
+        table = self._world._person_table
+        table.agemonths[self.get_person_rows()] += rcParams['model.timestep']
 
     def establish_NFOs(self):
         logger.debug('Modeling NFO change.')
+        table = self._world._neighborhood_table
+        rows = self.get_neighborhood_indices()
         mask = {}
         for NFO_type in rcParams['NFOs.modeled.types']:
-            mask[NFO_type] = [(NBH.NFOs[NFO_type] == 0) for NBH in self.iter_agents()]
-            mask[NFO_type] = np.array(mask[NFO_type], dtype=bool)
+            mask[NFO_type] = getattr(table, NFO_type)[rows] == 0
 
         if rcParams['NFOs.change.model'].lower() == 'constant_rate':
-            NBHs = self.get_agents()
-            for NBH in NBHs:
-                for NFO_type in rcParams['NFOs.modeled.types']:
-                    if np.sum(mask[NFO_type]) == 0:
-                        logger.debug('Skipping %s NFO change as all NBHs have min ft equal to 0.'%NFO_type)
-                        continue
-                    NBH.NFOs[NFO_type] = NBH.NFOs[NFO_type] + \
-                            NBH.NFOs_change_rate[NFO_type] * \
-                            rcParams['NFOs.change.model.constant_rate.multiplier']
-                    if NBH.NFOs[NFO_type] < 1: NBH.NFOs[NFO_type] = 0
+            for NFO_type in rcParams['NFOs.modeled.types']:
+                if np.sum(mask[NFO_type]) == 0:
+                    logger.debug('Skipping %s NFO change as all NBHs have min ft equal to 0.'%NFO_type)
+                    continue
+                min_ft = getattr(table, NFO_type)[rows] + \
+                        getattr(table, NFO_type + '_change_rate')[rows] * \
+                        rcParams['NFOs.change.model.constant_rate.multiplier']
+                min_ft[min_ft < 1] = 0
+                getattr(table, NFO_type)[rows] = min_ft
             
         elif rcParams['NFOs.change.model'].lower() == 'random':
             new_NFOs = []
@@ -1423,7 +1978,7 @@ class Region(Agent_set):
                 if mask[NFO_type].sum() == 0:
                     logger.debug('Skipping %s NFO change as all NBHs have min ft equal to 0.'%NFO_type)
                     continue
-                new_NFOs.append((NFO_type, int(draw_from_prob_dist(rcParams['NFOs.prob.change.' + NFO_type]))))
+                new_NFOs.append((NFO_type, int(get_sampler('NFOs.prob.change.' + NFO_type).draw())))
 
             # Now actually make the NFO changes happen, according to the
             # rand_NBH_type chosen in the rcparams
@@ -1439,45 +1994,51 @@ class Region(Agent_set):
 
         else: raise Exception("Unknown option for NFOs.change.model: '%s'"%rcParams['NFOs.change.model'])
 
+        self.invalidate_neighborhood_terms(NFO_TYPES)
+
     def get_neighborhood_fw_usage(self, time):
-        fw_usage = {}
-        for neighborhood in self.iter_agents():
-            fw_usage[neighborhood.get_ID()] = 0
+        """
+        Returns the expected monthly fuelwood usage of each neighborhood (the 
+        sum over its households of monthly fuelwood usage times the probability 
+        of fuelwood usage). The household covariates are collected into arrays 
+        once per timestep, so that the usage of all households is calculated in 
+        a single vectorized pass.
+        """
+        neighborhoods = self.get_agents()
+        households = []
+        nbh_positions = []
+        for position, neighborhood in enumerate(neighborhoods):
             for household in neighborhood.iter_agents():
-                fw_usage[neighborhood.get_ID()] += \
-                        household.get_monthly_fw_usage_quantity(time) * \
-                        household.get_fw_usage_probability(time)
+                households.append(household)
+                nbh_positions.append(position)
+        compositions = [household.get_composition() for household in households]
+        hhsize = np.array([c['size'] for c in compositions], dtype=int)
+        num_female = np.array([c['num_female'] for c in compositions], dtype=int)
+        head_ethnicity = np.array([-1 if c['head_ethnicity'] is None else \
+                c['head_ethnicity'] for c in compositions], dtype=int)
+        any_non_wood_fuel = np.array([household._any_non_wood_fuel \
+                for household in households], dtype=bool)
+        lastmigrant_time = np.array([household._lastmigrant_time \
+                for household in households], dtype=float)
+        nbh_positions = np.array(nbh_positions, dtype=int)
+        nbh_rows = self.get_neighborhood_indices()
+        elec_available = self.get_neighborhood_column('elec_available')[nbh_rows]
+        distnara = self.get_neighborhood_column('distnara')[nbh_rows]
+        forest_closest_type = self.get_neighborhood_column('forest_closest_type')[nbh_rows]
+
+        usage_prob = calc_fuelwood_usage_probability_vector(hhsize, num_female, 
+                head_ethnicity, elec_available[nbh_positions], 
+                distnara[nbh_positions], forest_closest_type[nbh_positions])
+        # Convert daily fuelwood usage to monthly
+        monthly_usage = calc_daily_fuelwood_usage_vector(hhsize, 
+                head_ethnicity, any_non_wood_fuel, lastmigrant_time, time) * 30
+        nbh_usage = np.bincount(nbh_positions, weights=monthly_usage * usage_prob, 
+                minlength=len(neighborhoods))
+        fw_usage = {}
+        for position, neighborhood in enumerate(neighborhoods):
+            fw_usage[neighborhood.get_ID()] = nbh_usage[position]
         return {'fw_usage': fw_usage}
 
-    def get_neighborhood_landuse(self):
-        landuse = {'agveg':{}, 'nonagveg':{}, 'privbldg':{}, 'pubbldg':{}, 'other':{}}
-        for neighborhood in self.iter_agents():
-            landuse['agveg'][neighborhood.get_ID()] = neighborhood._land_agveg
-            landuse['nonagveg'][neighborhood.get_ID()] = neighborhood._land_nonagveg
-            landuse['privbldg'][neighborhood.get_ID()] = neighborhood._land_privbldg
-            landuse['pubbldg'][neighborhood.get_ID()] = neighborhood._land_pubbldg
-            landuse['other'][neighborhood.get_ID()] = neighborhood._land_other
-        return landuse
-
-    def get_neighborhood_nfo_context(self):
-        nfocontext = {'school_min_ft':{}, 'health_min_ft':{}, 'bus_min_ft':{}, 'market_min_ft':{}, 'employer_min_ft':{}}
-        for neighborhood in self.iter_agents():
-            nfocontext['school_min_ft'][neighborhood.get_ID()] = neighborhood.NFOs['school_min_ft']
-            nfocontext['health_min_ft'][neighborhood.get_ID()] = neighborhood.NFOs['health_min_ft']
-            nfocontext['bus_min_ft'][neighborhood.get_ID()] = neighborhood.NFOs['bus_min_ft']
-            nfocontext['market_min_ft'][neighborhood.get_ID()] = neighborhood.NFOs['market_min_ft']
-            nfocontext['employer_min_ft'][neighborhood.get_ID()] = neighborhood.NFOs['employer_min_ft']
-        return nfocontext
-
-    def get_neighborhood_forest_distance(self):
-        forest_dist = {'for_dist_BZ_km':{}, 'for_dist_CNP_km':{}, 'for_closest_km':{}, 'for_closest_type':{}}
-        for neighborhood in self.iter_agents():
-            forest_dist['for_dist_BZ_km'][neighborhood.get_ID()] = neighborhood._forest_dist_BZ_km
-            forest_dist['for_dist_CNP_km'][neighborhood.get_ID()] = neighborhood._forest_dist_CNP_km
-            forest_dist['for_closest_km'][neighborhood.get_ID()] = neighborhood._forest_closest_km
-            forest_dist['for_closest_type'][neighborhood.get_ID()] = neighborhood._forest_closest_type
-        return forest_dist
-
     def get_neighborhood_pop_stats(self):
         """
         Used each timestep to return a dictionary of neighborhood-level 
@@ -1493,14 +2054,14 @@ class Region(Agent_set):
     def num_persons(self):
         "Returns the number of persons in the population."
         total = 0
-        for household in self.iter_households():
-            total += household.num_members()
+        for neighborhood in self.iter_agents():
+            total += neighborhood.get_num_psn()
         return total
 
     def num_households(self):
         total = 0
         for neighborhood in self.iter_agents():
-            total += len(neighborhood.get_agents())
+            total += neighborhood.num_members()
         return total
 
     def num_neighborhoods(self):
@@ -1526,6 +2087,24 @@ class World():
         self._NIDGen = IDGenerator()
         self._RIDGen = IDGenerator()
 
+        # The attributes of all person agents are stored in _person_table (see 
+        # agent_tables.PersonTable). Households and neighborhoods are referred 
+        # to in the person table by dense indices (distinct from their ID 
+        # numbers).
+        self._person_table = PersonTable()
+        # Persons who die or leave the model permanently are recorded in 
+        # _person_archive (see agent_tables.PersonArchive), which also releases 
+        # their Person instances from the person table. The archive is used 
+        # for debugging and output only.
+        self._person_archive = PersonArchive(self._person_table)
+        # The IDs of all households are stored in _household_table (see 
+        # agent_tables.HouseholdTable), indexed by household index.
+        self._household_table = HouseholdTable()
+        # The land use, NFO, EVI and forest distance attributes of all 
+        # neighborhoods are stored in _neighborhood_table (see 
+        # agent_tables.NeighborhoodTable).
+        self._neighborhood_table = NeighborhoodTable()
+
     def set_DEM_data(self, DEM, gt, prj):
         self._DEM_array = DEM
         self._DEM_gt = gt
@@ -1550,23 +2129,161 @@ class World():
     def get_world_mask_data(self):
         return self._world_mask_array, self._world_mask_gt, self._world_mask_prj
 
-    def new_person(self, birthdate, PID=None, **kwargs):
+    def new_person(self, birthdate, PID=None, mother=None, father=None, 
+            age=None, sex=None, initial_agent=False, ethnicity=None, 
+            in_migrant=False):
         "Returns a new person agent."
-        if PID == None:
-            PID = self._PIDGen.next()
-        else:
-            # Update the generator so the PID will not be reused
-            self._PIDGen.use_ID(PID)
-        return Person(self, birthdate, ID=PID, **kwargs)
+        return self.new_persons([birthdate], [age], sexes=[sex], 
+                ethnicities=[ethnicity], mothers=[mother], fathers=[father], 
+                PIDs=[PID], initial_agent=initial_agent, 
+                in_migrant=in_migrant)[0]
+
+    def new_persons(self, birthdates, ages, sexes=None, ethnicities=None, 
+            mothers=None, fathers=None, PIDs=None, initial_agent=False, 
+            in_migrant=False):
+        """
+        Returns a list of new person agents, one for each element of 
+        birthdates. ages, sexes, ethnicities, mothers, fathers and PIDs are 
+        sequences with one element per person. Persons with a sex (or PID) of 
+        None (or all persons, if sexes or PIDs is None) are assigned a random 
+        sex (or a new PID). Sex and ethnicity are given as codes (see 
+        agent_tables.SEX_CODES and ETHNICITY_CODES).
+
+        The rows of the new persons are allocated in the person table in one 
+        step, and the random initial attributes of the persons are drawn for 
+        all of the persons at once.
+        """
+        num_persons = len(birthdates)
+        if sexes is None: sexes = [None] * num_persons
+        if ethnicities is None: ethnicities = [None] * num_persons
+        if mothers is None: mothers = [None] * num_persons
+        if fathers is None: fathers = [None] * num_persons
+        if PIDs is None: PIDs = [None] * num_persons
+        for sex in sexes:
+            if not (sex == None or sex in SEX_CODES.values()):
+                raise ValueError("%s is not a valid gender"%(sex))
+
+        table = self._person_table
+        rows = table.add_rows([None] * num_persons)
+        persons = []
+        for n in xrange(num_persons):
+            PID = PIDs[n]
+            if PID == None:
+                PID = self._PIDGen.next()
+            else:
+                # Update the generator so the PID will not be reused
+                self._PIDGen.use_ID(PID)
+            persons.append(Person(self, birthdates[n], rows[n], ID=PID, 
+                mother=mothers[n], father=fathers[n], 
+                initial_agent=initial_agent, in_migrant=in_migrant))
+
+        # self._agemonths is used as a convenience to avoid the need to 
+        # calculate the agent's age from self._birthdate each time it is 
+        # needed. It is important to remember though that all agent's ages 
+        # must be incremented with each model timestep, and are expressed in 
+        # months.  The age starts at 0 (it is zero for the entire first 
+        # timestep of the model).
+        agemonths = np.array(ages, dtype=float)
+        table.agemonths[rows] = agemonths
+
+        # Person agents without a sex are randomly assigned a sex
+        sexes = np.array([-1 if sex == None else sex for sex in sexes], dtype=int)
+        random_sex = sexes == -1
+        sexes[random_sex] = np.where(np.random.random_sample(np.sum(random_sex)) < .5,
+                SEX_CODES['female'], SEX_CODES['male'])
+        table.sex[rows] = sexes
+        female = sexes == SEX_CODES['female']
 
-    def new_household(self, HID=None, **kwargs):
+        # The agent's ethnicity in the CVFS data as 1: High Caste Hindu, 2: 
+        # Hill Tibetoburmese, 3: Low Caste Hindu, 4: Newar, 5: Terai 
+        # Tibetoburmese, 6: Other. Other is dropped from the model for 
+        # consistency of published works. Here ethnicity is stored as an 
+        # ethnicity code (see agent_tables.ETHNICITY_CODES, and 
+        # initialize.py).
+        table.ethnicity[rows] = [-1 if ethnicity == None else ethnicity for 
+                ethnicity in ethnicities]
+
+        # For initial agents, birth interval is set in initialize.py.
+        table.birth_interval[rows[female]] = calc_birth_interval(np.sum(female))
+        # Note that first birth timing is assigned to men, just to make 
+        # outputting results easier, so that we don't have to check if a value 
+        # is assigned.
+        table.first_birth_timing[rows] = calc_first_birth_time(size=num_persons)
+
+        # If not defined at birth, _des_num_children will be defined (for 
+        # women) at marriage in the "marry" function. The number of children, 
+        # schooling, marriage time and last birth time are left at their 
+        # default values in the person table (see agent_tables.PersonTable).
+        table.school_status[rows] = np.where(agemonths > 12*22,
+                SCHOOL_STATUS_CODES['outofschool'], 
+                SCHOOL_STATUS_CODES['undetermined'])
+
+        # Work probabilities are from the T1 individual interview. Parents 
+        # contraceptive use probability is from Ghimire, Axinn (2010).
+        table.work[rows] = np.random.random_sample(num_persons) < np.where(female, .205, .450)
+        table.parents_contracep_ever[rows] = np.random.random_sample(num_persons) < .53
+
+        if in_migrant:
+            # These values are set in the give_birth method of mother agents 
+            # for agents born within the model run, and in initialize.py for 
+            # agents that initialize the model.
+            school_age = (agemonths / 12.) > rcParams['education.start_school_age_years']
+            table.schooling[rows[school_age]] = np.random.randint(1, 15, np.sum(school_age))
+            #TODO: Fix this to also allow in-school status
+            #TODO: fix the parents' schooling elsewhere according to 
+            # empirical probability
+            table.mother_work[rows] = np.random.random_sample(num_persons) < .5
+            table.father_work[rows] = np.random.random_sample(num_persons) < .5
+            table.mother_years_schooling[rows] = np.random.randint(1, 15, num_persons)
+            table.father_years_schooling[rows] = np.random.randint(1, 15, num_persons)
+            table.mother_num_children[rows] = np.random.randint(1, 6, num_persons)
+            for NFO in ['school', 'health', 'bus', 'market', 'employer']:
+                getattr(table, 'child_%s_lt_1hr_ft'%NFO)[rows] = \
+                        np.random.random_sample(num_persons) < .5
+            table.des_num_children[rows[female]] = calc_des_num_children(np.sum(female))
+
+        return persons
+
+    def new_household(self, HID=None, initial_agent=False):
         "Returns a new household agent."
-        if HID == None:
-            HID = self._HIDGen.next()
-        else:
-            # Update the generator so the HID will not be reused
-            self._HIDGen.use_ID(HID)
-        return Household(self, ID=HID, **kwargs)
+        return self.new_households(1, HIDs=[HID], 
+                initial_agent=initial_agent)[0]
+
+    def new_households(self, num_households, HIDs=None, initial_agent=False):
+        """
+        Returns a list of num_households new household agents. HIDs is a 
+        sequence with one HID per household (households with an HID of None, 
+        or all households if HIDs is None, are assigned a new HID). The random 
+        initial attributes of the households are drawn for all of the 
+        households at once.
+        """
+        if HIDs is None: HIDs = [None] * num_households
+        households = []
+        for HID in HIDs:
+            if HID == None:
+                HID = self._HIDGen.next()
+            else:
+                # Update the generator so the HID will not be reused
+                self._HIDGen.use_ID(HID)
+            households.append(Household(self, ID=HID, 
+                initial_agent=initial_agent))
+
+        any_non_wood_fuels = np.random.random_sample(num_households) < .93 # From DS0002$BAE15
+        own_house_plots = np.random.random_sample(num_households) < .829 # From DS0002$BAA43
+        own_lands = np.random.random_sample(num_households) < .61 # From Axinn, Ghimire (2007)
+        rented_out_lands = np.random.random_sample(num_households) < .11 # From Axinn, Ghimire (2007)
+        any_farmings = np.random.random_sample(num_households) < .8319 # 1996 CVFS
+        TLU_livestocks = calc_TLU_livestock(any_farmings)
+        total_possessions = calc_total_possessions(num_households)
+        for n, household in enumerate(households):
+            household._any_non_wood_fuel = bool(any_non_wood_fuels[n])
+            household._own_house_plot = bool(own_house_plots[n])
+            household._own_land = bool(own_lands[n])
+            household._rented_out_land = bool(rented_out_lands[n])
+            household._any_farming = bool(any_farmings[n])
+            household._TLU_livestock = TLU_livestocks[n]
+            household._total_possessions = total_possessions[n]
+        return households
 
     def new_neighborhood(self, NID=None, **kwargs):
         "Returns a new neighborhood agent."
@@ -1611,26 +2328,70 @@ class World():
             for person in region.iter_all_persons():
                 yield person
 
-    def write_persons_to_csv(self, timestep, results_path):
+    def get_person_records(self, rows=None):
         """
-        Writes a list of persons, with a header row, to CSV.
+        Returns a structured array (with dtype results.PERSON_RECORD_DTYPE) 
+        of person records for the persons in the given rows of the person 
+        table (by default, all the persons resident in the world), for 
+        storage in the person panel. The records are read from the columns of 
+        the person, household and neighborhood tables. Undefined IDs are 
+        returned as -1.
         """
-        psn_csv_file = os.path.join(results_path, "psns_time_%s.csv"%timestep)
-        out_file = open(psn_csv_file, "wb")
-        csv_writer = csv.writer(out_file)
-        csv_writer.writerow(["pid", "hid", "nid", "rid", "gender", "age", 
-                             "ethnicity", "mother_id", "father_id",
-                             "spouseid", "marrtime", "schooling", 
-                             "num_children", "alive", "is_away", 
-                             "is_initial_agent", "is_in_migrant", 
-                             "mother_num_children",
-                             "mother_years_schooling", "mother_work", 
-                             "father_years_schooling","father_work", 
-                             "parents_contracep"])
-        for region in self.iter_regions():
-            for person in region.iter_persons():
-                csv_writer.writerow(person.get_info())
-        out_file.close()
+        table = self._person_table
+        if rows is None:
+            rows = np.concatenate([np.zeros(0, dtype=int)] + 
+                    [region.get_person_rows(include_away=False) for region in 
+                        self.iter_regions()])
+        else:
+            rows = np.asarray(rows, dtype=int)
+        records = np.zeros(len(rows), dtype=PERSON_RECORD_DTYPE)
+        if len(rows) == 0:
+            return records
+
+        # The household and neighborhood of each person are stored as indices 
+        # (rows of the household and neighborhood tables), and the parents 
+        # and spouse as rows of the person table (-1 if undefined).
+        neighborhoods = table.neighborhood[rows]
+        has_neighborhood = neighborhoods >= 0
+        mothers = table.mother[rows]
+        fathers = table.father[rows]
+        spouses = table.spouse[rows]
+        records['pid'] = table.ID[rows]
+        records['hid'] = self._household_table.ID[table.household[rows]]
+        records['nid'] = np.where(has_neighborhood, 
+                self._neighborhood_table.ID[neighborhoods], -1)
+        records['rid'] = np.where(has_neighborhood, 
+                self._neighborhood_table.region_ID[neighborhoods], -1)
+        records['mother_id'] = np.where(mothers >= 0, table.ID[mothers], -1)
+        records['father_id'] = np.where(fathers >= 0, table.ID[fathers], -1)
+        records['spouseid'] = np.where(spouses >= 0, table.ID[spouses], -1)
+        records['gender'] = table.sex[rows]
+        records['age'] = table.agemonths[rows] / 12.
+        records['ethnicity'] = table.ethnicity[rows]
+        records['marrtime'] = table.marriage_time[rows]
+        records['schooling'] = table.schooling[rows]
+        records['num_children'] = table.num_children[rows]
+        records['alive'] = table.alive[rows]
+        records['is_away'] = table.away[rows]
+        records['is_initial_agent'] = table.initial_agent[rows]
+        records['is_in_migrant'] = table.in_migrant[rows]
+
+        # The parents' attributes are only stored for initial agents and 
+        # in-migrants. For persons born during the model run they are read 
+        # from the rows of their parents (see Person.get_mother_work, etc.).
+        own_context = records['is_initial_agent'] | records['is_in_migrant']
+        records['mother_num_children'] = np.where(own_context, 
+                table.mother_num_children[rows], table.num_children[mothers])
+        records['mother_years_schooling'] = np.where(own_context, 
+                table.mother_years_schooling[rows], table.schooling[mothers])
+        records['mother_work'] = np.where(own_context, 
+                table.mother_work[rows], table.work[mothers])
+        records['father_years_schooling'] = np.where(own_context, 
+                table.father_years_schooling[rows], table.schooling[fathers])
+        records['father_work'] = np.where(own_context, 
+                table.father_work[rows], table.work[fathers])
+        records['parents_contracep'] = table.parents_contracep_ever[rows]
+        return records
 
     # TODO: The below is still a work in progress
     # def write_persons_to_netcdf(self, timestep, results_path):
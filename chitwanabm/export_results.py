@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# Copyright 2008-2013 Alex Zvoleff
+#
+# This file is part of the chitwanabm agent-based model.
+# 
+# chitwanabm is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+# 
+# chitwanabm is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License along with
+# chitwanabm.  If not, see <http://www.gnu.org/licenses/>.
+#
+# See the README.rst file for author contact information.
+
+"""
+Exports the results stored in the results file (results.h5) of a ChitwanABM 
+model run to the CSV formats used by earlier versions of the model.
+"""
+
+import os
+import sys
+import argparse
+
+from chitwanabm.results import write_person_panel_csv
+
+def main():
+    parser = argparse.ArgumentParser(description='Export chitwanabm model run results.')
+    parser.add_argument(dest="directory", metavar="directory", type=str, default=None,
+            help='Path to a folder of ChitwanABM run results.')
+    parser.add_argument('--csv-export', dest='csv_export', action='store_const', 
+            const=True, default=False, help='Export the person panel to one CSV file per snapshot (psns_time_<timestep>.csv)')
+    args = parser.parse_args()
+
+    results_h5_file = os.path.join(args.directory, "results.h5")
+    if not os.path.exists(results_h5_file):
+        sys.exit("No results file found in %s"%args.directory)
+
+    if args.csv_export:
+        csv_files = write_person_panel_csv(results_h5_file, args.directory)
+        print "Wrote %s person CSV files to %s"%(len(csv_files), args.directory)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
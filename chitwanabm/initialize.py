@@ -38,6 +38,8 @@ from pyabm.file_io import read_single_band_raster
 
 from chitwanabm import rc_params
 from chitwanabm.agents import World
+from chitwanabm.agent_tables import SEX_CODES, CVFS_ETHNICITY_CODES, \
+        FOREST_TYPE_CODES
 
 logger = logging.getLogger(__name__)
 
@@ -132,7 +134,7 @@ def assemble_neighborhoods(neighborhoodsFile, neighborhoods_coords_file, EVI_fil
         neighborhood._forest_dist_BZ_km = float(neigh_data['BZ_meters']) / 1000.
         neighborhood._forest_dist_CNP_km = float(neigh_data['CNP_meters']) / 1000.
         neighborhood._forest_closest_km = float(neigh_data['closest_meters']) / 1000.
-        neighborhood._forest_closest_type = neigh_data['closest_type']
+        neighborhood._forest_closest_type = FOREST_TYPE_CODES[neigh_data['closest_type']]
 
         # Store the number of neighborhood community groups
         neighborhood._num_groups = float(neigh_data['num_groups'])
@@ -160,10 +162,11 @@ def assemble_neighborhoods(neighborhoodsFile, neighborhoods_coords_file, EVI_fil
         neighborhood._EVI = float(EVI_data[NEIGHID]['Growth_T0'])
         neighborhood._EVI_anom_mean = float(EVI_data[NEIGHID]['mean_anom'])
         neighborhood._EVI_anom_sd = float(EVI_data[NEIGHID]['sd'])
-        # _EVI_ts will store a timeseries of EVI for this neighborhood, needed 
-        # for the calculation of lagged means. To allow calculation of a 2 year 
-        # mean, store two values in it at the initial timestep. These will be 
-        # the values for t-2 and t-1
+        # _EVI_ts stores the last few years of EVI for this neighborhood (in a 
+        # fixed-depth buffer in the neighborhood table), needed for the 
+        # calculation of lagged means. To allow calculation of a 2 year mean, 
+        # store two values in it at the initial timestep. These will be the 
+        # values for t-2 and t-1
         neighborhood._EVI_ts = [neighborhood._EVI_t0, neighborhood._EVI_t0]
 
         neighborhood._x = float(neigh_coords[NEIGHID]['x'])
@@ -251,6 +254,9 @@ def assemble_persons(relationshipsFile, model_world):
     # these spouses will have their status set to unmarried as the model does 
     # not allow having more than one spouse.
     extra_spouses = []
+    # The spouse_RESPIDs dictionary stores the RESPID of each person's spouse 
+    # until all the person agents have been created.
+    spouse_RESPIDs = {}
     for relation in relations.itervalues():
         RESPID = int(relation['RESPID'])
         HHID = int(relation['HHID'])
@@ -316,29 +322,20 @@ def assemble_persons(relationshipsFile, model_world):
             except KeyError:
                 logger.warning("Spouse three of person %s was excluded from the model"%RESPID)
 
-        # Convert numerical genders to "male" or "female". 1 = male, 2 = female
+        # Convert numerical genders to sex codes. 1 = male, 2 = female
         if CENGENDR == '1':
-            CENGENDR = "male"
+            CENGENDR = SEX_CODES['male']
         elif CENGENDR == '2':
-            CENGENDR = "female"
-
-        if ETHNICITY == 1:
-            ETHNICITY = "HighHindu"
-        elif ETHNICITY == 2:
-            ETHNICITY = "HillTibeto"
-        elif ETHNICITY == 3:
-            ETHNICITY = "LowHindu"
-        elif ETHNICITY == 4:
-            ETHNICITY = "Newar"
-        elif ETHNICITY == 5:
-            ETHNICITY = "TeraiTibeto"
+            CENGENDR = SEX_CODES['female']
+
         assert ETHNICITY!=6, "'Other' ethnicity should be dropped from the model"
+        ETHNICITY = CVFS_ETHNICITY_CODES[ETHNICITY]
 
         # Finally, make the new person.
         person = model_world.new_person(None, PID=RESPID, mother=mother_RESPID, 
                 father=father_RESPID, age=AGEMNTHS, sex=CENGENDR, 
                 initial_agent=True, ethnicity=ETHNICITY)
-        person._spouse = spouse_RESPID
+        spouse_RESPIDs[RESPID] = spouse_RESPID
         person._des_num_children = int(relation['desnumchild'])
         person._schooling = int(relation['schooling'])
 
@@ -381,7 +378,7 @@ def assemble_persons(relationshipsFile, model_world):
 
     # Ignore second and third spouses, as the model does not allow them.
     for extra_spouse in extra_spouses:
-        personsDict[extra_spouse]._spouse = None
+        spouse_RESPIDs[extra_spouse] = None
 
     # Now, for each person in the personsDict, convert the RESPIDs for mother, 
     # father, and spouse to be references to the actual instances  of the 
@@ -399,9 +396,10 @@ def assemble_persons(relationshipsFile, model_world):
                 if person._father == person:
                     logger.warning("Person %s skipped because it is it's own father"%(person.get_ID()))
                     continue
-            if person._spouse != None:
+            spouse_RESPID = spouse_RESPIDs[person.get_ID()]
+            if spouse_RESPID != None:
                 # First assign the person's spouse
-                person._spouse = personsDict[person._spouse]
+                person._spouse = personsDict[spouse_RESPID]
                 # If marriage time is unknown, set marriage time based on the 
                 # youngest spouse's age, unless marriage time has already been 
                 # set (if we have already looped over their spouse).
@@ -541,8 +539,10 @@ def assemble_world(data_path):
 
 def save_world(world, filename):
     "Pickles a world for later reloading."
-    file = open(filename, "w")
-    pickle.dump(world, file)
+    file = open(filename, "wb")
+    # Protocol 2 or higher is needed to pickle classes that use __slots__ 
+    # (like Person and Household).
+    pickle.dump(world, file, pickle.HIGHEST_PROTOCOL)
 
 def generate_world():
     """
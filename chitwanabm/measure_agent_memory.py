@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# Copyright 2008-2013 Alex Zvoleff
+#
+# This file is part of the chitwanabm agent-based model.
+# 
+# chitwanabm is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+# 
+# chitwanabm is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License along with
+# chitwanabm.  If not, see <http://www.gnu.org/licenses/>.
+#
+# See the README.rst file for author contact information.
+
+"""
+Measures the memory used by the person and household agents of a newly
+initialized model world, as the mean number of bytes per agent. The world is
+either generated from the CVFS data (see initialize.generate_world), or, with
+--synthetic, built from a synthetic population of initial agents (see
+test.generate_synthetic_world, which does not need the CVFS data). This script
+only relies on introspection of the agent instances, so to compare two versions
+of the agent classes (for example before and after a change to their attribute
+layout), run it in a checkout of each version, with the same rc file and
+options.
+
+The bytes counted for each agent are:
+    - the instance itself (sys.getsizeof), and its __dict__ if it has been
+      created (see get_instance_dict)
+    - the list, tuple, set and dict attributes of the instance (but not the
+      objects they contain, which are mostly other agents)
+    - the float and long attribute values of the instance (small ints,
+      booleans, None and strings are usually shared between instances)
+    - the width of the agent's row in its agent table (see
+      agent_tables.AgentTable), if it has one
+"""
+
+import gc
+import sys
+import argparse
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def get_slot_values(agent):
+    "Returns a dictionary of the values of the slots of an agent instance."
+    slot_values = {}
+    for cls in type(agent).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            if hasattr(agent, name):
+                slot_values[name] = getattr(agent, name)
+    return slot_values
+
+def get_instance_dict(agent):
+    """
+    Returns the __dict__ of an agent instance, or None if the instance has no 
+    __dict__ or it has not been created yet. Accessing agent.__dict__ would 
+    create an empty __dict__ for instances of classes with __slots__ (whose 
+    __dict__ is only created when an attribute without a slot is set), so the 
+    __dict__ is found among the objects the instance refers to instead.
+    """
+    slot_value_ids = set([id(value) for value in 
+        get_slot_values(agent).itervalues()])
+    for referent in gc.get_referents(agent):
+        if type(referent) is dict and not id(referent) in slot_value_ids:
+            return referent
+    return None
+
+def get_attributes(agent):
+    "Returns a dictionary of the attributes set on an agent instance."
+    attributes = {}
+    instance_dict = get_instance_dict(agent)
+    if instance_dict != None:
+        attributes.update(instance_dict)
+    attributes.update(get_slot_values(agent))
+    return attributes
+
+def get_row_bytes(table):
+    "Returns the number of bytes used by one row of an agent table."
+    return sum([np.dtype(dtype).itemsize for name, dtype, fill_value in
+        table._column_types])
+
+def get_agent_bytes(agent):
+    "Returns the number of bytes used by an agent (see the module docstring)."
+    agent_bytes = sys.getsizeof(agent)
+    instance_dict = get_instance_dict(agent)
+    if instance_dict != None:
+        agent_bytes += sys.getsizeof(instance_dict)
+    for value in get_attributes(agent).itervalues():
+        if isinstance(value, tuple) and value == ():
+            # The empty tuple is shared by all instances.
+            continue
+        if isinstance(value, (list, tuple, set, dict, float, long, np.number)):
+            agent_bytes += sys.getsizeof(value)
+    table = getattr(agent, '_table', None)
+    if table != None:
+        agent_bytes += get_row_bytes(table)
+    return agent_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the memory used per agent in a chitwanabm world.')
+    parser.add_argument('--rc', dest="rc_file", metavar="RC_FILE", type=str, default=None,
+            help='Path to a rc file to initialize the world with custom parameters')
+    parser.add_argument('--synthetic', dest='synthetic', action='store_const', 
+            const=True, default=False, help='Measure a synthetic population instead of a world generated from the CVFS data')
+    parser.add_argument('--num-persons', dest='num_persons', type=int, 
+            default=10000, help='Number of persons in the synthetic population')
+    parser.add_argument('--num-households', dest='num_households', type=int, 
+            default=2000, help='Number of households in the synthetic population')
+    parser.add_argument('--num-neighborhoods', dest='num_neighborhoods', 
+            type=int, default=150, help='Number of neighborhoods in the synthetic population')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from chitwanabm import rc_params
+    rc_params.load_default_params('chitwanabm')
+    rc_params.initialize('chitwanabm', args.rc_file)
+
+    if args.synthetic:
+        from chitwanabm.test import generate_synthetic_world
+        world = generate_synthetic_world(args.num_persons, 
+                args.num_households, args.num_neighborhoods)
+    else:
+        from chitwanabm.initialize import generate_world
+        world = generate_world()
+        if world == 1:
+            logger.critical('Error initializing model world')
+            return 1
+
+    persons = []
+    households = []
+    for region in world.iter_regions():
+        persons.extend(region.iter_all_persons())
+        households.extend(region.iter_households())
+    for agent_type, agents in [('person', persons), ('household', households)]:
+        if len(agents) == 0:
+            continue
+        agent_bytes = [get_agent_bytes(agent) for agent in agents]
+        print "%s: %.1f bytes per agent (%s agents, %.1f MB in total)"%(
+                agent_type, np.mean(agent_bytes), len(agents),
+                np.sum(agent_bytes) / 1024. ** 2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,8 @@ from pyabm.utility import TimeSteps
 
 from chitwanabm import rc_params
 from chitwanabm import test
+from chitwanabm.results import NeighborhoodResults, PersonPanel, \
+        TIMESTEPS_DTYPE, PSN_DTYPE, person_events
 
 logger = logging.getLogger(__name__)
 
@@ -45,10 +47,12 @@ timestep = rcParams['model.timestep']
 
 model_time = TimeSteps(timebounds, timestep)
 
-def main_loop(world, results_path):
+def main_loop(world, results_path, results_writer):
     """This function contains the main model loop. Passed to it is a list of 
     regions, which contains the person, household, and neighborhood agents to 
-    be used in the model, and the land-use parameters."""
+    be used in the model, and the land-use parameters. Results are written to 
+    the results file using results_writer (a ResultsWriter instance) as the 
+    model runs."""
     if rcParams['run_validation_checks']:
         if not test.validate_person_attributes(world):
             logger.critical("Person attributes validation failed")
@@ -86,8 +90,6 @@ def main_loop(world, results_path):
         Function to periodically save model results to CSV (if this option is 
         selected in the rc file).
         """
-        if rcParams['save_psn_data']:
-            world.write_persons_to_csv(timestep, results_path)
         if rcParams['save_NBH_data']:
             world.write_NBHs_to_csv(timestep, results_path)
         if rcParams['save_LULC_shapefiles']:
@@ -103,86 +105,36 @@ def main_loop(world, results_path):
     #     if rcParams['save_psn_data_netcdf']:
     #         world.write_persons_to_netcdf(timestep, results_path)
 
-    # Write the results for timestep 0
-    write_results_CSV(world, results_path, 0)
-
-    # saved_data will store event, population, and fuelwood usage data keyed by 
-    # timestep:variable:nbh.
-    saved_data = {}
-    # Save the initialization data for timestep 0 (note that all the event 
-    # variables, like new_births, new_deaths, etc., need to be set to None
-    # in each neighborhood, for each variable, as they are unknown for timestep 
-    # 0 (since the model has not yet begun). Need to construct an empty_events 
-    # dictionary to initialize these events for timestep 0.
+    # The results are written to the results file by results_writer as the 
+    # model runs. There are three results tables:
+    # 	1) timesteps stores the date of each timestep
+    # 	2) nbh stores neighborhood level output
+    # 	3) psn stores region level event and population totals
+    # Snapshots of the person population are also stored in the results file 
+    # if save_psn_data is set.
     # TODO: Fix this to work for multiple regions.
     region = world.get_regions()[0]
-    empty_events = {}
-    EVIs = {}
-    for neighborhood in region.iter_agents():
-        empty_events[neighborhood.get_ID()] = np.NaN
-        EVIs[neighborhood.get_ID()] = neighborhood._EVI
-    saved_data[0] = {}
-    saved_data[0]['EVI'] = EVIs
-    saved_data[0]['births'] = empty_events
-    saved_data[0]['deaths'] = empty_events
-    saved_data[0]['marr'] = empty_events
-    saved_data[0]['divo'] = empty_events
-    saved_data[0]['out_migr_LL_indiv'] = empty_events
-    saved_data[0]['ret_migr_LL_indiv'] = empty_events
-    saved_data[0]['out_migr_LD_indiv'] = empty_events
-    saved_data[0]['ret_migr_LD_indiv'] = empty_events
-    saved_data[0]['in_migr_HH'] = empty_events
-    saved_data[0]['out_migr_HH'] = empty_events
-    saved_data[0].update(region.get_neighborhood_pop_stats())
-    saved_data[0].update(region.get_neighborhood_fw_usage(model_time.get_T0_date_float()))
-
-    ###########################################################################
-    # Define the result arrays - there will be three arrays stored in a 
-    # dictionary:
-    # 	1) timesteps stores the output
-    # 	2) nbh stores neighborhood level output
-    # 	3) psn stores person level output
-    results_new_format = {}
-    timesteps_dtype = [('timestep', 'i2'),
-                       ('year', 'i2'),
-                       ('month', 'i2'),
-                       ('date_float', 'f4')]
-    results_new_format['timesteps'] = np.zeros((model_time.get_total_num_timesteps()), 
-            dtype=timesteps_dtype)
-
-    #TODO: Finish this
-    nbh_dtype = [('EVI', 'f4'),
-                 ('births', 'i2'),
-                 ('deaths', 'i2'),
-                 ('marr', 'i2'),
-                 ('divo', 'i2'),
-                 ('out_migr_LL_indiv', 'i2'),
-                 ('ret_migr_LL_indiv', 'i2'),
-                 ('out_migr_LD_indiv', 'i2'),
-                 ('ret_migr_LD_indiv', 'i2'),
-                 ('in_migr_HH', 'i2'),
-                 ('out_migr_HH', 'i2'),
-                 ('num_psn', 'i4'),
-                 ('num_hs', 'i2'),
-                 ('num_marr', 'i2')]
-    results_new_format['nbh'] = np.zeros((region.num_members() * 
-        model_time.get_total_num_timesteps()), dtype=nbh_dtype)
-
-    #TODO: Finish this
-    psn_dtype = [('births', 'i2'),
-                 ('deaths', 'i2'),
-                 ('marr', 'i2'),
-                 ('divo', 'i2'),
-                 ('out_migr_LL_indiv', 'i2'),
-                 ('ret_migr_LL_indiv', 'i2'),
-                 ('out_migr_LD_indiv', 'i2'),
-                 ('ret_migr_LD_indiv', 'i2'),
-                 ('in_migr_HH', 'i2'),
-                 ('out_migr_HH', 'i2'),
-                 ('num_psn', 'i4'),
-                 ('num_hs', 'i2'),
-                 ('num_marr', 'i2')]
-    results_new_format['psn'] = np.zeros((model_time.get_total_num_timesteps()), dtype=psn_dtype)
+    total_num_timesteps = model_time.get_total_num_timesteps()
+    results_writer.create_table('timesteps', TIMESTEPS_DTYPE, total_num_timesteps)
+    results_writer.create_table('psn', PSN_DTYPE, total_num_timesteps)
+    # nbh_results stores event, population, land use and fuelwood usage data 
+    # for each neighborhood in a buffer with one row per timestep, that is 
+    # appended to the results file each model year. The event 
+    # variables (births, deaths, etc.) are unknown for timestep 0 (since the 
+    # model has not yet begun), so only the neighborhood state is recorded for 
+    # timestep 0.
+    nbh_results = NeighborhoodResults(region, results_writer, total_num_timesteps)
+    nbh_results.record_state(0, region, model_time.get_T0_date_float())
+    # person_panel stores snapshots of the person population every 
+    # save_psn_data.interval timesteps.
+    if rcParams['save_psn_data']:
+        person_panel = PersonPanel(results_writer, region.num_persons(), 
+                total_num_timesteps // rcParams['save_psn_data.interval'] + 2, 
+                rcParams['save_psn_data.delta'], rcParams['model.timestep'])
+        person_panel.append(0, world.get_person_records())
+
+    # Write the results for timestep 0
+    write_results_CSV(world, results_path, 0)
 
     # Make a dictionary to store empty (zero) event data for submodels if they 
     # are turned off by the user.
@@ -219,9 +171,9 @@ def main_loop(world, results_path):
 
     while model_time.in_bounds():
         timestep = model_time.get_cur_int_timestep()
-        results_new_format['timesteps'][timestep - 1] = (timestep, 
-                model_time.get_cur_year(), model_time.get_cur_month(), 
-                model_time.get_cur_date_float())
+        results_writer.append('timesteps', np.array([(timestep, 
+            model_time.get_cur_year(), model_time.get_cur_month(), 
+            model_time.get_cur_date_float())], dtype=TIMESTEPS_DTYPE))
         logger.debug('beginning timestep %s (%s)'%(model_time.get_cur_int_timestep(), 
             model_time.get_cur_date_string()))
         if model_time.get_cur_month() == 1:
@@ -271,25 +223,19 @@ def main_loop(world, results_path):
             if rcParams['NFOs.change.model'].lower() != 'none':
                 region.establish_NFOs()
 
-        # Save event, LULC, and population data in the saved_data dictionary 
-        # for later output to CSV.
-        saved_data[timestep] = {}
-        saved_data[timestep]['EVI'] = EVIs
-        saved_data[timestep]['births'] = new_births
-        saved_data[timestep]['deaths'] = new_deaths
-        saved_data[timestep]['marr'] = new_marr
-        saved_data[timestep]['divo'] = new_divo
-        saved_data[timestep]['out_migr_LL_indiv'] = new_out_migr_LL_indiv
-        saved_data[timestep]['ret_migr_LL_indiv'] = new_ret_migr_LL_indiv
-        saved_data[timestep]['out_migr_LD_indiv'] = new_out_migr_LD_indiv
-        saved_data[timestep]['ret_migr_LD_indiv'] = new_ret_migr_LD_indiv
-        saved_data[timestep]['in_migr_HH'] = new_in_migr_HH
-        saved_data[timestep]['out_migr_HH'] = new_out_migr_HH
-        saved_data[timestep].update(region.get_neighborhood_pop_stats())
-        saved_data[timestep].update(region.get_neighborhood_fw_usage(model_time.get_cur_date_float()))
-        saved_data[timestep].update(region.get_neighborhood_landuse())
-        saved_data[timestep].update(region.get_neighborhood_nfo_context())
-        saved_data[timestep].update(region.get_neighborhood_forest_distance())
+        # Save event, LULC, and population data in the neighborhood results 
+        # for later output to CSV and HDF5.
+        nbh_results.record_events(timestep, {'births': new_births,
+            'deaths': new_deaths,
+            'marr': new_marr,
+            'divo': new_divo,
+            'out_migr_LL_indiv': new_out_migr_LL_indiv,
+            'ret_migr_LL_indiv': new_ret_migr_LL_indiv,
+            'out_migr_LD_indiv': new_out_migr_LD_indiv,
+            'ret_migr_LD_indiv': new_ret_migr_LD_indiv,
+            'in_migr_HH': new_in_migr_HH,
+            'out_migr_HH': new_out_migr_HH})
+        nbh_results.record_state(timestep, region, model_time.get_cur_date_float())
 
         # Keep running totals of events for printing results:
         num_new_births = sum(new_births.values())
@@ -318,14 +264,21 @@ def main_loop(world, results_path):
         # is running.
         num_persons = region.num_persons()
         num_households = region.num_households()
+        num_marriages = region.get_num_marriages()
         stats_string = "%s: P: %5s TMa: %5s THH: %5s NMa: %3s NDv: %3s NB: %3s ND: %3s NOLL: %3s NRLL: %3s NOLD: %3s NRLD: %3s NOMH: %3s NIMH: %3s"%(
                 model_time.get_cur_date_string().ljust(7), num_persons, 
-                region.get_num_marriages(), num_households,
+                num_marriages, num_households,
                 num_new_marr, num_new_divo, num_new_births, num_new_deaths, 
                 num_new_out_migr_LL_indiv, num_new_ret_migr_LL_indiv, 
                 num_new_out_migr_LD_indiv, num_new_ret_migr_LD_indiv, 
                 num_new_out_migr_HH, num_new_in_migr_HH)
         logger.info('%s'%stats_string)
+        results_writer.append('psn', np.array([(timestep, num_new_births, 
+            num_new_deaths, num_new_marr, num_new_divo, 
+            num_new_out_migr_LL_indiv, num_new_ret_migr_LL_indiv, 
+            num_new_out_migr_LD_indiv, num_new_ret_migr_LD_indiv, 
+            num_new_in_migr_HH, num_new_out_migr_HH, num_persons, 
+            num_households, num_marriages)], dtype=PSN_DTYPE))
 
         # Save timestep, year and month, and time_float values for use in 
         # storing results (to CSV) keyed to a particular timestep.
@@ -365,12 +318,26 @@ def main_loop(world, results_path):
             logger.info("End of model run: population is zero")
             break
 
+        if rcParams['save_psn_data'] and \
+                (timestep % rcParams['save_psn_data.interval'] == 0 or 
+                        model_time.is_last_iteration()):
+            person_panel.append(timestep, world.get_person_records())
+
         if model_time.get_cur_month() == 12 or model_time.is_last_iteration():
             write_results_CSV(world, results_path, model_time.get_cur_int_timestep())
+            # Flush the results file so that the results so far are readable 
+            # if the run ends early.
+            nbh_results.flush()
+            person_events.flush()
+            results_writer.flush()
 
         model_time.increment()
 
-    return saved_data, time_strings, results_new_format
+    nbh_results.flush()
+    person_events.flush()
+    results_writer.flush()
+
+    return time_strings
 
 def elapsed_time(start_time):
     elapsed = int(time.time() - start_time)
@@ -0,0 +1,682 @@
+# Copyright 2008-2013 Alex Zvoleff
+#
+# This file is part of the chitwanabm agent-based model.
+#
+# chitwanabm is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# chitwanabm is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# chitwanabm.  If not, see <http://www.gnu.org/licenses/>.
+#
+# See the README.rst file for author contact information.
+
+"""
+Contains the storage for model results. Results are written to an HDF5 file 
+by a ResultsWriter as the model runs: a row block is appended to each results 
+table every timestep, so memory use does not grow with the length of the run, 
+and the results of a run that ends early can still be read. Neighborhood-level 
+results are collected in a NeighborhoodResults instance, a (timestep x 
+neighborhood) NumPy structured array buffer that is filled in place each 
+timestep and appended to the results file when full. After the run, the 
+neighborhood results can be written to CSV (in the wide format read by the R 
+scripts) with write_nbh_results_csv.
+
+Demographic events (births, deaths, marriages, etc.) are recorded for each 
+person involved by the person_events PersonEventRecorder, which stores 
+fixed-width records in a buffer that is appended to the results file when 
+full. The events are written to CSV after the run with 
+write_person_events_csv. Snapshots of the whole person population can also be 
+stored in a PersonPanel (optionally delta-encoded, storing only the changes 
+between snapshots), and exported to the per-timestep CSV files read by the R 
+scripts with write_person_panel_csv (or the chitwanabm_export_results 
+command).
+"""
+
+from __future__ import division
+
+import os
+import csv
+import logging
+
+import numpy as np
+import tables
+
+from chitwanabm.agent_tables import NFO_TYPES, FOREST_TYPE_LABELS, \
+        SEX_LABELS, ETHNICITY_LABELS, get_label
+
+logger = logging.getLogger(__name__)
+
+# The neighborhood-level events counted each timestep. Event counts are
+# unknown for timestep 0 (before the model starts), and are stored as -1 for
+# that timestep.
+EVENT_VARIABLES = ['births', 'deaths', 'marr', 'divo', 'out_migr_LL_indiv',
+                   'ret_migr_LL_indiv', 'out_migr_LD_indiv',
+                   'ret_migr_LD_indiv', 'in_migr_HH', 'out_migr_HH']
+
+# The land use variables stored in the results, and the NeighborhoodTable
+# columns they are read from.
+LAND_USE_VARIABLES = [('agveg', 'land_agveg'),
+                      ('nonagveg', 'land_nonagveg'),
+                      ('privbldg', 'land_privbldg'),
+                      ('pubbldg', 'land_pubbldg'),
+                      ('other', 'land_other')]
+
+# The forest distance variables stored in the results, and the
+# NeighborhoodTable columns they are read from.
+FOREST_DISTANCE_VARIABLES = [('for_dist_BZ_km', 'forest_dist_BZ_km'),
+                             ('for_dist_CNP_km', 'forest_dist_CNP_km'),
+                             ('for_closest_km', 'forest_closest_km'),
+                             ('for_closest_type', 'forest_closest_type')]
+
+# Variables that are stored as codes, and the labels used when writing them to
+# CSV.
+RESULTS_LABELS = {'for_closest_type': FOREST_TYPE_LABELS}
+
+NBH_RESULTS_DTYPE = [('EVI', 'f8')] + \
+                    [(variable, 'i4') for variable in EVENT_VARIABLES] + \
+                    [('num_psn', 'i4'),
+                     ('num_hs', 'i4'),
+                     ('num_marr', 'i4'),
+                     ('fw_usage', 'f8')] + \
+                    [(variable, 'f8') for variable, column in LAND_USE_VARIABLES] + \
+                    [(NFO_type, 'f8') for NFO_type in NFO_TYPES] + \
+                    [('for_dist_BZ_km', 'f8'),
+                     ('for_dist_CNP_km', 'f8'),
+                     ('for_closest_km', 'f8'),
+                     ('for_closest_type', 'i1')]
+
+# The neighborhood results are stored in the results file with one record per 
+# timestep and neighborhood.
+NBH_RECORD_DTYPE = [('timestep', 'i2'),
+                    ('neighid', 'i4')] + NBH_RESULTS_DTYPE
+
+TIMESTEPS_DTYPE = [('timestep', 'i2'),
+                   ('year', 'i2'),
+                   ('month', 'i2'),
+                   ('date_float', 'f4')]
+
+# Region-level event and population totals for each timestep.
+PSN_DTYPE = [('timestep', 'i2')] + \
+            [(variable, 'i4') for variable in EVENT_VARIABLES] + \
+            [('num_psn', 'i4'),
+             ('num_hs', 'i4'),
+             ('num_marr', 'i4')]
+
+class ResultsWriter(object):
+    """
+    Writes model results to an HDF5 file (using PyTables) while the model is 
+    running. The file is opened when the ResultsWriter is created, and each 
+    results table is created with create_table and then grown a row block at 
+    a time with append. Tables are stored chunked and compressed. Appended rows 
+    are buffered by PyTables until flush is called, so flush should be called 
+    periodically (each model year) to ensure that the results of a run that 
+    ends early are readable.
+    """
+    def __init__(self, hdf_filename, run_ID_number):
+        self._filename = hdf_filename
+        self._filters = tables.Filters(complevel=5, complib='zlib')
+        self._file = tables.openFile(hdf_filename, mode="w", title='ChitwanABM')
+        self._file.createArray('/', 'run_ID', np.array(run_ID_number))
+        self._tables = {}
+
+    def get_filename(self):
+        return self._filename
+
+    def create_table(self, name, dtype, expected_rows):
+        """
+        Creates an empty results table. expected_rows is the number of rows 
+        expected by the end of the run, and is used by PyTables to choose the 
+        chunk size.
+        """
+        self._tables[name] = self._file.createTable('/', name, np.dtype(dtype), 
+                filters=self._filters, expectedrows=max(expected_rows, 1))
+
+    def append(self, name, records):
+        "Appends a structured array of records to a results table."
+        if len(records) > 0:
+            self._tables[name].append(records)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._file.isopen:
+            self._file.close()
+
+def read_results_h5(hdf_filename, names=None):
+    """
+    Reads the results tables from a results file written by a ResultsWriter, 
+    and returns them as a dictionary of NumPy structured arrays keyed by table 
+    name. If names is given, only the tables in names are read.
+    """
+    results = {}
+    f = tables.openFile(hdf_filename, mode="r")
+    for table in f.walkNodes('/', classname='Table'):
+        if names == None or table.name in names:
+            results[table.name] = table.read()
+    f.close()
+    return results
+
+class NeighborhoodResults(object):
+    """
+    Stores the neighborhood-level results of a model run in a structured array 
+    buffer with one row per timestep (starting from timestep 0, the initial 
+    state of the model) and one column per neighborhood. When the buffer is 
+    full (or when flush is called) the buffered timesteps are appended to the 
+    'nbh' table of the results file, and the buffer is reused for the 
+    following timesteps. The columns are in the order of the neighborhoods of 
+    the region passed to __init__.
+    """
+    def __init__(self, region, writer, num_timesteps, buffer_timesteps=12):
+        self._IDs = np.array(region.get_neighborhood_IDs())
+        # _rows are the rows of the neighborhoods in the NeighborhoodTable.
+        self._rows = region.get_neighborhood_indices()
+        # _positions maps neighborhood IDs to columns of the results array.
+        self._positions = dict(zip(self._IDs.tolist(), xrange(len(self._IDs))))
+        self._writer = writer
+        writer.create_table('nbh', NBH_RECORD_DTYPE, 
+                (num_timesteps + 1) * len(self._IDs))
+        self._data = np.zeros((buffer_timesteps, len(self._IDs)),
+                dtype=NBH_RESULTS_DTYPE)
+        self._clear()
+        # _first_timestep is the timestep stored in the first row of the 
+        # buffer, and _num_buffered is the number of rows of the buffer that 
+        # have been filled.
+        self._first_timestep = 0
+        self._num_buffered = 0
+
+    def _clear(self):
+        for variable in self._data.dtype.names:
+            self._data[variable] = 0
+        for variable in EVENT_VARIABLES:
+            self._data[variable] = -1
+        self._data['for_closest_type'] = -1
+
+    def get_IDs(self):
+        return self._IDs
+
+    def _get_row(self, timestep):
+        "Returns a view of the row of the buffer that stores a timestep."
+        position = timestep - self._first_timestep
+        if position >= len(self._data):
+            self.flush()
+            position = timestep - self._first_timestep
+        self._num_buffered = max(self._num_buffered, position + 1)
+        return self._data[position]
+
+    def record_events(self, timestep, events):
+        """
+        Records the event counts for a timestep. events is a dictionary keyed
+        by event variable (see EVENT_VARIABLES) of dictionaries of event
+        counts keyed by neighborhood ID, as returned by the Region submodel
+        methods.
+        """
+        self._record_dicts(self._get_row(timestep), events)
+
+    def _record_dicts(self, row, values):
+        """
+        Records a dictionary keyed by variable of dictionaries of values keyed 
+        by neighborhood ID.
+        """
+        positions = self._positions
+        for variable, NBH_values in values.iteritems():
+            column = row[variable]
+            for NID, value in NBH_values.iteritems():
+                column[positions[NID]] = value
+
+    def record_state(self, timestep, region, time):
+        """
+        Records the state of the neighborhoods of a region at the end of a
+        timestep: EVI, population, fuelwood usage, land use, NFO travel times,
+        and forest distances.
+        """
+        row = self._get_row(timestep)
+        rows = self._rows
+        row['EVI'] = region.get_neighborhood_column('EVI')[rows]
+        self._record_dicts(row, region.get_neighborhood_pop_stats())
+        self._record_dicts(row, region.get_neighborhood_fw_usage(time))
+        for variable, column in LAND_USE_VARIABLES + FOREST_DISTANCE_VARIABLES:
+            row[variable] = region.get_neighborhood_column(column)[rows]
+        for NFO_type in NFO_TYPES:
+            row[NFO_type] = region.get_neighborhood_column(NFO_type)[rows]
+
+    def flush(self):
+        """
+        Appends the buffered timesteps to the results file as records with one 
+        record per timestep and neighborhood, and clears the buffer.
+        """
+        if self._num_buffered == 0:
+            return
+        data = self._data[:self._num_buffered]
+        records = np.zeros(data.size, dtype=NBH_RECORD_DTYPE)
+        records['timestep'] = np.repeat(self._first_timestep + 
+                np.arange(data.shape[0]), data.shape[1])
+        records['neighid'] = np.tile(self._IDs, data.shape[0])
+        for variable in data.dtype.names:
+            records[variable] = data[variable].ravel()
+        self._writer.append('nbh', records)
+        self._first_timestep += self._num_buffered
+        self._num_buffered = 0
+        self._clear()
+
+def write_nbh_results_csv(records, csv_file, ID_col_name="neighid"):
+    """
+    Writes neighborhood results records (as stored in the 'nbh' table of the 
+    results file) to CSV with one row per neighborhood, and one column per 
+    variable and timestep (named <variable>.<timestep>), with the variables in 
+    alphabetical order.
+    """
+    records = np.sort(records, order=['timestep', 'neighid'])
+    timesteps = np.unique(records['timestep'])
+    IDs = records['neighid'][records['timestep'] == timesteps[0]]
+    records = records.reshape((len(timesteps), len(IDs)))
+    variables = sorted([variable for variable, dtype in NBH_RESULTS_DTYPE])
+    out_file = open(csv_file, "wb")
+    csv_writer = csv.writer(out_file)
+    var_names = [ID_col_name]
+    for variable in variables:
+        for timestep in timesteps:
+            var_names.append(variable + "." + str(timestep))
+    csv_writer.writerow(var_names)
+    columns = []
+    for variable in variables:
+        values = records[variable].tolist()
+        if variable in EVENT_VARIABLES and timesteps[0] == 0:
+            # Event counts are unknown for timestep 0
+            values[0] = [np.NaN] * len(IDs)
+        if variable in RESULTS_LABELS:
+            values = [[get_label(RESULTS_LABELS[variable], value) for
+                value in timestep_values] for timestep_values in values]
+        columns.extend(values)
+    for position, ID in enumerate(IDs.tolist()):
+        row = [ID]
+        row.extend([values[position] for values in columns])
+        csv_writer.writerow(row)
+    out_file.close()
+
+# Codes for the person events recorded by the PersonEventRecorder. The labels 
+# are the event names written to the person events CSV.
+PERSON_EVENT_CODES = {'LL_migration': 0,
+                      'LD_migration': 1,
+                      'Death': 2,
+                      'First birth': 3,
+                      'Subsequent birth': 4,
+                      'Birth': 5,
+                      'Marriage': 6,
+                      'Divorce': 7}
+PERSON_EVENT_LABELS = dict([(code, label) for label, code in 
+    PERSON_EVENT_CODES.items()])
+
+# The fields of each person record (see Person.get_event_record), as stored 
+# with each person event and in each person panel snapshot. Agent IDs of -1, 
+# codes of -1, and NaNs denote undefined values.
+PERSON_RECORD_DTYPE = [('pid', 'i4'),
+                       ('hid', 'i4'),
+                       ('nid', 'i4'),
+                       ('rid', 'i4'),
+                       ('gender', 'i1'),
+                       ('age', 'f8'),
+                       ('ethnicity', 'i1'),
+                       ('mother_id', 'i4'),
+                       ('father_id', 'i4'),
+                       ('spouseid', 'i4'),
+                       ('marrtime', 'f8'),
+                       ('schooling', 'f8'),
+                       ('num_children', 'i4'),
+                       ('alive', 'b1'),
+                       ('is_away', 'b1'),
+                       ('is_initial_agent', 'b1'),
+                       ('is_in_migrant', 'b1'),
+                       ('mother_num_children', 'i4'),
+                       ('mother_years_schooling', 'f8'),
+                       ('mother_work', 'b1'),
+                       ('father_years_schooling', 'f8'),
+                       ('father_work', 'b1'),
+                       ('parents_contracep', 'b1')]
+
+PERSON_EVENT_DTYPE = [('time', 'i2'),
+                      ('event', 'i1')] + PERSON_RECORD_DTYPE
+
+PERSON_PANEL_DTYPE = [('timestep', 'i2')] + PERSON_RECORD_DTYPE
+
+PERSON_ID_FIELDS = ['pid', 'hid', 'nid', 'rid', 'mother_id', 'father_id', 
+                    'spouseid']
+
+PERSON_LABEL_FIELDS = {'event': PERSON_EVENT_LABELS,
+                       'gender': SEX_LABELS,
+                       'ethnicity': ETHNICITY_LABELS}
+
+class PersonEventRecorder(object):
+    """
+    Records person events (see PERSON_EVENT_CODES) as fixed-width records in a 
+    preallocated buffer, which is appended to the 'person_events' table of 
+    the results file when full (or when flush is called). Events are only 
+    recorded once the recorder has been opened with a ResultsWriter.
+    """
+    def __init__(self, buffer_size=4096):
+        self._buffer = np.zeros(buffer_size, dtype=PERSON_EVENT_DTYPE)
+        self._num_buffered = 0
+        self._writer = None
+
+    def open(self, writer, expected_rows=100000):
+        "Creates the person events table, and starts recording events."
+        writer.create_table('person_events', PERSON_EVENT_DTYPE, expected_rows)
+        self._writer = writer
+        self._num_buffered = 0
+
+    def close(self):
+        "Flushes any buffered events, and stops recording events."
+        self.flush()
+        self._writer = None
+
+    def record(self, event, person, timestep):
+        "Records an event for a person."
+        if self._writer == None:
+            return
+        if self._num_buffered == len(self._buffer):
+            self.flush()
+        self._buffer[self._num_buffered] = (timestep, 
+                PERSON_EVENT_CODES[event]) + person.get_event_record()
+        self._num_buffered += 1
+
+    def flush(self):
+        "Appends the buffered events to the results file."
+        if self._writer == None or self._num_buffered == 0:
+            return
+        self._writer.append('person_events', self._buffer[:self._num_buffered])
+        self._num_buffered = 0
+
+person_events = PersonEventRecorder()
+
+def _format_person_field(field, values):
+    "Formats a column of person records as strings for CSV output."
+    if field in PERSON_ID_FIELDS:
+        return ['None' if value == -1 else str(value) for value in values]
+    elif field in PERSON_LABEL_FIELDS:
+        labels = PERSON_LABEL_FIELDS[field]
+        return [str(get_label(labels, value)) for value in values]
+    elif len(values) > 0 and isinstance(values[0], float):
+        return ['None' if value != value else str(value) for value in values]
+    else:
+        return [str(value) for value in values]
+
+def _write_person_records(csv_writer, records, fields):
+    "Writes the given fields of an array of person records to a CSV writer."
+    columns = [_format_person_field(field, records[field].tolist()) for field 
+            in fields]
+    csv_writer.writerows(zip(*columns))
+
+def write_person_events_csv(hdf_filename, csv_file, chunk_size=100000):
+    """
+    Writes the person events recorded in a results file to CSV, with one row 
+    per event and one column per field of PERSON_EVENT_DTYPE, with undefined 
+    values written as None. The events are read from the results file in 
+    chunks of chunk_size records.
+    """
+    f = tables.openFile(hdf_filename, mode="r")
+    table = f.root.person_events
+    out_file = open(csv_file, "wb")
+    csv_writer = csv.writer(out_file)
+    fields = [field for field, dtype in PERSON_EVENT_DTYPE]
+    csv_writer.writerow(fields)
+    for start in xrange(0, table.nrows, chunk_size):
+        records = table.read(start, min(start + chunk_size, table.nrows))
+        _write_person_records(csv_writer, records, fields)
+    out_file.close()
+    f.close()
+
+# Records of the snapshots stored in a person panel. delta is True for 
+# snapshots that are stored as changes from the previous snapshot, and 
+# years_elapsed is the time since the previous snapshot.
+PERSON_PANEL_TIMESTEPS_DTYPE = [('timestep', 'i2'),
+                                ('delta', 'b1'),
+                                ('years_elapsed', 'f8')]
+
+# Records of changed person attributes in a delta-encoded person panel. field 
+# is the position of the changed field in PERSON_RECORD_DTYPE.
+PERSON_PANEL_CHANGE_DTYPE = [('timestep', 'i2'),
+                             ('pid', 'i4'),
+                             ('field', 'i1'),
+                             ('value', 'f8')]
+
+PERSON_PANEL_REMOVED_DTYPE = [('timestep', 'i2'),
+                              ('pid', 'i4')]
+
+# Ages that differ by less than this (in years) from the age expected from 
+# the time elapsed since the previous snapshot are not stored as changes.
+AGE_TOLERANCE = 1e-6
+
+class PersonPanel(object):
+    """
+    Stores snapshots of the person population (see World.get_person_records) 
+    in the 'person_panel' table of the results file, keyed by timestep.
+
+    If delta is False, each snapshot is stored in full, with one record per 
+    person. If delta is True, only the first snapshot is stored in full. For 
+    each later snapshot, only the persons added since the previous snapshot 
+    are stored in person_panel, along with the persons removed since the 
+    previous snapshot (in person_panel_removed) and one record for each field 
+    that changed for the remaining persons (in person_panel_changes). Ages 
+    that increased by the time elapsed since the previous snapshot are not 
+    stored as changes. The snapshots of either kind of panel can be read with 
+    read_person_snapshot.
+    """
+    def __init__(self, writer, num_persons, num_snapshots, delta=False, 
+            timestep_months=1):
+        """
+        num_persons and num_snapshots are the expected size of the population 
+        and number of snapshots, and are used to choose the chunk sizes of the 
+        panel tables. timestep_months is the length of a model timestep in 
+        months.
+        """
+        self._writer = writer
+        self._delta = delta
+        self._timestep_months = timestep_months
+        writer.create_table('person_panel_timesteps', 
+                PERSON_PANEL_TIMESTEPS_DTYPE, num_snapshots)
+        if delta:
+            writer.create_table('person_panel', PERSON_PANEL_DTYPE, 
+                    num_persons * 2)
+            writer.create_table('person_panel_changes', 
+                    PERSON_PANEL_CHANGE_DTYPE, num_persons * num_snapshots)
+            writer.create_table('person_panel_removed', 
+                    PERSON_PANEL_REMOVED_DTYPE, num_persons)
+        else:
+            writer.create_table('person_panel', PERSON_PANEL_DTYPE, 
+                    num_persons * num_snapshots)
+        # The previous snapshot (sorted by pid) is kept to calculate the 
+        # changes for the next snapshot.
+        self._previous = None
+        self._previous_timestep = None
+
+    def append(self, timestep, records):
+        """
+        Appends a snapshot (an array of person records with dtype 
+        PERSON_RECORD_DTYPE) for a timestep.
+        """
+        if not self._delta or self._previous is None:
+            self._writer.append('person_panel_timesteps', np.array([(timestep, 
+                False, 0)], dtype=PERSON_PANEL_TIMESTEPS_DTYPE))
+            self._append_records(timestep, records)
+            if self._delta:
+                self._previous = np.sort(records, order='pid')
+                self._previous_timestep = timestep
+            return
+        records = np.sort(records, order='pid')
+        previous = self._previous
+        years_elapsed = (timestep - self._previous_timestep) * \
+                self._timestep_months / 12.
+        self._writer.append('person_panel_timesteps', np.array([(timestep, 
+            True, years_elapsed)], dtype=PERSON_PANEL_TIMESTEPS_DTYPE))
+        is_new = ~np.in1d(records['pid'], previous['pid'])
+        is_removed = ~np.in1d(previous['pid'], records['pid'])
+        removed = np.zeros(np.sum(is_removed), dtype=PERSON_PANEL_REMOVED_DTYPE)
+        removed['timestep'] = timestep
+        removed['pid'] = previous['pid'][is_removed]
+        self._writer.append('person_panel_removed', removed)
+        # The remaining persons are in the same (pid) order in both snapshots.
+        self._writer.append('person_panel_changes', 
+                calc_person_changes(previous[~is_removed], records[~is_new], 
+                    years_elapsed, timestep))
+        self._append_records(timestep, records[is_new])
+        self._previous = records
+        self._previous_timestep = timestep
+
+    def _append_records(self, timestep, records):
+        snapshot = np.zeros(len(records), dtype=PERSON_PANEL_DTYPE)
+        snapshot['timestep'] = timestep
+        for field, dtype in PERSON_RECORD_DTYPE:
+            snapshot[field] = records[field]
+        self._writer.append('person_panel', snapshot)
+
+def calc_person_changes(previous, current, years_elapsed, timestep):
+    """
+    Returns the changes (as records with dtype PERSON_PANEL_CHANGE_DTYPE) 
+    between two arrays of person records for the same persons, in the same 
+    order. Ages are only recorded as changed if they differ from the previous 
+    age plus years_elapsed.
+    """
+    changes = []
+    for code, (field, dtype) in enumerate(PERSON_RECORD_DTYPE):
+        if field == 'pid':
+            continue
+        old = previous[field]
+        new = current[field]
+        if field == 'age':
+            changed = np.abs(new - (old + years_elapsed)) > AGE_TOLERANCE
+        elif np.dtype(dtype).kind == 'f':
+            changed = (old != new) & ~(np.isnan(old) & np.isnan(new))
+        else:
+            changed = old != new
+        field_changes = np.zeros(np.sum(changed), dtype=PERSON_PANEL_CHANGE_DTYPE)
+        field_changes['timestep'] = timestep
+        field_changes['pid'] = current['pid'][changed]
+        field_changes['field'] = code
+        field_changes['value'] = new[changed]
+        changes.append(field_changes)
+    return np.concatenate(changes)
+
+def _to_person_records(panel_records):
+    "Converts person panel records to person records, sorted by pid."
+    records = np.zeros(len(panel_records), dtype=PERSON_RECORD_DTYPE)
+    for field, dtype in PERSON_RECORD_DTYPE:
+        records[field] = panel_records[field]
+    return np.sort(records, order='pid')
+
+def _iter_person_snapshots(f):
+    """
+    Iterates over the snapshots of the person panel in an open results file, 
+    yielding the timestep and the person records (sorted by pid) of each 
+    snapshot. Delta-encoded snapshots are reconstructed from the previous 
+    snapshot.
+    """
+    root = f.root
+    records = None
+    fields = [field for field, dtype in PERSON_RECORD_DTYPE]
+    snapshots = root.person_panel_timesteps.read().tolist()
+    for timestep, delta, years_elapsed in snapshots:
+        panel_records = root.person_panel.readWhere('timestep == %i'%timestep)
+        if not delta:
+            records = _to_person_records(panel_records)
+            yield timestep, records
+            continue
+        records = records.copy()
+        records['age'] += years_elapsed
+        removed = root.person_panel_removed.readWhere('timestep == %i'%timestep)
+        records = records[~np.in1d(records['pid'], removed['pid'])]
+        changes = root.person_panel_changes.readWhere('timestep == %i'%timestep)
+        positions = np.searchsorted(records['pid'], changes['pid'])
+        for code in np.unique(changes['field']):
+            is_field = changes['field'] == code
+            records[fields[code]][positions[is_field]] = changes['value'][is_field]
+        records = np.sort(np.concatenate((records, 
+            _to_person_records(panel_records))), order='pid')
+        yield timestep, records
+
+def read_person_snapshot(hdf_filename, timestep):
+    """
+    Returns the person records (sorted by pid) of the person panel snapshot 
+    for a timestep, reconstructing it from the previous snapshots if the 
+    panel is delta-encoded.
+    """
+    f = tables.openFile(hdf_filename, mode="r")
+    try:
+        for snapshot_timestep, records in _iter_person_snapshots(f):
+            if snapshot_timestep == timestep:
+                return records
+    finally:
+        f.close()
+    raise Exception("no person panel snapshot for timestep %s"%timestep)
+
+def read_person_trajectory(hdf_filename, pid):
+    """
+    Returns the person panel records of a single person (one record per 
+    snapshot that includes the person), ordered by timestep. Only the records 
+    of the person are read from the panel tables - if the panel is 
+    delta-encoded, the person's records are reconstructed by applying their 
+    changes and removals to their records in the same way as 
+    read_person_snapshot.
+    """
+    f = tables.openFile(hdf_filename, mode="r")
+    try:
+        root = f.root
+        panel_records = np.sort(root.person_panel.readWhere('pid == %i'%pid), 
+                order='timestep')
+        snapshots = root.person_panel_timesteps.read()
+        if not np.any(snapshots['delta']):
+            return panel_records
+        changes = root.person_panel_changes.readWhere('pid == %i'%pid)
+        removed = root.person_panel_removed.readWhere('pid == %i'%pid)
+    finally:
+        f.close()
+    fields = [field for field, dtype in PERSON_RECORD_DTYPE]
+    trajectory = []
+    # record is the person's record in the previous snapshot (or None if the 
+    # person was not in the previous snapshot).
+    record = None
+    for timestep, delta, years_elapsed in snapshots.tolist():
+        if not delta:
+            record = None
+        elif record is not None:
+            record = record.copy()
+            record['age'] += years_elapsed
+            if np.any(removed['timestep'] == timestep):
+                record = None
+            else:
+                for change in changes[changes['timestep'] == timestep]:
+                    record[fields[change['field']]] = change['value']
+        new_record = panel_records[panel_records['timestep'] == timestep]
+        if len(new_record) > 0:
+            record = new_record
+        if record is not None:
+            record['timestep'] = timestep
+            trajectory.append(record)
+    if len(trajectory) == 0:
+        return np.zeros(0, dtype=PERSON_PANEL_DTYPE)
+    return np.concatenate(trajectory)
+
+def write_person_panel_csv(hdf_filename, output_folder):
+    """
+    Writes each snapshot in the person panel of a results file to a separate 
+    CSV file (psns_time_<timestep>.csv) in output_folder, in the format read 
+    by the R scripts. Returns the list of files written.
+    """
+    f = tables.openFile(hdf_filename, mode="r")
+    fields = [field for field, dtype in PERSON_RECORD_DTYPE]
+    csv_files = []
+    for timestep, records in _iter_person_snapshots(f):
+        csv_file = os.path.join(output_folder, "psns_time_%s.csv"%timestep)
+        out_file = open(csv_file, "wb")
+        csv_writer = csv.writer(out_file)
+        csv_writer.writerow(fields)
+        _write_person_records(csv_writer, records, fields)
+        out_file.close()
+        csv_files.append(csv_file)
+    f.close()
+    return csv_files
@@ -39,7 +39,6 @@ import shutil
 from pkg_resources import resource_filename
 
 import numpy as np
-import tables
 
 logger = logging.getLogger(__name__)
 root_logger = logging.getLogger()
@@ -105,6 +104,9 @@ def main():
 
     from chitwanabm.initialize import generate_world
     from chitwanabm.modelloop import main_loop
+    from chitwanabm.results import ResultsWriter, read_results_h5, \
+            write_nbh_results_csv, write_person_events_csv, \
+            write_person_panel_csv, person_events
 
     from pyabm.file_io import write_single_band_raster
     from pyabm.utility import save_git_diff
@@ -150,37 +152,6 @@ def main():
             logger.critical("Could not create results directory %s"%results_path)
             return 1
         
-    # Setup a special logger to log demographic events while the model is 
-    # running (births, migrations, deaths, marriages, etc.)
-    person_event_log_file_path = os.path.join(results_path, "person_events.log")
-    person_event_log_file = open(person_event_log_file_path, mode='w')
-    person_event_log_header = ",".join(["time", "event",
-                                        "pid", "hid", "nid", "rid", "gender", "age", 
-                                        "ethnicity", "mother_id", "father_id", 
-                                        "spouseid", "marrtime", "schooling", 
-                                        "num_children", "alive", "is_away", 
-                                        "is_initial_agent", "is_in_migrant",
-                                        "mother_num_children",
-                                        "mother_years_schooling", 
-                                        "mother_work", 
-                                        "father_years_schooling","father_work", 
-                                        "parents_contracep"])
-    person_event_log_file.write(person_event_log_header + '\n')
-    person_event_log_file.close()
-    person_event_fh = logging.FileHandler(os.path.join(results_path, "person_events.log"), mode='a')
-    person_event_fh.setLevel(logging.INFO)
-    person_event_fh.setFormatter(logging.Formatter('%(modeltime)s,%(message)s,%(personinfo)s'))
-
-    # Setup a filter so the agent event log will contain only agent events.
-    class PassEventFilter(logging.Filter):
-        def filter(self, record):
-            logger_name = getattr(record, 'name', None)
-            return 'person_events' in logger_name
-    person_event_fh.addFilter(PassEventFilter())
-
-    person_event_logger = logging.getLogger('person_events')
-    person_event_logger.addHandler(person_event_fh)
-
     # Now that we know the rcParams and log file path, write the temp_log 
     # stream to the log file in the proper output directory, and direct all 
     # further logging to append to that file.
@@ -194,13 +165,6 @@ def main():
     new_fh.setLevel(fh_level)
     new_fh.setFormatter(log_file_formatter)
     root_logger.addHandler(new_fh)
-    # Dont' log agent event records to the main or console loggers
-    class DontPassEventFilter(logging.Filter):
-        def filter(self, record):
-            logger_name = getattr(record, 'name', None)
-            return 'person_events' not in logger_name
-    for handler in root_logger.handlers:
-        handler.addFilter(DontPassEventFilter())
 
     if args.tail:
         try:
@@ -219,7 +183,7 @@ def main():
     # else:
     #     # Load a pickled World for use in the model.
     #     input_data_file = rcParams['path.input_data_file']
-    #     file = open(input_data_file, "r")
+    #     file = open(input_data_file, "rb")
     #     try:
     #         world = pickle.load(file)
     #     except IOError:
@@ -235,25 +199,36 @@ def main():
     # Run the model loop
     start_time = time.localtime()
     logger.info('Beginning model run %s'%run_ID_number)
-    run_results, time_strings, run_results_new_format = main_loop(world, results_path) # This line actually runs the model.
+    # The results are written to the results file as the model runs. The 
+    # file is closed even if the run fails, so that the results up to the 
+    # failure can be read.
+    results_h5_file = os.path.join(results_path, "results.h5")
+    results_writer = ResultsWriter(results_h5_file, run_ID_number)
+    # Record demographic events (births, migrations, deaths, marriages, etc.) 
+    # while the model is running.
+    person_events.open(results_writer)
+    try:
+        time_strings = main_loop(world, results_path, results_writer) # This line actually runs the model.
+    finally:
+        person_events.close()
+        results_writer.close()
     end_time = time.localtime()
     logger.info('Finished model run number %s'%run_ID_number)
     
+    run_results = read_results_h5(results_h5_file, ['timesteps', 'nbh', 'psn'])
     # Save the results to a pickled file
     if rcParams['save_pickled_end_results']:
         logger.info("Saving results")
         pop_data_file = os.path.join(results_path, "run_results.P")
-        output = open(pop_data_file, 'w')
-        pickle.dump(run_results, output)
+        output = open(pop_data_file, 'wb')
+        pickle.dump(run_results, output, pickle.HIGHEST_PROTOCOL)
         output.close()
     # Save the results to a CSV
-    run_results = reformat_run_results(run_results)
     run_results_csv_file = os.path.join(results_path, "run_results.csv")
-    write_results_csv(run_results, run_results_csv_file, "neighid")
-
-    run_results_new_format_h5_file = os.path.join(results_path, "results.h5")
-    results_to_h5(run_results_new_format, run_results_new_format_h5_file, run_ID_number)
-    results_to_csv(run_results_new_format, results_path)
+    write_nbh_results_csv(run_results['nbh'], run_results_csv_file, "neighid")
+    results_to_csv(run_results, results_path)
+    person_events_csv_file = os.path.join(results_path, "person_events.log")
+    write_person_events_csv(results_h5_file, person_events_csv_file)
 
     # Write neighborhood LULC, pop, x, y coordinates, etc. for the last 
     # timestep.
@@ -298,6 +273,9 @@ def main():
                 logger.exception("Problem running plot_LULC_trends.R. R output: %s"%e.output)
 
         if rcParams['save_psn_data']:
+            # The plotting script reads the person data from CSV, so export 
+            # the person panel to CSV first.
+            write_person_panel_csv(results_h5_file, results_path)
             logger.info("Plotting persons results")
             plot_psns_script = resource_filename(__name__, 
                     'R/plot_psns_data.R')
@@ -337,26 +315,6 @@ def main():
 
     return 0
 
-def reformat_run_results(run_results):
-    """
-    For convenience and speed while running the model, the population results 
-    are stored in a dictionary keyed as [timestep][variable][neighborhoodid] = 
-    value. The write_results_csv function (written to export them in a 
-    conveient format for input into R) needs them to be keyed as 
-    [timestep][neighborhoodid][variable] = value. This function will reformat 
-    the run_results to make them compatible with the write_results_csv 
-    function.
-    """
-    run_results_fixed = {}
-    for timestep in run_results.keys():
-        run_results_fixed[timestep] = {}
-        for variable in run_results[timestep].keys():
-            for ID in run_results[timestep][variable]:
-                if not ID in run_results_fixed[timestep]:
-                    run_results_fixed[timestep][ID] = {}
-                run_results_fixed[timestep][ID][variable] = run_results[timestep][variable][ID]
-    return run_results_fixed
-
 def write_time_csv(time_strings, time_csv_file):
     """
     Write a CSV file for conversion of timestep number, float, etc. to actual 
@@ -378,62 +336,6 @@ def write_time_csv(time_strings, time_csv_file):
     csv_writer.writerows(columns)
     out_file.close()
 
-#TODO: this function is deprecated and should be removed when the new record 
-# array data storage is completed.
-def write_results_csv(results, csv_file, ID_col_name):
-    "Write to CSV the saved model run data."
-    # The data is stored in a dictionary keyed by timestep, then keyed by ID, 
-    # then keyed by category. Write it to CSV where each row represents a 
-    # single agent (neighborhood, person, etc.), and each col a single variable 
-    # (from a single timestep).
-    timesteps = sorted(results.keys())
- 
-    # The IDs will uniquely identify each row of the final matrix.
-    IDs = []
-    for timestep in timesteps:
-        IDs.extend(results[timestep].keys())
-    IDs = sorted(np.unique(IDs))
-
-    # Now figure out the categories to use them as row_headers
-    categories = []
-    for timestep in timesteps:
-        for ID in results[timestep].keys():
-            categories.extend(results[timestep][ID].keys())
-    categories = sorted(np.unique(categories))
-
-    # The dataframe will end up (in R) having 1 column for agent ID, and 
-    # timesteps * categories additional columns for the data.
-    out_file = open(csv_file, "wb")
-    csv_writer = csv.writer(out_file)
-    var_names = [ID_col_name]
-    for category in categories:
-        for timestep in timesteps:
-            var_name = category + "." + str(timestep)
-            var_names.append(var_name)
-    csv_writer.writerow(var_names)
-
-    for ID in IDs:
-        row = [ID]
-        for category in categories:
-            for timestep in timesteps:
-                if ID in results[timestep]:
-                    if category in results[timestep][ID]:
-                        row.append(results[timestep][ID][category])
-                    else:
-                        row.append(0)
-        csv_writer.writerow(row)
-    out_file.close()
-
-def results_to_h5(results, hdf_filename, run_ID_number):
-    "Saves a dictionary of numpy structured arrays to HDF5 using pytables"
-    filters = tables.Filters(complevel=5, complib='zlib')
-    f = tables.openFile(hdf_filename, mode="w", title='ChitwanABM')
-    for key in results:
-        f.createTable('/', key, results[key], filters=filters)
-    f.createArray('/', 'run_ID', np.array(run_ID_number))
-    f.close()
-    return 1
-
 def results_to_csv(results, output_folder):
     "Saves numpy structured arrays from dictionary to gzipped CSV files"
     for key in results:
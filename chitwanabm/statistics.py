@@ -40,10 +40,13 @@ rcParams = rc_params.get_params()
 
 from pyabm import boolean_choice
 from pyabm.statistics import convert_probability_units, get_probability_index, \
-        draw_from_prob_dist, calc_prob_from_prob_dist, UnitsError, \
-        StatisticsError
+        UnitsError, StatisticsError
+
+from chitwanabm.agent_tables import SEX_CODES, ETHNICITY_CODES, \
+        FOREST_TYPE_CODES, CVFS_ETHNICITY_CODES
 
 prob_time_units = rcParams['probability.time_units']
+log_stats_probabilities = rcParams['log_stats_probabilities']
 
 #TODO: these probabilities should be derived from the region, not directly from rcParams
 death_probabilities_male = convert_probability_units(rcParams['probability.death.male'], prob_time_units)
@@ -53,75 +56,368 @@ marriage_probabilities_female = convert_probability_units(rcParams['probability.
 migration_probabilities_male = convert_probability_units(rcParams['probability.migration.male'], prob_time_units)
 migration_probabilities_female = convert_probability_units(rcParams['probability.migration.female'], prob_time_units)
 
-def calc_first_birth_prob_zvoleff(person, time):
+def calc_hazard_table(probabilities_male, probabilities_female):
+    """
+    Converts a pair of sex-specific probability dictionaries (keyed by age in 
+    prob_time_units) into a lookup table of probabilities indexed by sex code 
+    (see agent_tables.SEX_CODES) and age in months, so that the probabilities 
+    for a whole population can be found with a single array indexing 
+    operation. Ages for which no probability is specified are set to NaN, and 
+    lookup_hazard_table raises an error if they are looked up.
+    """
+    max_index = max(max(probabilities_male.keys()), max(probabilities_female.keys()))
+    num_months = 0
+    while get_probability_index(num_months, prob_time_units) <= max_index:
+        num_months += 1
+    hazard_table = np.empty((len(SEX_CODES), num_months))
+    for sex, probabilities in [('male', probabilities_male),
+                               ('female', probabilities_female)]:
+        for agemonths in xrange(num_months):
+            probability_index = get_probability_index(agemonths, prob_time_units)
+            hazard_table[SEX_CODES[sex], agemonths] = probabilities.get(probability_index, np.nan)
+    return hazard_table
+
+def lookup_hazard_table(hazard_table, agemonths, sex, description):
+    """
+    Looks up the probabilities for arrays of ages (in months) and sex codes in 
+    a hazard table made by calc_hazard_table. Raises an error if an age is 
+    past the end of the table, if a sex code is undefined, or if no 
+    probability is specified for an age.
+    """
+    agemonths = np.asarray(agemonths).astype(int)
+    sex = np.asarray(sex)
+    if len(agemonths) == 0:
+        return np.empty(0)
+    if agemonths.max() >= hazard_table.shape[1]:
+        probability_index = get_probability_index(agemonths.max(), prob_time_units)
+        raise IndexError("error calculating %s probability (index %s)"%(description, probability_index))
+    if not np.all(np.in1d(sex, SEX_CODES.values())):
+        raise StatisticsError("error calculating %s probability (undefined sex code)"%description)
+    probs = hazard_table[sex, agemonths]
+    if np.any(np.isnan(probs)):
+        missing_ages = agemonths[np.isnan(probs)]
+        probability_index = get_probability_index(missing_ages[0], prob_time_units)
+        raise StatisticsError("error calculating %s probability (no probability specified for index %s)"%(description, probability_index))
+    return probs
+
+death_hazard_table = calc_hazard_table(death_probabilities_male, death_probabilities_female)
+migration_hazard_table = calc_hazard_table(migration_probabilities_male, migration_probabilities_female)
+marriage_hazard_table = calc_hazard_table(marriage_probabilities_male, marriage_probabilities_female)
+
+class AliasSampler(object):
+    """
+    Draws random numbers from an empirical probability distribution, specified 
+    (as for pyabm.statistics.draw_from_prob_dist) as a tuple of bin limits and 
+    the probability of each bin:
+        ((a, b, c, d), (p1, p2, p3))
+    A bin is chosen according to the bin probabilities using Walker's alias 
+    method, and the number is then drawn uniformly from within the bin. The 
+    alias table is built once, so each draw takes constant time regardless of 
+    the number of bins, and any number of values can be drawn in a single 
+    call.
+    """
+    def __init__(self, prob_dist):
+        binlims, probs = prob_dist
+        self._binlims = np.array(binlims, dtype=float)
+        probs = np.array(probs, dtype=float)
+        if len(self._binlims) != len(probs) + 1:
+            raise StatisticsError("Probability distribution has %s bin limits and %s probabilities"%(len(self._binlims), len(probs)))
+        num_bins = len(probs)
+        # Scale the probabilities so that the mean bin probability is one, 
+        # then pair each bin whose probability is less than one with an alias 
+        # bin that makes up the difference.
+        scaled = probs * num_bins / np.sum(probs)
+        self._accept = np.ones(num_bins)
+        self._alias = np.arange(num_bins)
+        small = [n for n in xrange(num_bins) if scaled[n] < 1]
+        large = [n for n in xrange(num_bins) if scaled[n] >= 1]
+        while small and large:
+            n_small = small.pop()
+            n_large = large.pop()
+            self._accept[n_small] = scaled[n_small]
+            self._alias[n_small] = n_large
+            scaled[n_large] = scaled[n_large] + scaled[n_small] - 1
+            if scaled[n_large] < 1:
+                small.append(n_large)
+            else:
+                large.append(n_large)
+        # Any bins left over (due to rounding error) keep an acceptance 
+        # probability of one.
+
+    def draw_bins(self, size=None):
+        """
+        Draws the index of a bin (or an array of size bin indices if size is 
+        given).
+        """
+        if size is None:
+            n = np.random.randint(0, len(self._accept))
+            if np.random.random_sample() < self._accept[n]:
+                return n
+            return self._alias[n]
+        n = np.random.randint(0, len(self._accept), size)
+        return np.where(np.random.random_sample(size) < self._accept[n], n, 
+                self._alias[n])
+
+    def draw(self, size=None):
+        """
+        Draws a number from the distribution (or an array of size numbers if 
+        size is given).
+        """
+        bins = self.draw_bins(size)
+        lower = self._binlims[bins]
+        return lower + np.random.random_sample(size) * \
+                (self._binlims[bins + 1] - lower)
+
+_samplers = {}
+
+def get_sampler(param):
+    """
+    Returns the AliasSampler for the probability distribution stored in 
+    rcParams under the name param. Samplers are built the first time they are 
+    requested, and reused after that.
+    """
+    try:
+        return _samplers[param]
+    except KeyError:
+        sampler = AliasSampler(rcParams[param])
+        _samplers[param] = sampler
+        return sampler
+
+# Build the samplers for the distributions used by the model when this module 
+# is loaded, so that any invalid distributions are found at the start of a 
+# model run.
+for param in ['prob.birth.intervals', 'prob.firstbirth.times', 
+        'prob.num.children.desired', 'prob.migration.lengths', 
+        'inmigrant_HH.prob.ethnicity', 'inmigrant_HH.prob.hh_size', 
+        'inmigrant_HH.prob.num_HHs', 'TLU_probs.farmer', 'TLU_probs.nonfarmer', 
+        'total_possessions_probs', 'spousechoice.male.agediff', 
+        'lulc.area.hh']:
+    get_sampler(param)
+
+def calc_ethnicity_coefficients(param_prefix, reference="HighHindu"):
+    """
+    Returns an array of the regression coefficients for each ethnicity, indexed 
+    by ethnicity code (see agent_tables.ETHNICITY_CODES), where the coefficient 
+    for each ethnicity is stored in rcParams as param_prefix + ethnicity. The 
+    coefficient for the reference level is zero.
+    """
+    coefficients = np.zeros(len(ETHNICITY_CODES))
+    for ethnicity, code in ETHNICITY_CODES.items():
+        if ethnicity == reference:
+            continue
+        coefficients[code] = rcParams[param_prefix + ethnicity]
+    return coefficients
+
+def check_ethnicity_codes(ethnicity):
+    """
+    Raises a StatisticsError if any of an array of ethnicity codes is not 
+    defined (for example -1, the code used for a missing ethnicity), as 
+    indexing an array of ethnicity coefficients with an undefined code would 
+    otherwise silently pick the coefficient of another ethnicity.
+    """
+    ethnicity = np.asarray(ethnicity)
+    unknown = ~np.in1d(ethnicity, ETHNICITY_CODES.values())
+    if np.any(unknown):
+        raise StatisticsError("No coefficient was specified for ethnicity code '%s'"%ethnicity[unknown][0])
+
+class CoefficientBundle(object):
+    """
+    The coefficients of one of the regression models parameterized in rcParams 
+    (all the rcParams whose names start with prefix, such as 
+    'marrtime.zv.coef.'), compiled into plain Python floats and numpy arrays 
+    when this module is loaded, so that the hazard functions do not need to 
+    look up each of their coefficients in rcParams every time they are called.
+
+    Individual coefficients are accessed by name (without the prefix), for 
+    example coefficients['age']. The designs argument is a dictionary of named 
+    design matrix specifications, each a list of the terms making up one part 
+    of the linear predictor, so that that part can be calculated for many 
+    agents at once with linear_predictor. The factors argument is a dictionary 
+    of categorical variables, each a list of the terms for each level of the 
+    variable (with None for the reference level), so that the coefficients for 
+    many agents can be found with a single array indexing operation. If 
+    ethnicity_prefix is given, the ethnicity coefficients are stored in the 
+    ethnicity attribute (see calc_ethnicity_coefficients).
+    """
+    def __init__(self, prefix, designs={}, factors={}, ethnicity_prefix=None):
+        self.prefix = prefix
+        self._coefficients = {}
+        for key in rcParams.keys():
+            if key.startswith(prefix):
+                value = rcParams[key]
+                if isinstance(value, (int, float)):
+                    value = float(value)
+                self._coefficients[key[len(prefix):]] = value
+        self._designs = {}
+        for name, terms in designs.items():
+            self._designs[name] = (tuple(terms), 
+                    np.array([self[term] for term in terms], dtype=float))
+        self._factors = {}
+        for name, terms in factors.items():
+            self._factors[name] = np.array([0. if term == None else self[term] \
+                    for term in terms], dtype=float)
+        if ethnicity_prefix != None:
+            self.ethnicity = calc_ethnicity_coefficients(prefix + ethnicity_prefix)
+        else:
+            self.ethnicity = None
+
+    def __getitem__(self, term):
+        try:
+            return self._coefficients[term]
+        except KeyError:
+            raise StatisticsError("No coefficient was specified for '%s%s'"%(self.prefix, term))
+
+    def get_terms(self, design):
+        "Returns the terms (in order) of the given design."
+        return self._designs[design][0]
+
+    def factor(self, name):
+        """
+        Returns an array of the coefficients for each level of the given 
+        factor (zero for the reference level).
+        """
+        return self._factors[name]
+
+    def linear_predictor(self, design, *columns):
+        """
+        Calculates the part of the linear predictor given by the terms of the 
+        given design. Takes one array (one element per agent) for each term of 
+        the design, in the order given by get_terms.
+        """
+        terms, coefficients = self._designs[design]
+        if len(columns) != len(terms):
+            raise StatisticsError("Design '%s' has %s terms (%s columns given)"%(design, len(terms), len(columns)))
+        return np.dot(np.column_stack(columns), coefficients)
+
+marriage_coefficients = CoefficientBundle('marrtime.zv.coef.',
+        designs={'person': ['genderfemale', 'age', 'I(age^2)', 
+                            'schooling_yrs', 'in_school'],
+                 'neighborhood': ['interp_logpercagveg', 'SCHLFT', 'HLTHFT', 
+                                  'BUSFT', 'MARFT', 'EMPFT']},
+        # Indexed by month number - 1
+        factors={'month': [None] + ['month%s'%n for n in xrange(2, 13)]},
+        ethnicity_prefix='ethnic')
+
+first_birth_coefficients = CoefficientBundle('firstbirth.zv.coef.',
+        designs={'neighborhood': ['total_t1', 'percagveg_t1', 'dist_nara', 
+                                  'elec_avail', 'avg_yrs_services_lt15']},
+        ethnicity_prefix='ethnic')
+
+LD_migration_coefficients = CoefficientBundle('migration.ld.zv.coef.',
+        designs={'person': ['in_school', 'years_schooling', 'own_farmland', 
+                            'log_market_min_ft', 'female']},
+        # The age bands are [15, 24], (24, 34], (34, 44] and (44, 55], with 
+        # ages of over 55 (and under 15) as the reference class.
+        factors={'age_band': ['age15-24', 'age24-34', 'age34-44', 'age45-55', 
+                              None]},
+        ethnicity_prefix='ethnic')
+
+LL_migration_coefficients = CoefficientBundle('migration.ll.zv.coef.',
+        designs={'person': ['genderfemale', 'agedecades', 'I(agedecades^2)'],
+                 'neighborhood': ['mean_Sinteg_500m_24mth_2002_div_1000', 
+                                  'mean_Sinteg_500m_24mth_chg_2002_div_1000', 
+                                  'NEAR_R_EVD_reversed', 'SCHLFT_2001', 
+                                  'MARFT_2001', 'EMPFT_2001', 'num_groups_2001'],
+                 'household': ['own_total_2001', 'any_farming_2001TRUE', 
+                               'TLU_livestock_2001']},
+        # Indexed by month number - 1: January to April is the reference 
+        # class, then the monsoon (May to August) and winter (September to 
+        # December) seasons.
+        factors={'season': [None]*4 + ['SeasonMonsoon (MJJA)']*4 + 
+                           ['SeasonWinter (SOND)']*4},
+        ethnicity_prefix='ethnic')
+
+fw_usageprob_coefficients = CoefficientBundle('fw_usageprob.coef.',
+        designs={'household': ['hhsize', 'meangender', 'elecavail', 
+                               'distnara_km', 'closest_typeCNP']},
+        ethnicity_prefix='ethnic')
+
+fw_demand_simple_coefficients = CoefficientBundle('fw_demand.simple.coef.')
+fw_demand_simple_residsd = np.sqrt(rcParams['fw_demand.simple.residvariance'])
+fw_demand_migfeedback_coefficients = CoefficientBundle('fw_demand.migfeedback.coef.')
+fw_demand_migfeedback_residsd = np.sqrt(rcParams['fw_demand.migfeedback.residvariance'])
+
+education_coefficients = CoefficientBundle('education.coef.',
+        ethnicity_prefix='ethnic=')
+
+def calc_first_birth_neighborhood_term_zvoleff(land_total, land_agveg, 
+        distnara, elec_available, avg_yrs_services_lt15):
+    """
+    Calculates the neighborhood-level (adult community context) part of the 
+    linear predictor of the first birth model used in 
+    calc_first_birth_prob_zvoleff. Takes arrays (one element per neighborhood) 
+    of the neighborhood covariates.
+    """
+    coefficients = first_birth_coefficients
+    # Convert nbh_area from square meters to square kilometers
+    nbh_area = land_total / 1000000
+    percent_agveg = (land_agveg / land_total) * 100
+    return coefficients.linear_predictor('neighborhood', nbh_area, 
+            percent_agveg, distnara, elec_available, avg_yrs_services_lt15)
+
+def calc_first_birth_prob_zvoleff(person, time, neighborhood_term=None):
     """
     Calculates the probability of a first birth in a given month for an agent, 
     using the results of Zvoleff's empirical analysis, following the analysis 
-    of Ghimire and Axinn (2010).
+    of Ghimire and Axinn (2010). neighborhood_term is the neighborhood-level 
+    part of the linear predictor for the person's neighborhood (from 
+    calc_first_birth_neighborhood_term_zvoleff). If it is not given, it is 
+    calculated from the person's neighborhood.
     """
+    coefficients = first_birth_coefficients
     #########################################################################
     # Intercept
-    inner = rcParams['firstbirth.zv.coef.(Intercept)']
+    inner = coefficients['(Intercept)']
 
     #########################################################################
     # Adult community context
-    neighborhood = person.get_parent_agent().get_parent_agent()
-    # Convert nbh_area from square meters to square kilometers
-    nbh_area = neighborhood._land_total / 1000000
-    inner += rcParams['firstbirth.zv.coef.total_t1'] * nbh_area
-    percent_agveg = (neighborhood._land_agveg / neighborhood._land_total) * 100
-    inner += rcParams['firstbirth.zv.coef.percagveg_t1'] * percent_agveg
-    inner += rcParams['firstbirth.zv.coef.dist_nara'] * neighborhood._distnara
-    inner += rcParams['firstbirth.zv.coef.elec_avail'] * neighborhood._elec_available
-    inner += rcParams['firstbirth.zv.coef.avg_yrs_services_lt15'] * neighborhood._avg_yrs_services_lt15
+    if neighborhood_term == None:
+        neighborhood = person.get_parent_agent().get_parent_agent()
+        neighborhood_term = calc_first_birth_neighborhood_term_zvoleff(
+                np.array([neighborhood._land_total]), 
+                np.array([neighborhood._land_agveg]), 
+                np.array([neighborhood._distnara]), 
+                np.array([neighborhood._elec_available]), 
+                np.array([neighborhood._avg_yrs_services_lt15]))[0]
+    inner += neighborhood_term
 
     #########################################################################
     # Parents characteristics
-    inner += rcParams['firstbirth.zv.coef.mother_num_children'] * person.get_mother_num_children()
+    inner += coefficients['mother_num_children'] * person.get_mother_num_children()
     if person.get_mother_years_schooling() > 1:
-        inner += rcParams['firstbirth.zv.coef.mother_school']
-    inner += rcParams['firstbirth.zv.coef.mother_work'] * person.get_mother_work()
+        inner += coefficients['mother_school']
+    inner += coefficients['mother_work'] * person.get_mother_work()
     if person.get_father_years_schooling() > 1:
-        inner += rcParams['firstbirth.zv.coef.father_school']
-    inner += rcParams['firstbirth.zv.coef.father_work'] * person.get_father_work()
-    inner += rcParams['firstbirth.zv.coef.parents_contracep_ever'] * person._parents_contracep_ever
+        inner += coefficients['father_school']
+    inner += coefficients['father_work'] * person.get_father_work()
+    inner += coefficients['parents_contracep_ever'] * person._parents_contracep_ever
 
     #########################################################################
     # Other personal controls
     ethnicity = person.get_ethnicity()
     assert ethnicity!=None, "Ethnicity must be defined"
-    if ethnicity == "HighHindu":
-        # This was the reference level
-        pass
-    elif ethnicity == "HillTibeto":
-        inner += rcParams['firstbirth.zv.coef.ethnicHillTibeto']
-    elif ethnicity == "LowHindu":
-        inner += rcParams['firstbirth.zv.coef.ethnicLowHindu']
-    elif ethnicity == "Newar":
-        inner += rcParams['firstbirth.zv.coef.ethnicNewar']
-    elif ethnicity == "TeraiTibeto":
-        inner += rcParams['firstbirth.zv.coef.ethnicTeraiTibeto']
-
-    inner += rcParams['firstbirth.zv.coef.age_at_first_marr'] * person.get_marriage_age_years(time)
-    #inner += rcParams['firstbirth.zv.coef.mths_marr_pre_1997']
+    inner += coefficients.ethnicity[ethnicity]
+
+    inner += coefficients['age_at_first_marr'] * person.get_marriage_age_years(time)
+    #inner += coefficients['mths_marr_pre_1997']
  
     #########################################################################
     # Hazard duration
     marriage_time = time - person._marriage_time
     if marriage_time <= 6:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[0,6)']
+        inner += coefficients['marr_duration[0,6)']
     elif marriage_time <= 12:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[6,12)']
+        inner += coefficients['marr_duration[6,12)']
     elif marriage_time <= 18:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[12,18)']
+        inner += coefficients['marr_duration[12,18)']
     elif marriage_time <= 24:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[18,24)']
+        inner += coefficients['marr_duration[18,24)']
     elif marriage_time <= 30:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[24,30)']
+        inner += coefficients['marr_duration[24,30)']
     elif marriage_time <= 36:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[30,36)']
+        inner += coefficients['marr_duration[30,36)']
     elif marriage_time > 36:
-        inner += rcParams['firstbirth.zv.coef.marr_duration[36,42)']
+        inner += coefficients['marr_duration[36,42)']
 
     #########################################################################
     # Education level of individual
@@ -130,14 +426,14 @@ def calc_first_birth_prob_zvoleff(person, time):
         # This was the reference level
         pass
     elif person._schooling < 8:
-        inner += rcParams['firstbirth.zv.coef.schooling_yrs_cat[4,7)']
+        inner += coefficients['schooling_yrs_cat[4,7)']
     elif person._schooling < 11:
-        inner += rcParams['firstbirth.zv.coef.schooling_yrs_cat[7,11)']
+        inner += coefficients['schooling_yrs_cat[7,11)']
     elif person._schooling >= 11:
-        inner += rcParams['firstbirth.zv.coef.schooling_yrs_cat[11,99)']
+        inner += coefficients['schooling_yrs_cat[11,99)']
 
     prob = 1./(1 + np.exp(-inner))
-    if rcParams['log_stats_probabilities']:
+    if log_stats_probabilities:
         logger.debug("Person %s first birth probability %.6f (marriage_time: %s)"%(person.get_ID(), prob,  person._marriage_time))
     return prob
 
@@ -147,80 +443,95 @@ def calc_probability_marriage_zvoleff(person, time):
     Alex Zvoleff's empirical analysis of the CVFS data, following the results 
     of the analysis conducted by Yabiku (2006).
     """
-    inner = rcParams['marrtime.zv.coef.(Intercept)']
+    coefficients = marriage_coefficients
+    inner = coefficients['(Intercept)']
 
     ethnicity = person.get_ethnicity()
     assert ethnicity!=None, "Ethnicity must be defined"
-    if ethnicity == "HighHindu":
-        # This was the reference level
-        pass
-    elif ethnicity == "HillTibeto":
-        inner += rcParams['marrtime.zv.coef.ethnicHillTibeto']
-    elif ethnicity == "LowHindu":
-        inner += rcParams['marrtime.zv.coef.ethnicLowHindu']
-    elif ethnicity == "Newar":
-        inner += rcParams['marrtime.zv.coef.ethnicNewar']
-    elif ethnicity == "TeraiTibeto":
-        inner += rcParams['marrtime.zv.coef.ethnicTeraiTibeto']
+    inner += coefficients.ethnicity[ethnicity]
 
     # Gender
-    if person.get_sex() == "female":
-        inner += rcParams['marrtime.zv.coef.genderfemale']
+    if person.get_sex() == SEX_CODES['female']:
+        inner += coefficients['genderfemale']
 
     age = person.get_age_years()
-    inner += rcParams['marrtime.zv.coef.age'] * age
-    inner += rcParams['marrtime.zv.coef.I(age^2)'] * (age ** 2)
+    inner += coefficients['age'] * age
+    inner += coefficients['I(age^2)'] * (age ** 2)
 
     # Neighborhood characteristics
     neighborhood = person.get_parent_agent().get_parent_agent()
     log_percent_agveg = np.log((neighborhood._land_agveg / neighborhood._land_total)*100 + 1)
-    inner += rcParams['marrtime.zv.coef.interp_logpercagveg'] * log_percent_agveg
+    inner += coefficients['interp_logpercagveg'] * log_percent_agveg
 
-    inner += rcParams['marrtime.zv.coef.SCHLFT'] * neighborhood.NFOs['school_min_ft']
-    inner += rcParams['marrtime.zv.coef.HLTHFT'] * neighborhood.NFOs['health_min_ft']
-    inner += rcParams['marrtime.zv.coef.BUSFT'] * neighborhood.NFOs['bus_min_ft']
-    inner += rcParams['marrtime.zv.coef.MARFT'] * neighborhood.NFOs['market_min_ft']
-    inner += rcParams['marrtime.zv.coef.EMPFT'] * neighborhood.NFOs['employer_min_ft']
+    inner += coefficients['SCHLFT'] * neighborhood.NFOs['school_min_ft']
+    inner += coefficients['HLTHFT'] * neighborhood.NFOs['health_min_ft']
+    inner += coefficients['BUSFT'] * neighborhood.NFOs['bus_min_ft']
+    inner += coefficients['MARFT'] * neighborhood.NFOs['market_min_ft']
+    inner += coefficients['EMPFT'] * neighborhood.NFOs['employer_min_ft']
 
     # Schooling
-    inner += rcParams['marrtime.zv.coef.schooling_yrs'] * person.get_years_schooling()
+    inner += coefficients['schooling_yrs'] * person.get_years_schooling()
     if person.is_in_school():
-        inner += rcParams['marrtime.zv.coef.in_school']
+        inner += coefficients['in_school']
 
     # Account for monthly differences in marriage rates - some days (and 
     # months) are more auspicious for marriage than others.
     month_num = int(np.mod(np.round(time*12, 0), 12) + 1)
-    if month_num == 1:
-        # This was the reference level
-        pass
-    elif month_num == 2:
-        inner += rcParams['marrtime.zv.coef.month2']
-    elif month_num == 3:
-        inner += rcParams['marrtime.zv.coef.month3']
-    elif month_num == 4:
-        inner += rcParams['marrtime.zv.coef.month4']
-    elif month_num == 5:
-        inner += rcParams['marrtime.zv.coef.month5']
-    elif month_num == 6:
-        inner += rcParams['marrtime.zv.coef.month6']
-    elif month_num == 7:
-        inner += rcParams['marrtime.zv.coef.month7']
-    elif month_num == 8:
-        inner += rcParams['marrtime.zv.coef.month8']
-    elif month_num == 9:
-        inner += rcParams['marrtime.zv.coef.month9']
-    elif month_num == 10:
-        inner += rcParams['marrtime.zv.coef.month10']
-    elif month_num == 11:
-        inner += rcParams['marrtime.zv.coef.month11']
-    elif month_num == 12:
-        inner += rcParams['marrtime.zv.coef.month12']
+    inner += coefficients.factor('month')[month_num - 1]
     
     prob = 1./(1 + np.exp(-inner))
-    if rcParams['log_stats_probabilities']:
+    if log_stats_probabilities:
         logger.debug("Person %s marriage probability %.6f (age: %s)"%(person.get_ID(), prob, person.get_age_years()))
     return prob
 
+def calc_marriage_neighborhood_term_zvoleff(land_agveg, land_total, 
+        school_min_ft, health_min_ft, bus_min_ft, market_min_ft, 
+        employer_min_ft):
+    """
+    Calculates the neighborhood-level part of the linear predictor of the 
+    marriage model used in calc_probability_marriage_zvoleff. Takes arrays (one 
+    element per neighborhood) of the neighborhood covariates. As these do not 
+    vary between persons, this only needs to be calculated once per timestep.
+    """
+    coefficients = marriage_coefficients
+    log_percent_agveg = np.log((land_agveg / land_total)*100 + 1)
+    return coefficients.linear_predictor('neighborhood', log_percent_agveg, 
+            school_min_ft, health_min_ft, bus_min_ft, market_min_ft, 
+            employer_min_ft)
+
+def calc_marriage_month_term_zvoleff(time):
+    """
+    Returns the month effect in the marriage model used in 
+    calc_probability_marriage_zvoleff. Some days (and months) are more 
+    auspicious for marriage than others.
+    """
+    coefficients = marriage_coefficients
+    month_num = int(np.mod(np.round(time*12, 0), 12) + 1)
+    return coefficients.factor('month')[month_num - 1]
+
+def calc_probability_marriage_zvoleff_vector(agemonths, sex, ethnicity, 
+        schooling, in_school, neighborhood_term, time):
+    """
+    Vectorized version of calc_probability_marriage_zvoleff. Takes arrays (one 
+    element per person) of age in months, sex code, ethnicity code, years of 
+    schooling, in school status (boolean), and of the neighborhood term of the 
+    linear predictor (from calc_marriage_neighborhood_term_zvoleff) for the 
+    neighborhood of each person. Returns an array of marriage probabilities.
+    """
+    coefficients = marriage_coefficients
+    inner = coefficients['(Intercept)'] + neighborhood_term + \
+            calc_marriage_month_term_zvoleff(time)
+    check_ethnicity_codes(ethnicity)
+    inner += coefficients.ethnicity[ethnicity]
+    age = agemonths / 12.
+    inner += coefficients.linear_predictor('person', 
+            sex == SEX_CODES['female'], age, age ** 2, schooling, in_school)
+
+    prob = 1./(1 + np.exp(-inner))
+    if log_stats_probabilities:
+        logger.debug("Marriage probabilities calculated for %s persons (mean %.6f)"%(len(prob), np.mean(prob)))
+    return prob
+
 def calc_probability_marriage_simple(person):
     """
     Calculate the probability of marriage using a simple sex and age dependent 
@@ -228,78 +539,205 @@ def calc_probability_marriage_simple(person):
     """
     age = person.get_age_months()
     probability_index = get_probability_index(age, prob_time_units)
-    if person.get_sex() == 'female':
+    if person.get_sex() == SEX_CODES['female']:
         return marriage_probabilities_female[probability_index]
-    elif person.get_sex() == 'male':
+    elif person.get_sex() == SEX_CODES['male']:
         return marriage_probabilities_male[probability_index]
 
+def calc_probability_marriage_simple_vector(agemonths, sex):
+    """
+    Vectorized version of calc_probability_marriage_simple. Takes arrays of 
+    ages (in months) and sex codes.
+    """
+    return lookup_hazard_table(marriage_hazard_table, agemonths, sex, 'marriage')
+
 def calc_probability_divorce(person):
     "Calculates the probability of death for an agent."
     #TODO: Complete this function to take into account logistic regression results.
     return boolean_choice(rcParams['prob.marriage.divorce'])
 
-def choose_spouse(person, eligible_mates):
+class SpouseBucket(object):
     """
-    Once lists of marrying men and women are created, this function chooses a 
-    wife for a particular male based on the age differential between the man 
-    and each woman, based on observed data.
+    Stores the persons of one sex and ethnicity that are eligible for marriage, 
+    sorted by age, for use by match_spouses. Spouses are drawn from the bucket 
+    by first choosing an age difference bin (weighted by the probability of 
+    that bin in the 'spousechoice.male.agediff' distribution times the number 
+    of persons in the bin), and then choosing a person uniformly within the 
+    bin. Persons who have already married (or who are siblings of the person 
+    choosing a spouse) are rejected lazily when drawn, so the bucket never 
+    needs to be searched in full.
     """
-    sp_probs = []
-    for eligible_mate in eligible_mates:
-        if person.get_sex == "male":
-            agediff = person.get_age_years() - eligible_mate.get_age_years()
+    # Number of draws to make before falling back on calculating the 
+    # probabilities for every person remaining in the bucket.
+    max_draws = 20
+
+    def __init__(self, persons):
+        self._persons = sorted(persons, key=lambda person: person.get_age_years())
+        self._ages = np.array([person.get_age_years() for person in self._persons])
+        self._available = np.ones(len(self._persons), dtype=bool)
+        self._num_available = len(self._persons)
+        self._index = dict([(person, n) for n, person in enumerate(self._persons)])
+
+    def num_available(self):
+        return self._num_available
+
+    def remove(self, person):
+        "Marks a person as no longer available for marriage."
+        n = self._index.pop(person)
+        self._available[n] = False
+        self._num_available -= 1
+        if self._num_available < len(self._persons) / 2:
+            # Compact the bucket once most of its persons have married, so that 
+            # draws do not need to be rejected too often.
+            self.__init__([person for person, available in 
+                zip(self._persons, self._available) if available])
+
+    def _bin_ranges(self, person):
+        """
+        Returns the start and end indices (into the age-sorted persons in the 
+        bucket) of each age difference bin for a potential spouse of person.  
+        As in calc_prob_from_prob_dist, the bins are closed on the right, and 
+        the first bin also includes all smaller age differences. Age 
+        differences are expressed as the age of the male minus the age of the 
+        female.
+        """
+        binlims = np.array(rcParams['spousechoice.male.agediff'][0], dtype=float)
+        age = person.get_age_years()
+        if person.get_sex() == SEX_CODES['male']:
+            # Age difference is age - spouse_age, so spouse_age is in the 
+            # interval [age - binlims[n + 1], age - binlims[n])
+            starts = np.searchsorted(self._ages, age - binlims[1:], 'left')
+            ends = np.searchsorted(self._ages, age - binlims[:-1], 'left')
+            ends[0] = len(self._ages)
         else:
-            agediff = eligible_mate.get_age_years() - person.get_age_years()
-        if person.get_sex() == eligible_mate.get_sex() or \
-                person.get_ethnicity() != eligible_mate.get_ethnicity() or \
-                person.is_sibling(eligible_mate):
-            sp_probs.append(0)
-        else:
-            sp_probs.append(calc_prob_from_prob_dist(rcParams['spousechoice.male.agediff'], agediff))
-        #print "f", eligible_mate.get_age_years(),
-        #print "m", male.get_age_years(), "|",
-    if sum(sp_probs) == 0:
-        # In this case NONE of the eligible_mates are eligible (all of different
-        # ethnicities than the person).
-        return None
-    num = np.random.rand() * np.sum(sp_probs)
-    sp_probs = np.cumsum(sp_probs)
-    n = 0
-    for problim in sp_probs[0:-1]:
-        if num <= problim:
-            break
-        n += 1
-    return eligible_mates[n]
-
-def calc_spouse_age_diff(person):
+            # Age difference is spouse_age - age, so spouse_age is in the 
+            # interval (age + binlims[n], age + binlims[n + 1]]
+            starts = np.searchsorted(self._ages, age + binlims[:-1], 'right')
+            ends = np.searchsorted(self._ages, age + binlims[1:], 'right')
+            starts[0] = 0
+        return starts, np.maximum(starts, ends)
+
+    def choose(self, person):
+        """
+        Chooses a spouse for person from the bucket, based on the probability 
+        of each age difference between person and the persons in the bucket.  
+        Returns None if there is no eligible spouse.
+        """
+        if self._num_available == 0:
+            return None
+        starts, ends = self._bin_ranges(person)
+        bin_weights = np.array(rcParams['spousechoice.male.agediff'][1]) * (ends - starts)
+        if np.sum(bin_weights) == 0:
+            return None
+        bin_weights = np.cumsum(bin_weights)
+        for n in xrange(self.max_draws):
+            spouse_bin = np.searchsorted(bin_weights, np.random.rand() * bin_weights[-1], 'right')
+            spouse_bin = min(spouse_bin, len(bin_weights) - 1)
+            index = np.random.randint(starts[spouse_bin], ends[spouse_bin])
+            spouse = self._persons[index]
+            if self._available[index] and not person.is_sibling(spouse):
+                return spouse
+        # If no spouse has been found in max_draws draws, calculate the 
+        # probability for each remaining person in the bucket.
+        probs = np.zeros(len(self._persons))
+        for spouse_bin, prob in enumerate(rcParams['spousechoice.male.agediff'][1]):
+            probs[starts[spouse_bin]:ends[spouse_bin]] = prob
+        probs[~self._available] = 0
+        for index in np.flatnonzero(probs):
+            if person.is_sibling(self._persons[index]):
+                probs[index] = 0
+        if np.sum(probs) == 0:
+            return None
+        probs = np.cumsum(probs)
+        index = np.searchsorted(probs, np.random.rand() * probs[-1], 'right')
+        return self._persons[min(index, len(probs) - 1)]
+
+def match_spouses(eligible_males, eligible_females):
+    """
+    Once lists of marrying men and women are created, this function pairs them 
+    into couples, choosing a spouse for each person based on the age 
+    differential between the man and the woman, based on observed data.  
+    Spouses must be of the same ethnicity and cannot be siblings. Persons 
+    choose spouses in turn (males first), with candidate spouses stored in 
+    buckets by sex and ethnicity (see SpouseBucket).
+
+    Returns a list of (male, female) couples, and a list of the persons who did 
+    not find a spouse.
+    """
+    eligible_persons = eligible_males + eligible_females
+    buckets = {}
+    for person in eligible_persons:
+        key = (person.get_sex(), person.get_ethnicity())
+        if not key in buckets:
+            buckets[key] = []
+        buckets[key].append(person)
+    for key in buckets.keys():
+        buckets[key] = SpouseBucket(buckets[key])
+
+    couples = []
+    married = set()
+    for person in eligible_persons:
+        if person in married:
+            continue
+        if person.get_sex() == SEX_CODES['male']: spouse_sex = SEX_CODES['female']
+        else: spouse_sex = SEX_CODES['male']
+        spouse_bucket = buckets.get((spouse_sex, person.get_ethnicity()), None)
+        if spouse_bucket == None:
+            continue
+        spouse = spouse_bucket.choose(person)
+        if spouse == None:
+            # In this case there are no eligible spouses for this person 
+            # (because all the other persons are of a different ethnicity or 
+            # are siblings).
+            continue
+        spouse_bucket.remove(spouse)
+        buckets[(person.get_sex(), person.get_ethnicity())].remove(person)
+        married.add(person)
+        married.add(spouse)
+        if person.get_sex() == SEX_CODES['male']: couples.append((person, spouse))
+        else: couples.append((spouse, person))
+    unmatched = [person for person in eligible_persons if not person in married]
+    return couples, unmatched
+
+def calc_spouse_age_diff(person=None, size=None):
     """
     This function draws the age difference between this person and their 
     spouse based on the observed probability distribution. Note that the age 
     difference is defined as male's age - woman's age, so positive age 
     differences should be subtracted from men's ages to get their spouse age, and 
     added to women's.
+
+    If size is given, returns an array of size age differences.
     """
-    return draw_from_prob_dist(rcParams['spousechoice.male.agediff'])
+    return get_sampler('spousechoice.male.agediff').draw(size)
 
 def calc_probability_death(person):
     "Calculates the probability of death for an agent."
     age = person.get_age_months()
     probability_index = get_probability_index(age, prob_time_units)
     try:
-        if person.get_sex() == 'female':
+        if person.get_sex() == SEX_CODES['female']:
             return death_probabilities_female[probability_index]
-        elif person.get_sex() == 'male':
+        elif person.get_sex() == SEX_CODES['male']:
             return death_probabilities_male[probability_index]
     except IndexError:
         raise IndexError("error calculating death probability (index %s)"%(probability_index))
 
+def calc_probability_death_vector(agemonths, sex):
+    """
+    Vectorized version of calc_probability_death. Takes arrays of ages (in 
+    months) and sex codes, and returns an array of death probabilities, looked 
+    up from the precomputed death_hazard_table.
+    """
+    return lookup_hazard_table(death_hazard_table, agemonths, sex, 'death')
+
 def calc_probability_LD_migration_simple(person):
     "Calculates the probability of migration for an agent."
     age = person.get_age_months()
     probability_index = get_probability_index(age, prob_time_units)
-    if person.get_sex() == 'female':
+    if person.get_sex() == SEX_CODES['female']:
         return migration_probabilities_female[probability_index]
-    elif person.get_sex() == 'male':
+    elif person.get_sex() == SEX_CODES['male']:
         return migration_probabilities_male[probability_index]
 
 def calc_probability_LD_migration_zvoleff(person, time):
@@ -308,138 +746,226 @@ def calc_probability_LD_migration_zvoleff(person, time):
     the results of Alex Zvoleff's empirical analysis of the CVFS data, 
     following the results of the analysis conducted by Massey et al. (2010).
     """
+    coefficients = LD_migration_coefficients
     #########################################################################
     # Intercept
-    inner = rcParams['migration.ld.zv.coef.intercept']
+    inner = coefficients['intercept']
 
     if person.is_in_school():
-        inner += rcParams['migration.ld.zv.coef.in_school']
+        inner += coefficients['in_school']
 
-    inner += person.get_years_schooling() * rcParams['migration.ld.zv.coef.years_schooling']
+    inner += person.get_years_schooling() * coefficients['years_schooling']
 
     #######################################################################
     # Household level variables
     household = person.get_parent_agent()
-    inner += rcParams['migration.ld.zv.coef.own_farmland'] * household._own_land
+    inner += coefficients['own_farmland'] * household._own_land
 
     #######################################################################
     # Neighborhood level variables
     neighborhood = household.get_parent_agent()
-    inner += rcParams['migration.ld.zv.coef.log_market_min_ft'] * np.log(neighborhood.NFOs['market_min_ft'] + 1)
+    inner += coefficients['log_market_min_ft'] * np.log(neighborhood.NFOs['market_min_ft'] + 1)
 
     #########################################################################
     # Other controls
-    if person.get_sex() == "female":
-        inner += rcParams['migration.ld.zv.coef.female']
+    if person.get_sex() == SEX_CODES['female']:
+        inner += coefficients['female']
 
     ethnicity = person.get_ethnicity()
     assert ethnicity!=None, "Ethnicity must be defined"
-    if ethnicity == "HighHindu":
-        # This was the reference level
-        pass
-    elif ethnicity == "HillTibeto":
-        inner += rcParams['migration.ld.zv.coef.ethnicHillTibeto']
-    elif ethnicity == "LowHindu":
-        inner += rcParams['migration.ld.zv.coef.ethnicLowHindu']
-    elif ethnicity == "Newar":
-        inner += rcParams['migration.ld.zv.coef.ethnicNewar']
-    elif ethnicity == "TeraiTibeto":
-        inner += rcParams['migration.ld.zv.coef.ethnicTeraiTibeto']
+    inner += coefficients.ethnicity[ethnicity]
 
     age = person.get_age_years()
     if (age >= 15) & (age <= 24):
-        inner += rcParams['migration.ld.zv.coef.age15-24']
+        inner += coefficients['age15-24']
     elif (age > 24) & (age <= 34):
-        inner += rcParams['migration.ld.zv.coef.age24-34']
+        inner += coefficients['age24-34']
     elif (age > 34) & (age <= 44):
-        inner += rcParams['migration.ld.zv.coef.age34-44']
+        inner += coefficients['age34-44']
     elif (age > 44) & (age <= 55):
-        inner += rcParams['migration.ld.zv.coef.age45-55']
+        inner += coefficients['age45-55']
     elif (age > 55):
         # Reference class
         pass
 
     prob = 1./(1 + np.exp(-inner))
-    if rcParams['log_stats_probabilities']:
+    if log_stats_probabilities:
         logger.debug("Person %s local-distant migration probability %.6f (age: %s)"%(person.get_ID(), prob, person.get_age_years()))
     return prob
 
+def calc_LD_migration_neighborhood_term_zvoleff(market_min_ft):
+    """
+    Calculates the neighborhood covariate of the local-distant migration model 
+    used in calc_probability_LD_migration_zvoleff (the log of the market 
+    distance, in minutes on foot + 1). Takes an array with one element per 
+    neighborhood.
+    """
+    return np.log(market_min_ft + 1)
+
+def calc_probability_LD_migration_simple_vector(agemonths, sex, *args):
+    """
+    Vectorized version of calc_probability_LD_migration_simple. Takes arrays of 
+    ages (in months) and sex codes. Accepts (and ignores) the remaining 
+    covariates of calc_probability_LD_migration_zvoleff_vector so that the two 
+    functions can be used interchangeably.
+    """
+    return lookup_hazard_table(migration_hazard_table, agemonths, sex, 'migration')
+
+def calc_probability_LD_migration_zvoleff_vector(agemonths, sex, ethnicity, 
+        schooling, in_school, own_land, log_market_min_ft):
+    """
+    Vectorized version of calc_probability_LD_migration_zvoleff. Takes arrays 
+    (one element per person) of age in months, sex code, ethnicity code, years 
+    of schooling, in school status (boolean), household land ownership 
+    (boolean) and the log of the neighborhood market distance (log of minutes 
+    on foot + 1), and returns an array of local-distant migration 
+    probabilities.
+    """
+    coefficients = LD_migration_coefficients
+    inner = coefficients['intercept'] + \
+            coefficients.linear_predictor('person', in_school, schooling, 
+                    own_land, log_market_min_ft, sex == SEX_CODES['female'])
+
+    check_ethnicity_codes(ethnicity)
+    inner += coefficients.ethnicity[ethnicity]
+
+    # The age band coefficients are for the age bands [15, 24], (24, 34], (34, 
+    # 44] and (44, 55], with ages of over 55 (and under 15) as the reference 
+    # class.
+    age = agemonths / 12.
+    age_band_coefficients = coefficients.factor('age_band')
+    age_band = np.searchsorted([24, 34, 44, 55], age)
+    age_band[age < 15] = len(age_band_coefficients) - 1
+    inner += age_band_coefficients[age_band]
+
+    prob = 1./(1 + np.exp(-inner))
+    if log_stats_probabilities:
+        logger.debug("Local-distant migration probabilities calculated for %s persons (mean %.6f)"%(len(prob), np.mean(prob)))
+    return prob
+
 def calc_probability_LL_migration_zvoleff(person, time):
     """
     Calculates the probability of local-local migration for an agent, using the 
     results of Alex Zvoleff's empirical analysis of the CVFS data, as presented 
     in chapter 3 of his dissertation.
     """
+    coefficients = LL_migration_coefficients
     household = person.get_parent_agent()
     neighborhood = household.get_parent_agent()
 
     #########################################################################
     # Intercept
-    inner = rcParams['migration.ll.zv.coef.(Intercept)']
+    inner = coefficients['(Intercept)']
 
     #######################################################################
     # Neighborhood level variables
     #
     # Note that the EVI measures are based off 2 year mean EVI for the change, 
     # so calculate the 2 year mean EVI.
-    EVI_2yr_mean = np.mean(neighborhood._EVI_ts[-2:])
+    EVI_2yr_mean = neighborhood._EVI_2yr_mean
     # Note that the EVI coefficients are expressed for EVI/1000 (given the need 
     # to get smaller betas for lmer to converge when estimating the model)
-    inner += rcParams['migration.ll.zv.coef.mean_Sinteg_500m_24mth_2002_div_1000'] * (neighborhood._EVI_t0/1000)
-    inner += rcParams['migration.ll.zv.coef.mean_Sinteg_500m_24mth_chg_2002_div_1000'] * ((EVI_2yr_mean - neighborhood._EVI_t0)/1000)
-    inner += rcParams['migration.ll.zv.coef.NEAR_R_EVD_reversed'] * neighborhood._elevation_above_river
-    inner += rcParams['migration.ll.zv.coef.SCHLFT_2001'] * neighborhood.NFOs['school_min_ft']
-    inner += rcParams['migration.ll.zv.coef.MARFT_2001'] * neighborhood.NFOs['market_min_ft']
-    inner += rcParams['migration.ll.zv.coef.EMPFT_2001'] * neighborhood.NFOs['employer_min_ft']
-    inner += rcParams['migration.ll.zv.coef.num_groups_2001'] * neighborhood._num_groups
+    inner += coefficients['mean_Sinteg_500m_24mth_2002_div_1000'] * (neighborhood._EVI_t0/1000)
+    inner += coefficients['mean_Sinteg_500m_24mth_chg_2002_div_1000'] * ((EVI_2yr_mean - neighborhood._EVI_t0)/1000)
+    inner += coefficients['NEAR_R_EVD_reversed'] * neighborhood._elevation_above_river
+    inner += coefficients['SCHLFT_2001'] * neighborhood.NFOs['school_min_ft']
+    inner += coefficients['MARFT_2001'] * neighborhood.NFOs['market_min_ft']
+    inner += coefficients['EMPFT_2001'] * neighborhood.NFOs['employer_min_ft']
+    inner += coefficients['num_groups_2001'] * neighborhood._num_groups
 
     #######################################################################
     # Household level variables
-    inner += rcParams['migration.ll.zv.coef.own_total_2001'] * household._total_possessions
-    inner += rcParams['migration.ll.zv.coef.any_farming_2001TRUE'] * household._any_farming
-    inner += rcParams['migration.ll.zv.coef.TLU_livestock_2001'] * household._TLU_livestock
+    inner += coefficients['own_total_2001'] * household._total_possessions
+    inner += coefficients['any_farming_2001TRUE'] * household._any_farming
+    inner += coefficients['TLU_livestock_2001'] * household._TLU_livestock
 
     #########################################################################
     # Individual level variables
-    if person.get_sex() == "female":
+    if person.get_sex() == SEX_CODES['female']:
         # Male is the reference class
-        inner += rcParams['migration.ll.zv.coef.genderfemale']
+        inner += coefficients['genderfemale']
     age_decades = person.get_age_years() / 10.
-    inner += age_decades * rcParams['migration.ll.zv.coef.agedecades']
-    inner += (age_decades**2) * rcParams['migration.ll.zv.coef.I(agedecades^2)']
+    inner += age_decades * coefficients['agedecades']
+    inner += (age_decades**2) * coefficients['I(agedecades^2)']
 
     #########################################################################
     # Baseline hazard
     month_num = int(np.mod(np.round(time*12, 0), 12) + 1)
-    if month_num in [1, 2, 3, 4]:
-        # Reference class
-        pass
-    elif month_num in [5, 6, 7, 8]:
-        inner += rcParams['migration.ll.zv.coef.SeasonMonsoon (MJJA)']
-    elif month_num in [9, 10, 11, 12]:
-        inner += rcParams['migration.ll.zv.coef.SeasonWinter (SOND)']
-    else:
-        raise StatisticsError("Month number is %s. Should not be outside range of [1, 12]"%month_num)
+    inner += coefficients.factor('season')[month_num - 1]
 
     ethnicity = person.get_ethnicity()
     assert ethnicity!=None, "Ethnicity must be defined"
-    if ethnicity == "HighHindu":
-        # This was the reference level
-        pass
-    elif ethnicity == "HillTibeto":
-        inner += rcParams['migration.ll.zv.coef.ethnicHillTibeto']
-    elif ethnicity == "LowHindu":
-        inner += rcParams['migration.ll.zv.coef.ethnicLowHindu']
-    elif ethnicity == "Newar":
-        inner += rcParams['migration.ll.zv.coef.ethnicNewar']
-    elif ethnicity == "TeraiTibeto":
-        inner += rcParams['migration.ll.zv.coef.ethnicTeraiTibeto']
+    inner += coefficients.ethnicity[ethnicity]
 
     prob = 1./(1 + np.exp(-inner))
-    if rcParams['log_stats_probabilities']:
+    if log_stats_probabilities:
         logger.debug("Person %s local-local migration probability %.6f (age: %s)"%(person.get_ID(), prob, person.get_age_years()))
     return prob
 
+def calc_LL_migration_neighborhood_term_zvoleff(EVI_t0, EVI_2yr_mean, 
+        elevation_above_river, school_min_ft, market_min_ft, employer_min_ft, 
+        num_groups):
+    """
+    Calculates the neighborhood-level part of the linear predictor of the 
+    local-local migration model used in calc_probability_LL_migration_zvoleff.  
+    Takes arrays (one element per neighborhood) of the neighborhood 
+    covariates. As these do not vary between persons, this only needs to be 
+    calculated once per timestep.
+    """
+    coefficients = LL_migration_coefficients
+    # Note that the EVI coefficients are expressed for EVI/1000 (given the need 
+    # to get smaller betas for lmer to converge when estimating the model)
+    return coefficients.linear_predictor('neighborhood', EVI_t0/1000, 
+            (EVI_2yr_mean - EVI_t0)/1000, elevation_above_river, 
+            school_min_ft, market_min_ft, employer_min_ft, num_groups)
+
+def calc_LL_migration_household_term_zvoleff(total_possessions, any_farming, 
+        TLU_livestock):
+    """
+    Calculates the household-level part of the linear predictor of the 
+    local-local migration model used in calc_probability_LL_migration_zvoleff.  
+    Takes arrays (one element per household) of the household covariates.
+    """
+    coefficients = LL_migration_coefficients
+    return coefficients.linear_predictor('household', total_possessions, 
+            any_farming, TLU_livestock)
+
+def calc_probability_LL_migration_zvoleff_vector(agemonths, sex, ethnicity, 
+        neighborhood_term, household_term, time):
+    """
+    Vectorized version of calc_probability_LL_migration_zvoleff. Takes arrays 
+    (one element per person) of age in months, sex code and ethnicity code, 
+    and of the neighborhood and household terms of the linear predictor 
+    (from calc_LL_migration_neighborhood_term_zvoleff and 
+    calc_LL_migration_household_term_zvoleff) for the neighborhood and 
+    household of each person. Returns an array of local-local migration 
+    probabilities.
+    """
+    coefficients = LL_migration_coefficients
+    inner = coefficients['(Intercept)'] + neighborhood_term + \
+            household_term
+
+    #########################################################################
+    # Individual level variables
+    age_decades = agemonths / 120.
+    inner += coefficients.linear_predictor('person', 
+            sex == SEX_CODES['female'], age_decades, age_decades**2)
+    check_ethnicity_codes(ethnicity)
+    inner += coefficients.ethnicity[ethnicity]
+
+    #########################################################################
+    # Baseline hazard (the same for all persons)
+    month_num = int(np.mod(np.round(time*12, 0), 12) + 1)
+    inner += coefficients.factor('season')[month_num - 1]
+
+    prob = 1./(1 + np.exp(-inner))
+    if log_stats_probabilities:
+        logger.debug("Local-local migration probabilities calculated for %s persons (mean %.6f)"%(len(prob), np.mean(prob)))
+    return prob
+
+# Return timestep assigned to permanent migrants (see calc_migration_length).
+PERMANENT_MIGRATION_TIMESTEP = 99999999
+
 def calc_migration_length(person, BURN_IN):
     """
     Calculated the length of a migration from a probability distribution.
@@ -452,39 +978,45 @@ def calc_migration_length(person, BURN_IN):
     # First decide if it is permanent, according to the 
     # "prob.migration.length.permanent" parameter:
     if not BURN_IN and np.random.rand() < rcParams['prob.migration.length.permanent']:
-        # TODO: Instead of very long term in agent-store, just remove them from 
-        # the model with the make_permanent_outmigration method.
-        return 99999999
-    mig_length_prob_dist = rcParams['prob.migration.lengths']
+        # Permanent migrants are removed from their household by 
+        # Person.make_individual_LL_migration and make_individual_LD_migration 
+        # (see agents.py) and recorded in agent_tables.PersonArchive, rather 
+        # than queued in a MigrantStore to return.
+        return PERMANENT_MIGRATION_TIMESTEP
     # Use ceil here so the minimum value is 1, and the maximum value is 36
-    return np.ceil(draw_from_prob_dist(mig_length_prob_dist))
+    return np.ceil(get_sampler('prob.migration.lengths').draw())
 
 def calc_num_inmigrant_households():
     """
     Draws the number of in migrating households in a given month based on an 
     empirical probability distribution.
     """
-    return int(draw_from_prob_dist(rcParams['inmigrant_HH.prob.num_HHs']))
+    return int(get_sampler('inmigrant_HH.prob.num_HHs').draw())
 
-def calc_inmigrant_household_ethnicity(as_integer=False):
-    ethnicity = int(draw_from_prob_dist(rcParams['inmigrant_HH.prob.ethnicity']))
+def calc_inmigrant_household_ethnicity(as_integer=False, size=None):
+    """
+    Draws the ethnicity of an in-migrating household, as an ethnicity code 
+    (see agent_tables.ETHNICITY_CODES), or as the ethnicity number used in the 
+    CVFS data if as_integer is True. If size is given, returns a list of the 
+    ethnicities of size households.
+    """
+    if size is None:
+        return calc_inmigrant_household_ethnicity(as_integer, 1)[0]
+    ethnicities = get_sampler('inmigrant_HH.prob.ethnicity').draw(size).astype(int).tolist()
     if not as_integer:
-        if ethnicity == 1:
-            ethnicity = "HighHindu"
-        elif ethnicity == 2:
-            ethnicity = "HillTibeto"
-        elif ethnicity == 3:
-            ethnicity = "LowHindu"
-        elif ethnicity == 4:
-            ethnicity = "Newar"
-        elif ethnicity == 5:
-            ethnicity = "TeraiTibeto"
-        else:
+        for ethnicity in set(ethnicities) - set(CVFS_ETHNICITY_CODES.keys()):
             logger.critical("Undefined ethnicity %s drawn for new inmigrant household"%ethnicity)
-    return ethnicity
+        ethnicities = [CVFS_ETHNICITY_CODES.get(ethnicity, None) for ethnicity in ethnicities]
+    return ethnicities
 
-def calc_inmigrant_household_size():
-    return int(draw_from_prob_dist(rcParams['inmigrant_HH.prob.hh_size']))
+def calc_inmigrant_household_size(size=None):
+    """
+    Draws the size of an in-migrating household (or an array of the sizes of 
+    size households if size is given).
+    """
+    if size is None:
+        return int(get_sampler('inmigrant_HH.prob.hh_size').draw())
+    return get_sampler('inmigrant_HH.prob.hh_size').draw(size).astype(int)
 
 def calc_probability_HH_outmigration(household, timestep):
     """
@@ -494,105 +1026,115 @@ def calc_probability_HH_outmigration(household, timestep):
     outmigrant_HH_prob = rcParams['outmigrant_HH.prob']
     return outmigrant_HH_prob
 
-def calc_first_birth_time(person):
+def calc_first_birth_time(person=None, size=None):
     """
     Calculates the time from marriage until first birth for this person (not 
-    used if the Ghimire and Axinn 2010 model is selected in rcparams.
+    used if the Ghimire and Axinn 2010 model is selected in rcparams. If size 
+    is given, returns an array of first birth times for size persons.
     """
-    first_birth_prob_dist = rcParams['prob.firstbirth.times']
-    return int(draw_from_prob_dist(first_birth_prob_dist))
+    if size is None:
+        return int(get_sampler('prob.firstbirth.times').draw())
+    return get_sampler('prob.firstbirth.times').draw(size).astype(int)
 
-def calc_des_num_children():
-    "Calculates the desired number of children for this person."
-    des_num_children_prob_dist = rcParams['prob.num.children.desired']
+def calc_des_num_children(size=None):
+    """
+    Calculates the desired number of children for this person (or for size 
+    persons if size is given).
+    """
     # Use np.floor as the last number in the des_num_children prob dist (10) is 
     # not actually seen in the Chitwan data. It is included only as the 
     # right-hand bound of the distribution.
-    return np.floor(draw_from_prob_dist(des_num_children_prob_dist))
+    return np.floor(get_sampler('prob.num.children.desired').draw(size))
 
-def calc_birth_interval():
-    "Calculates the birth interval for this person."
-    birth_interval_prob_dist = rcParams['prob.birth.intervals']
-    return np.floor(draw_from_prob_dist(birth_interval_prob_dist))
+def calc_birth_interval(size=None):
+    """
+    Calculates the birth interval for this person (or for size persons if size 
+    is given).
+    """
+    return np.floor(get_sampler('prob.birth.intervals').draw(size))
 
 def calc_TLU_livestock(is_farming):
     """
     Calculates the livestock ownership (in Tropical Livestock Units) of this 
-    household (based on analysis of 1996 CVFS data).
+    household (based on analysis of 1996 CVFS data). If is_farming is an array 
+    (one element per household), returns an array of livestock ownership.
     """
-    if is_farming:
-        TLU = draw_from_prob_dist(rcParams['TLU_probs.farmer'])
-    else:
-        TLU = draw_from_prob_dist(rcParams['TLU_probs.nonfarmer'])
-    # Given the way this prob dist was defined in R, if TLU is less than zero, 
-    # it means that the household has 0 livestock units.
-    if TLU < 0: TLU = 0
+    if np.ndim(is_farming) == 0:
+        if is_farming:
+            TLU = get_sampler('TLU_probs.farmer').draw()
+        else:
+            TLU = get_sampler('TLU_probs.nonfarmer').draw()
+        # Given the way this prob dist was defined in R, if TLU is less than 
+        # zero, it means that the household has 0 livestock units.
+        if TLU < 0: TLU = 0
+        return TLU
+    is_farming = np.asarray(is_farming, dtype=bool)
+    TLU = np.empty(len(is_farming))
+    TLU[is_farming] = get_sampler('TLU_probs.farmer').draw(np.sum(is_farming))
+    TLU[~is_farming] = get_sampler('TLU_probs.nonfarmer').draw(np.sum(~is_farming))
+    TLU[TLU < 0] = 0
     return TLU
 
-def calc_total_possessions():
+def calc_total_possessions(size=None):
     """
     Calculates the number of possessions this household owns (based on analysis 
-    of 1996 CVFS data).
+    of 1996 CVFS data), or an array of the number of possessions of size 
+    households if size is given.
     """
-    return np.floor(draw_from_prob_dist(rcParams['total_possessions_probs']) + 1)
+    return np.floor(get_sampler('total_possessions_probs').draw(size) + 1)
 
-def calc_hh_area():
-    "Calculates the area of this household."
-    hh_area_prob_dist = rcParams['lulc.area.hh']
-    return draw_from_prob_dist(hh_area_prob_dist)
+def calc_hh_area(size=None):
+    """
+    Calculates the area of this household (or of size households if size is 
+    given).
+    """
+    return get_sampler('lulc.area.hh').draw(size)
 
 def calc_fuelwood_usage_probability(household, time):
     """
     Calculates the probability of fuelwood usage (not quantity of usage, but 
     probability of using any wood at all) at the household-level.
     """
+    coefficients = fw_usageprob_coefficients
 
-    hhsize = household.num_members()
+    composition = household.get_composition()
+    hhsize = composition['size']
     if hhsize == 0:
         # Households may be empty but still in the model if they have 
         # out-migrants currently away, but that will be returning.
         return 0
 
-    inner = rcParams['fw_usageprob.coef.intercept']
+    inner = coefficients['intercept']
 
     ######################################################################
     # Household level vars
-    inner += rcParams['fw_usageprob.coef.hhsize'] * hhsize
+    inner += coefficients['hhsize'] * hhsize
 
-    hh_ethnicity = household.get_hh_head().get_ethnicity()
-    if hh_ethnicity == "HighHindu":
-        # This was the reference class
-        pass
-    elif hh_ethnicity == "LowHindu":
-        inner += rcParams['fw_usageprob.coef.ethnicLowHindu']
-    elif hh_ethnicity == "Newar":
-        inner += rcParams['fw_usageprob.coef.ethnicNewar']
-    elif hh_ethnicity == "HillTibeto":
-        inner += rcParams['fw_usageprob.coef.ethnicHillTibeto']
-    elif hh_ethnicity == "TeraiTibeto":
-        inner += rcParams['fw_usageprob.coef.ethnicTeraiTibeto']
-    else:
-        raise StatisticsError("No coefficient was specified for ethnicity '%s'"%hh_ethnicity)
+    hh_ethnicity = composition['head_ethnicity']
+    if not hh_ethnicity in ETHNICITY_CODES.values():
+        raise StatisticsError("No coefficient was specified for ethnicity code '%s'"%hh_ethnicity)
+    inner += coefficients.ethnicity[hh_ethnicity]
 
-    inner += rcParams['fw_usageprob.coef.meangender'] * household.mean_gender()
+    inner += coefficients['meangender'] * \
+            composition['num_female'] / hhsize
 
     ######################################################################
     # Neighborhood level vars
     neighborhood = household.get_parent_agent()
-    inner += rcParams['fw_usageprob.coef.elecavail'] * \
+    inner += coefficients['elecavail'] * \
             neighborhood._elec_available
-    inner += rcParams['fw_usageprob.coef.distnara_km'] * \
+    inner += coefficients['distnara_km'] * \
             neighborhood._distnara
-    if neighborhood._forest_closest_type == "BZ":
+    if neighborhood._forest_closest_type == FOREST_TYPE_CODES['BZ']:
         # Reference level
         pass
-    elif neighborhood._forest_closest_type == "CNP":
-        inner += rcParams['fw_usageprob.coef.closest_typeCNP']
+    elif neighborhood._forest_closest_type == FOREST_TYPE_CODES['CNP']:
+        inner += coefficients['closest_typeCNP']
     else:
-        raise StatisticsError("No coefficient was specified for closest forest type '%s'"%neighborhood._forest_closest_type)
+        raise StatisticsError("No coefficient was specified for closest forest type code '%s'"%neighborhood._forest_closest_type)
 
     prob = 1./(1 + np.exp(-inner))
-    if rcParams['log_stats_probabilities']:
+    if log_stats_probabilities:
         logger.debug("Household %s fuelwood usage probability %.6f (size: %s)"%(household.get_ID(), prob, household.num_members()))
     return prob
 
@@ -602,24 +1144,26 @@ def calc_daily_fuelwood_usage_simple(household, time):
     Calculates household-level fuelwood usage, using the results of a 2009 
     survey of fuelwood usage in the valley.
     """
-    hhsize = household.num_members()
+    coefficients = fw_demand_simple_coefficients
+    composition = household.get_composition()
+    hhsize = composition['size']
     if hhsize == 0:
         return 0
-    wood_usage = rcParams['fw_demand.simple.coef.intercept']
+    wood_usage = coefficients['intercept']
     if hhsize >= 6:
         # Hold household size constant after 6 persons hhsize since model is 
         # unstable after 6
-        wood_usage += rcParams['fw_demand.simple.coef.hhsize'] * 6
-        wood_usage += rcParams['fw_demand.simple.coef.hhsize_squared'] * 6
+        wood_usage += coefficients['hhsize'] * 6
+        wood_usage += coefficients['hhsize_squared'] * 6
     else:
-        wood_usage += rcParams['fw_demand.simple.coef.hhsize'] * hhsize
-        wood_usage += rcParams['fw_demand.simple.coef.hhsize_squared'] * hhsize
-    wood_usage += rcParams['fw_demand.simple.coef.hhsize'] * hhsize
-    wood_usage += rcParams['fw_demand.simple.coef.hhsize_squared'] * hhsize
-    if household.get_hh_head().get_ethnicity() == "HighHindu":
-        wood_usage += rcParams['fw_demand.simple.coef.upper_caste_hindu']
-    wood_usage += household.any_non_wood_fuel() * rcParams['fw_demand.simple.coef.own_non_wood_stove']
-    wood_usage += np.random.randn()*np.sqrt(rcParams['fw_demand.simple.residvariance'])
+        wood_usage += coefficients['hhsize'] * hhsize
+        wood_usage += coefficients['hhsize_squared'] * hhsize
+    wood_usage += coefficients['hhsize'] * hhsize
+    wood_usage += coefficients['hhsize_squared'] * hhsize
+    if composition['head_ethnicity'] == ETHNICITY_CODES['HighHindu']:
+        wood_usage += coefficients['upper_caste_hindu']
+    wood_usage += household.any_non_wood_fuel() * coefficients['own_non_wood_stove']
+    wood_usage += np.random.randn()*fw_demand_simple_residsd
     if wood_usage < 0:
         # Account for less than zero wood usage (could occur due to the random 
         # number added above to account for the low percent variance explained 
@@ -635,24 +1179,26 @@ def calc_daily_fuelwood_usage_migration_feedback(household, time):
     Calculates household-level fuelwood usage, using the results of a 2009 
     survey of fuelwood usage in the valley.
     """
-    hhsize = household.num_members()
+    coefficients = fw_demand_migfeedback_coefficients
+    composition = household.get_composition()
+    hhsize = composition['size']
     if hhsize == 0:
         return 0
-    wood_usage = rcParams['fw_demand.migfeedback.coef.intercept']
+    wood_usage = coefficients['intercept']
     if hhsize >= 6:
         # Hold household size constant after 6 persons hhsize since model is 
         # unstable after 6
-        wood_usage += rcParams['fw_demand.migfeedback.coef.hhsize'] * 6
-        wood_usage += rcParams['fw_demand.migfeedback.coef.hhsize_squared'] * 6
+        wood_usage += coefficients['hhsize'] * 6
+        wood_usage += coefficients['hhsize_squared'] * 6
     else:
-        wood_usage += rcParams['fw_demand.migfeedback.coef.hhsize'] * hhsize
-        wood_usage += rcParams['fw_demand.migfeedback.coef.hhsize_squared'] * hhsize
-    if household.get_hh_head().get_ethnicity() == "HighHindu":
-        wood_usage += rcParams['fw_demand.migfeedback.coef.upper_caste_hindu']
-    wood_usage += household.any_non_wood_fuel() * rcParams['fw_demand.migfeedback.coef.own_non_wood_stove']
-    wood_usage += np.random.randn()*np.sqrt(rcParams['fw_demand.migfeedback.residvariance'])
+        wood_usage += coefficients['hhsize'] * hhsize
+        wood_usage += coefficients['hhsize_squared'] * hhsize
+    if composition['head_ethnicity'] == ETHNICITY_CODES['HighHindu']:
+        wood_usage += coefficients['upper_caste_hindu']
+    wood_usage += household.any_non_wood_fuel() * coefficients['own_non_wood_stove']
+    wood_usage += np.random.randn()*fw_demand_migfeedback_residsd
     if household._lastmigrant_time > (time - 1):
-        wood_usage += rcParams['fw_demand.migfeedback.coef.anyLDmigr']
+        wood_usage += coefficients['anyLDmigr']
     if wood_usage < 0:
         # Account for less than zero wood usage (could occur due to the random 
         # number added above to account for the low percent variance explained 
@@ -663,46 +1209,141 @@ def calc_daily_fuelwood_usage_migration_feedback(household, time):
     wood_usage = wood_usage * hhsize
     return wood_usage
 
+def calc_fuelwood_usage_probability_vector(hhsize, num_female, 
+        head_ethnicity, elec_available, distnara, forest_closest_type):
+    """
+    Vectorized version of calc_fuelwood_usage_probability. Takes arrays (one 
+    element per household) of household size, number of female members and 
+    ethnicity code of the household head, and of the electricity 
+    availability, distance to Narayanghat, and closest forest type code (see 
+    agent_tables.FOREST_TYPE_CODES) of the neighborhood of each household. 
+    Returns an array of fuelwood usage probabilities (zero for households with 
+    no members present).
+    """
+    coefficients = fw_usageprob_coefficients
+    forest_closest_type = np.asarray(forest_closest_type)
+    unknown_types = set(forest_closest_type.tolist()) - set(FOREST_TYPE_CODES.values())
+    if len(unknown_types) > 0:
+        raise StatisticsError("No coefficient was specified for closest forest type code '%s'"%unknown_types.pop())
+    present = hhsize > 0
+    check_ethnicity_codes(np.asarray(head_ethnicity)[present])
+    # Use the reference ethnicity for empty households (which have no 
+    # household head).
+    head_ethnicity = np.where(present, head_ethnicity, ETHNICITY_CODES['HighHindu'])
+
+    inner = coefficients['intercept'] + \
+            coefficients.ethnicity[head_ethnicity]
+    inner += coefficients.linear_predictor('household', hhsize, 
+            num_female / np.where(present, hhsize, 1), elec_available, 
+            distnara, forest_closest_type == FOREST_TYPE_CODES['CNP'])
+
+    prob = 1./(1 + np.exp(-inner))
+    prob[~present] = 0
+    if log_stats_probabilities:
+        logger.debug("Fuelwood usage probabilities calculated for %s households (mean %.6f)"%(len(prob), np.mean(prob)))
+    return prob
+
+def calc_daily_fuelwood_usage_simple_vector(hhsize, head_ethnicity, 
+        any_non_wood_fuel, *args):
+    """
+    Vectorized version of calc_daily_fuelwood_usage_simple. Takes arrays (one 
+    element per household) of household size, ethnicity code of the household 
+    head, and whether the household uses any non-wood fuel. Returns an array 
+    of daily household fuelwood usage.
+
+    Extra arguments are ignored, so that this function can be called with the 
+    same arguments as calc_daily_fuelwood_usage_migration_feedback_vector.
+    """
+    coefficients = fw_demand_simple_coefficients
+    capped_hhsize = np.minimum(hhsize, 6)
+    wood_usage = coefficients['intercept']
+    # Hold household size constant after 6 persons hhsize since model is 
+    # unstable after 6
+    wood_usage += coefficients['hhsize'] * capped_hhsize
+    wood_usage += coefficients['hhsize_squared'] * capped_hhsize
+    wood_usage += coefficients['hhsize'] * hhsize
+    wood_usage += coefficients['hhsize_squared'] * hhsize
+    wood_usage += coefficients['upper_caste_hindu'] * \
+            (head_ethnicity == ETHNICITY_CODES['HighHindu'])
+    wood_usage += coefficients['own_non_wood_stove'] * \
+            any_non_wood_fuel
+    wood_usage += np.random.randn(len(hhsize)) * \
+            fw_demand_simple_residsd
+    # Account for less than zero wood usage (could occur due to the random 
+    # number added above to account for the low percent variance explained by 
+    # the model).
+    wood_usage = np.maximum(wood_usage, 0)
+    # The prediction is per person - multiply it by hhsize to get total 
+    # household fuelwood consumption:
+    return wood_usage * hhsize
+
+def calc_daily_fuelwood_usage_migration_feedback_vector(hhsize, 
+        head_ethnicity, any_non_wood_fuel, lastmigrant_time, time):
+    """
+    Vectorized version of calc_daily_fuelwood_usage_migration_feedback. Takes 
+    arrays (one element per household) of household size, ethnicity code of 
+    the household head, whether the household uses any non-wood fuel, and the 
+    time of the last migration from the household (NaN if there has been no 
+    migration). Returns an array of daily household fuelwood usage.
+    """
+    coefficients = fw_demand_migfeedback_coefficients
+    capped_hhsize = np.minimum(hhsize, 6)
+    wood_usage = coefficients['intercept']
+    # Hold household size constant after 6 persons hhsize since model is 
+    # unstable after 6
+    wood_usage += coefficients['hhsize'] * capped_hhsize
+    wood_usage += coefficients['hhsize_squared'] * capped_hhsize
+    wood_usage += coefficients['upper_caste_hindu'] * \
+            (head_ethnicity == ETHNICITY_CODES['HighHindu'])
+    wood_usage += coefficients['own_non_wood_stove'] * \
+            any_non_wood_fuel
+    wood_usage += np.random.randn(len(hhsize)) * \
+            fw_demand_migfeedback_residsd
+    recent_migrant = np.zeros(len(hhsize), dtype=bool)
+    has_migrant = ~np.isnan(lastmigrant_time)
+    recent_migrant[has_migrant] = lastmigrant_time[has_migrant] > (time - 1)
+    wood_usage += coefficients['anyLDmigr'] * recent_migrant
+    # Account for less than zero wood usage (could occur due to the random 
+    # number added above to account for the low percent variance explained by 
+    # the model).
+    wood_usage = np.maximum(wood_usage, 0)
+    # The prediction is per person - multiply it by hhsize to get total 
+    # household fuelwood consumption:
+    return wood_usage * hhsize
+
 def calc_education_level(person):
     """
     Calculate education level for person, based on results of empirical analysis of CVFS panel data.
     """
+    coefficients = education_coefficients
     levels = rcParams['education.depvar_levels']
 
-    intercepts = [rcParams['education.coef.y>=gt0lt4'],
-                  rcParams['education.coef.y>=gt4lt8'],
-                  rcParams['education.coef.y>=gt8lt11'],
-                  rcParams['education.coef.y>=gt11']]
+    intercepts = [coefficients['y>=gt0lt4'],
+                  coefficients['y>=gt4lt8'],
+                  coefficients['y>=gt8lt11'],
+                  coefficients['y>=gt11']]
 
-    prob_y_gte_j = np.zeros(len(levels) - 1) # probability y >= j
-    for n in np.arange(len(prob_y_gte_j)):
-        intercept = intercepts[n]
-        xb_sum = 0
-
-        # Individual-level characteristics
-        if person.get_sex() == "female":
-            xb_sum += rcParams['education.coef.gender=female']
-
-        if person.get_ethnicity() == "HighHindu":
-            # This was the reference class
-            pass
-        elif person.get_ethnicity() == "HillTibeto":
-            xb_sum += rcParams['education.coef.ethnic=HillTibeto']
-        elif person.get_ethnicity() == "LowHindu":
-            xb_sum += rcParams['education.coef.ethnic=LowHindu']
-        elif person.get_ethnicity() == "Newar":
-            xb_sum += rcParams['education.coef.ethnic=Newar']
-        elif person.get_ethnicity() == "TeraiTibeto":
-            xb_sum += rcParams['education.coef.ethnic=TeraiTibeto']
-        else:
-            raise StatisticsError("No coefficient was specified for ethnicity '%s'"%person.get_ethnicity())
+    # The covariates do not vary between levels, so only the intercepts 
+    # differ in the calculation of the probability of each level.
+    xb_sum = 0
 
-        # Neighborhood-level characteristics
-        neighborhood = person.get_parent_agent().get_parent_agent()
-        xb_sum += rcParams['education.coef.avg_yrs_services_lt15'] * \
-                neighborhood._avg_yrs_services_lt15
+    # Individual-level characteristics
+    if person.get_sex() == SEX_CODES['female']:
+        xb_sum += coefficients['gender=female']
+
+    ethnicity = person.get_ethnicity()
+    if not ethnicity in ETHNICITY_CODES.values():
+        raise StatisticsError("No coefficient was specified for ethnicity code '%s'"%ethnicity)
+    xb_sum += coefficients.ethnicity[ethnicity]
 
-        prob_y_gte_j[n] = 1. / (1 + np.exp(-(intercept + xb_sum)))
+    # Neighborhood-level characteristics
+    neighborhood = person.get_parent_agent().get_parent_agent()
+    xb_sum += coefficients['avg_yrs_services_lt15'] * \
+            neighborhood._avg_yrs_services_lt15
+
+    prob_y_gte_j = np.zeros(len(levels) - 1) # probability y >= j
+    for n in np.arange(len(prob_y_gte_j)):
+        prob_y_gte_j[n] = 1. / (1 + np.exp(-(intercepts[n] + xb_sum)))
 
     prob_y_eq_j = np.zeros(4) # probability y == j
     prob_y_eq_j[0] = 1 - prob_y_gte_j[0]
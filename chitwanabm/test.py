@@ -26,7 +26,10 @@ distributions used in the model so they can be verified to match the intended
 distributions.
 """
 
+import os
 import sys
+import shutil
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +38,12 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 
+from chitwanabm.agent_tables import SEX_CODES, ETHNICITY_CODES, \
+        ETHNICITY_LABELS, get_label
+from chitwanabm.results import ResultsWriter, PersonPanel, \
+        read_person_snapshot, read_person_trajectory, PERSON_RECORD_DTYPE, \
+        AGE_TOLERANCE
+
 def main(argv=None):
     logger.setLevel(logging.INFO)
     ch = logging.StreamHandler()
@@ -44,6 +53,14 @@ def main(argv=None):
     ch.setFormatter(log_console_formatter)
     logger.addHandler(ch)
 
+    logger.info("Checking person panel delta encoding")
+    if not validate_person_panel(generate_person_snapshots()):
+        logger.critical("Person panel validation failed")
+
+    logger.info("Checking divorces from archived permanent migrants")
+    if not validate_divorce_from_archived_migrant():
+        logger.critical("Divorce from archived migrant validation failed")
+
     sample_size = 10000
     
     logger.info("Plotting desired number of children test histogram")
@@ -115,18 +132,15 @@ def validate_person_attributes(world):
             household_ID = person.get_parent_agent().get_ID()
             neighborhood_ID = person.get_parent_agent().get_parent_agent().get_ID()
         person_info = "(age: %.2f, ethnicity: %s, in-mig: %s, initial: %s, HH: %s, NBH: %s, in %s store(s), alive: %s)"%(
-                person.get_age_years(), person.get_ethnicity(), 
+                person.get_age_years(), 
+                get_label(ETHNICITY_LABELS, person.get_ethnicity()), 
                 person.is_in_migrant(), person.is_initial_agent(), 
                 household_ID, neighborhood_ID,
                 len(person._store_list), person._alive)
         return person_info
     logger.debug("Validating person attributes")
     all_agents_valid = True
-    valid_ethnicities = ["HighHindu",
-                         "HillTibeto",
-                         "LowHindu",
-                         "Newar",
-                         "TeraiTibeto"]
+    valid_ethnicities = ETHNICITY_CODES.values()
     maximum_age = 115
     checked_person_list = []
     spouse_count_dict = {}
@@ -209,5 +223,193 @@ def validate_neighborhood_attributes(world):
                 all_agents_valid = False
     return all_agents_valid
 
+def generate_person_snapshots(num_persons=500, num_snapshots=8, interval=12):
+    """
+    Returns a list of (timestep, person records) tuples of random person panel 
+    snapshots, taken every interval timesteps, for use with 
+    validate_person_panel. Between snapshots persons age, some of their 
+    attributes change, some persons are removed, and new persons (and some of 
+    the removed persons) are added.
+    """
+    random_state = np.random.RandomState(0)
+    records = np.zeros(num_persons, dtype=PERSON_RECORD_DTYPE)
+    records['pid'] = np.arange(num_persons)
+    records['age'] = random_state.randint(0, 80 * 12, num_persons) / 12.
+    records['marrtime'] = np.nan
+    records['spouseid'] = -1
+    removed = records[:0]
+    next_pid = num_persons
+    snapshots = [(0, records)]
+    for timestep in xrange(interval, num_snapshots * interval, interval):
+        records = records.copy()
+        records['age'] = np.round(records['age'] * 12 + interval) / 12.
+        changed = random_state.random_sample(len(records)) < .1
+        records['num_children'][changed] += 1
+        changed = random_state.random_sample(len(records)) < .05
+        records['marrtime'][changed] = timestep
+        records['spouseid'][changed] = random_state.randint(0, next_pid, 
+                np.sum(changed))
+        records['is_away'] = random_state.random_sample(len(records)) < .1
+        is_removed = random_state.random_sample(len(records)) < .05
+        returned = removed[random_state.random_sample(len(removed)) < .5]
+        removed = np.concatenate((removed[~np.in1d(removed['pid'], 
+            returned['pid'])], records[is_removed]))
+        new = np.zeros(10, dtype=PERSON_RECORD_DTYPE)
+        new['pid'] = np.arange(next_pid, next_pid + len(new))
+        new['marrtime'] = np.nan
+        new['spouseid'] = -1
+        next_pid += len(new)
+        records = np.concatenate((records[~is_removed], returned, new))
+        snapshots.append((timestep, records))
+    return snapshots
+
+def _person_records_equal(records, other_records):
+    """
+    Checks that two arrays of person records are equal, treating NaNs as 
+    equal, and ages as equal if they differ by less than AGE_TOLERANCE.
+    """
+    if len(records) != len(other_records):
+        return False
+    for field in records.dtype.names:
+        values = records[field]
+        other_values = other_records[field]
+        if field == 'age':
+            equal = np.abs(values - other_values) < AGE_TOLERANCE
+        elif values.dtype.kind == 'f':
+            equal = (values == other_values) | (np.isnan(values) & np.isnan(other_values))
+        else:
+            equal = values == other_values
+        if not np.all(equal):
+            return False
+    return True
+
+def validate_person_panel(snapshots, timestep_months=1):
+    """
+    Writes a list of (timestep, person records) snapshots (see 
+    generate_person_snapshots) to a full and to a delta-encoded person 
+    panel, and checks that reading every snapshot (with read_person_snapshot) 
+    and every person's trajectory (with read_person_trajectory) gives the 
+    same records from both panels.
+    """
+    logger.debug("Validating person panel")
+    temp_dir = tempfile.mkdtemp()
+    try:
+        panel_files = []
+        num_persons = max([len(records) for timestep, records in snapshots])
+        for delta in [False, True]:
+            panel_file = os.path.join(temp_dir, 'panel_delta_%s.h5'%delta)
+            writer = ResultsWriter(panel_file, 0)
+            panel = PersonPanel(writer, num_persons, len(snapshots), 
+                    delta=delta, timestep_months=timestep_months)
+            for timestep, records in snapshots:
+                panel.append(timestep, records)
+            writer.close()
+            panel_files.append(panel_file)
+        full_file, delta_file = panel_files
+
+        panel_valid = True
+        for timestep, records in snapshots:
+            full_records = read_person_snapshot(full_file, timestep)
+            if not _person_records_equal(full_records, 
+                    read_person_snapshot(delta_file, timestep)):
+                logger.warning("Delta-encoded person panel snapshot for timestep %s does not match the full snapshot"%timestep)
+                panel_valid = False
+            if not _person_records_equal(full_records, np.sort(records, 
+                order='pid')):
+                logger.warning("Person panel snapshot for timestep %s does not match the written snapshot"%timestep)
+                panel_valid = False
+        pids = np.unique(np.concatenate([records['pid'] for timestep, records 
+            in snapshots]))
+        for pid in pids:
+            if not _person_records_equal(read_person_trajectory(full_file, pid), 
+                    read_person_trajectory(delta_file, pid)):
+                logger.warning("Delta-encoded person panel trajectory of person %s does not match the full trajectory"%pid)
+                panel_valid = False
+    finally:
+        shutil.rmtree(temp_dir)
+    return panel_valid
+
+def generate_synthetic_world(num_persons, num_households, num_neighborhoods):
+    """
+    Returns a world with one region, populated with num_persons initial agents 
+    evenly divided between num_households households in num_neighborhoods 
+    neighborhoods. Ages are drawn uniformly between 0 and 75 years.
+    """
+    from chitwanabm.agents import World
+    world = World()
+    region = world.new_region()
+    neighborhoods = [world.new_neighborhood() for n in xrange(num_neighborhoods)]
+    for neighborhood in neighborhoods:
+        # Give each neighborhood enough agricultural land for its households.
+        neighborhood._land_agveg = 1e9
+        neighborhood._land_nonagveg = 0
+        neighborhood._land_privbldg = 0
+        neighborhood._land_pubbldg = 0
+        neighborhood._land_other = 0
+        neighborhood._land_total = 1e9
+        region.add_agent(neighborhood)
+    households = world.new_households(num_households, initial_agent=True)
+    for n, household in enumerate(households):
+        neighborhoods[n % num_neighborhoods].add_agent(household, 
+                initializing=True)
+    ages = np.random.randint(0, 75 * 12, num_persons)
+    persons = world.new_persons([-age for age in ages], ages, 
+            initial_agent=True)
+    for n, person in enumerate(persons):
+        households[n % num_households].add_agent(person)
+    return world
+
+def validate_divorce_from_archived_migrant():
+    """
+    Checks that a resident person married to a permanent LD migrant (who is 
+    archived, see agent_tables.PersonArchive) can divorce them, both when the 
+    migrant is the wife and when the migrant is the husband, and is then free 
+    to remarry.
+    """
+    from chitwanabm import rc_params
+    logger.debug("Validating divorce from archived migrant")
+    rcParams = rc_params.get_params()
+    saved_params = {}
+    for key in ['prob.migration.length.permanent', 'prob.marriage.divorce']:
+        saved_params[key] = rcParams[key]
+        rcParams[key] = 1
+    try:
+        divorce_valid = True
+        for migrant_sex in ['female', 'male']:
+            world = generate_synthetic_world(10, 2, 2)
+            region = world.get_regions()[0]
+            household = region.iter_households().next()
+            man, woman = world.new_persons([-360, -336], [360, 336], 
+                    sexes=[SEX_CODES['male'], SEX_CODES['female']], 
+                    ethnicities=[ETHNICITY_CODES['HighHindu']] * 2, 
+                    initial_agent=True)
+            household.add_agent(man)
+            household.add_agent(woman)
+            man.marry(woman, 1997)
+            if migrant_sex == 'female':
+                migrant, resident = woman, man
+            else:
+                migrant, resident = man, woman
+            migrant.make_individual_LD_migration(1997, 1, region)
+            if not world._person_archive.in_archive(migrant) or \
+                    not migrant._perm_away:
+                logger.warning("Permanent %s migrant was not archived as permanently away"%migrant_sex)
+                divorce_valid = False
+                continue
+            try:
+                divorces = region.divorces(1997, 2)
+            except Exception, e:
+                logger.warning("Divorce of resident person from permanent %s migrant failed: %s"%(migrant_sex, e))
+                divorce_valid = False
+                continue
+            if sum(divorces.values()) != 1 or resident.is_married() or \
+                    migrant.is_married():
+                logger.warning("Resident person was not divorced from permanent %s migrant"%migrant_sex)
+                divorce_valid = False
+    finally:
+        for key, value in saved_params.items():
+            rcParams[key] = value
+    return divorce_valid
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -15,7 +15,8 @@ setup(
                                     'R/*.R']},
     entry_points = {'console_scripts': ['chitwanabm_run = chitwanabm.runmodel:main',
                                         'chitwanabm_run_batch = chitwanabm.threaded_batch_run:main',
-                                        'chitwanabm_process_scenario = chitwanabm.process_scenario:main']},
+                                        'chitwanabm_process_scenario = chitwanabm.process_scenario:main',
+                                        'chitwanabm_export_results = chitwanabm.export_results:main']},
     zip_safe = True,
     install_requires = ['numpy >= 1.7.0',
                         'matplotlib >= 0.98.4',